@@ -1,6 +1,10 @@
 import streamlit as st
-from utils.filters import load_data, get_global_filters, apply_global_filters
+from utils.filters import load_data, get_global_filters
 import pandas as pd
+from utils.profiling import start_profile, section, finish_profile
+from utils.sampling import sample_rows
+
+start_profile("app")
 
 # --- PAGE CONFIG ---
 st.set_page_config(
@@ -9,31 +13,33 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Load cleaned dataset
-df = load_data()
+SAMPLE_COLUMNS = ['SK_ID_CURR', 'TARGET', 'AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AGE_YEARS', 'CODE_GENDER']
 
-# Sidebar global filters always visible
-filters, apply_filters, reset_filters = get_global_filters(df)
+section("data")
+# Load cleaned dataset (only the sample columns and the filter columns are read)
+df = load_data(SAMPLE_COLUMNS)
 
-# Default: sample of original cleaned data
-sample_original_df = df[['SK_ID_CURR', 'TARGET', 'AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AGE_YEARS', 'CODE_GENDER']].sample(10)
+section("filters")
+# Sidebar global filters always visible (applied filters persist across pages)
+filters = get_global_filters()
 
-# Display filtered data if user applies filters, else show original sample
-if apply_filters:
-    filtered_df = apply_global_filters(df, filters)
-    display_df = filtered_df[['SK_ID_CURR', 'TARGET', 'AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AGE_YEARS', 'CODE_GENDER']].sample(10)
-else:
-    display_df = sample_original_df.copy()
+# Sample of the filtered data if user applies filters, else of the original data; the same
+# rows on every rerun for a filter state (first 10 of the slice in a fixed random order)
+display_df = sample_rows(df, filters, 10)[SAMPLE_COLUMNS]
 
 # --- Page Content ---
 st.title("🏠 Home Credit Default Risk — Overview")
 
+section("kpis")
 # KPIs
 col1, col2, col3 = st.columns(3)
 col1.metric("Total Applicants", f"{df['SK_ID_CURR'].nunique():,}")
 col2.metric("Default Rate (%)", f"{df['TARGET'].mean() * 100:.2f}")
 col3.metric("Repaid Rate (%)", f"{(1 - df['TARGET'].mean()) * 100:.2f}")
 
+section("sample")
 # Sample Data Display
 st.markdown("### 📄 Sample Data (Original or Filtered)")
 st.dataframe(display_df, use_container_width=True)
+
+finish_profile()
@@ -0,0 +1,312 @@
+"""Time data prep, loading, filtering, KPIs and every page on synthetic data.
+
+    python benchmarks/bench_dashboard.py [--rows 300k,3M,30M] [--stages prep,load,filters,kpis,pages]
+                                         [--source raw|clean] [--workdir benchmarks/data]
+                                         [--output benchmarks/data/results.jsonl]
+
+For each size a Home-Credit-shaped raw CSV is generated once by utils.synth (in chunks,
+seeded) under `<workdir>/<size>/data/`, which is the working directory of
+the run, so the app's `data/...` paths point at the synthetic files and the
+real data/ is never touched. With `--source clean` the cleaned files and
+column store are written directly by utils.synth instead (under
+`<workdir>/<size>-clean/`) and there is no prep stage. Data stages run in one fresh process per size
+and each page (app.py and pages/*.py, executed headlessly with Streamlit's
+AppTest) in its own, so every page starts cold. Each measurement is appended
+to `--output` as one JSON line tagged with the run id, git revision, row
+count and DASHBOARD_* settings, so runs before and after a change can be
+compared. Peak memory is the process's peak resident set size during the
+measured step.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from utils.prep import CLEAN_CSV_PATH, CLEAN_PARQUET_PATH, META_PATH, PARAMS_PATH  # noqa: E402
+from utils.synth import parse_rows, reference_schema, write_raw_csv, write_synthetic_data  # noqa: E402
+
+STAGES = ["prep", "load", "filters", "kpis", "pages"]
+PAGES = ["app.py"] + sorted(os.path.relpath(p, ROOT) for p in glob.glob(os.path.join(ROOT, "pages", "*.py")))
+
+# ---------------------------------------------------------------------------
+# Synthetic data (generated by utils.synth)
+# ---------------------------------------------------------------------------
+
+def write_clean_files(run_dir, rows, seed=0):
+    """Cleaned Parquet file and column store of `rows` synthetic rows under `run_dir`/data (see utils.synth).
+
+    The files get the columns of the repo's own cleaned table, when it has one.
+    """
+    reference = reference_schema(*(os.path.join(ROOT, p) for p in (PARAMS_PATH, CLEAN_PARQUET_PATH, CLEAN_CSV_PATH,
+                                                                   META_PATH)))
+    cwd = os.getcwd()
+    os.makedirs(run_dir, exist_ok=True)
+    os.chdir(run_dir)  # the data paths are relative, as the app sees them
+    try:
+        write_synthetic_data(rows, seed=seed, formats=["parquet", "columns"], reference=reference)
+    finally:
+        os.chdir(cwd)
+
+# ---------------------------------------------------------------------------
+# Measurements (child processes)
+# ---------------------------------------------------------------------------
+
+def _reset_peak():
+    # Linux: restart the VmHWM high-water mark so each step reports its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # process-wide peak
+
+class Recorder:
+    def __init__(self, args):
+        self.output = args.output
+        self.base = json.loads(args.meta)
+
+    def write(self, stage, case, seconds, **fields):
+        record = {**self.base, "stage": stage, "case": case, "seconds": round(seconds, 6),
+                  "peak_rss_mb": round(_peak_rss_mb(), 1), **fields}
+        with open(self.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+        extra = "  ".join(f"{k}={v}" for k, v in fields.items())
+        print(f"  {stage:<8} {case:<48} {seconds:9.3f}s  {record['peak_rss_mb']:8.0f} MB  {extra}", flush=True)
+
+    @contextmanager
+    def measure(self, stage, case, **fields):
+        _reset_peak()
+        start = time.perf_counter()
+        yield fields
+        self.write(stage, case, time.perf_counter() - start, **fields)
+
+def filter_matrix(df):
+    """Named filter states: defaults, full ranges, each category at its most common level, combinations."""
+    from utils.filters import CATEGORY_FILTERS, default_filters, filter_options
+
+    options = filter_options()
+    base = default_filters()
+    full = dict(base, **{key: options[key] for key in ("age_range", "employment_years")})
+    top = {key: df[col].value_counts().index[0] for key, col in CATEGORY_FILTERS.items()}
+
+    cases = {"defaults": base, "full ranges": full}
+    for key, level in top.items():
+        cases[f"{key}={level}"] = dict(base, **{key: level})
+    cases["gender+education"] = dict(base, gender=top["gender"], education=top["education"])
+    cases["all categories"] = dict(base, **top)
+    cases["narrow ranges"] = dict(base, age_range=(30, 35), employment_years=(1, 3))
+    cases["all categories, narrow ranges"] = dict(cases["all categories"], age_range=(30, 35), employment_years=(1, 3))
+    return cases
+
+def run_data_stages(args, rec):
+    from utils.prep import DEFAULT_CHUNKSIZE, RAW_CSV_PATH, prepare_clean_data
+
+    stages = args.stages.split(",")
+    if "prep" in stages:
+        rows = int(rec.base["rows"])
+        chunksize = args.chunksize if args.chunksize is not None else (DEFAULT_CHUNKSIZE if rows > 1_000_000 else 0)
+        with rec.measure("prep", "prepare_clean_data", chunksize=chunksize or None, workers=args.workers):
+            prepare_clean_data(RAW_CSV_PATH, refit=True, force=True, chunksize=chunksize or None, workers=args.workers)
+
+    if not {"load", "filters", "kpis"} & set(stages):
+        return
+
+    from utils.corr import Moments
+    from utils.cube import get_cube
+    from utils.filters import CATEGORY_FILTERS, apply_global_filters, get_filter_engine, load_data
+    from utils.store import memory_report
+
+    with rec.measure("load", "dataset (all columns)") as info:
+        df = load_data()
+        info["columns"] = df.shape[1]
+        info["compact_mb"] = round(memory_report()["compact_bytes"] / 2**20, 1)
+    with rec.measure("load", "filter engine"):
+        get_filter_engine()
+    with rec.measure("load", "aggregate cube") as info:
+        cube = get_cube()
+        info["cells"] = cube.n_cells
+
+    cases = filter_matrix(df)
+    if "filters" in stages:
+        for name, filters in cases.items():
+            with rec.measure("filters", name) as info:
+                out = apply_global_filters(df, filters)
+                info["rows_out"] = len(out)
+            with rec.measure("filters", f"{name} (warm)"):
+                apply_global_filters(df, filters)
+
+    if "kpis" in stages:
+        measures = ["AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY", "EMPLOYMENT_YEARS"]
+        for name, filters in cases.items():
+            with rec.measure("kpis", f"cube: {name}"):
+                cube.totals(filters)
+                cube.rate(filters)
+                for col in CATEGORY_FILTERS.values():
+                    cube.rate_by(filters, col)
+                for measure in measures:
+                    cube.mean(measure, filters, where={"TARGET": 1})
+            # The same answers from a filter-engine scan, the baseline the cube has to beat
+            with rec.measure("kpis", f"scan: {name}"):
+                rows = get_filter_engine().rows(filters)
+                sliced = df if rows is None else df.take(rows)
+                sliced["TARGET"].mean()
+                for col in CATEGORY_FILTERS.values():
+                    sliced.groupby(col, observed=True)["TARGET"].mean()
+                defaulters = sliced["TARGET"].to_numpy() == 1
+                for measure in measures:
+                    np.nanmean(sliced[measure].to_numpy(dtype="float64", na_value=np.nan)[defaulters])
+            filtered = apply_global_filters(df, filters)
+            with rec.measure("kpis", f"moments: {name}"):
+                Moments(filtered).corr()
+
+def _cache_counts(last):
+    """Hits and misses of the figure and filter slice caches since `last`, which is updated in place."""
+    from utils.filters import slice_cache_stats
+    from utils.grid import figure_cache_stats
+
+    fields = {}
+    for name, stats in (("figure", figure_cache_stats()), ("slice", slice_cache_stats())):
+        for counter in ("hits", "misses"):
+            key = f"{name}_{counter}"
+            fields[key] = stats[counter] - last.get(key, 0)
+            last[key] = stats[counter]
+    return fields
+
+def _run_page(at, counts):
+    start = time.perf_counter()
+    at.run()
+    seconds = time.perf_counter() - start
+    charts = at.get("plotly_chart")
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return seconds, {"charts": len(charts), "figure_bytes": sum(len(c.proto.spec) for c in charts),
+                     "metrics": len(at.metric), **_cache_counts(counts)}
+
+def run_page(args, rec):
+    from streamlit.testing.v1 import AppTest
+    from utils.filters import default_filters, load_data
+
+    path = os.path.join(ROOT, args.page)
+    at = AppTest.from_file(path, default_timeout=args.timeout)
+    counts = {}  # the caches are shared with the page, which runs in this process
+
+    _reset_peak()
+    seconds, fields = _run_page(at, counts)
+    rec.write("pages", f"{args.page} (cold)", seconds, **fields)
+
+    _reset_peak()
+    seconds, fields = _run_page(at, counts)
+    rec.write("pages", f"{args.page} (rerun)", seconds, **fields)
+
+    # A filtered slice the figure and slice caches have not seen yet
+    df = load_data([])
+    filters = dict(default_filters(), gender=df["CODE_GENDER"].value_counts().index[0], age_range=(30, 50))
+    at.session_state["filters_draft"] = dict(filters)
+    at.session_state["filters_applied"] = dict(filters)
+    _reset_peak()
+    seconds, fields = _run_page(at, counts)
+    rec.write("pages", f"{args.page} (filtered)", seconds, **fields)
+
+    _reset_peak()
+    seconds, fields = _run_page(at, counts)
+    rec.write("pages", f"{args.page} (filtered rerun)", seconds, **fields)
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="300k", help="comma-separated sizes, e.g. 300k,3M,30M")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--pages", default=",".join(PAGES), help="scripts to run, relative to the repo root")
+    parser.add_argument("--workdir", default=os.path.join(ROOT, "benchmarks", "data"))
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "data", "results.jsonl"))
+    parser.add_argument("--source", choices=["raw", "clean"], default="raw",
+                        help="raw: generate a raw extract and prepare it; clean: write the cleaned files directly")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="prep streaming chunk rows (default: streamed above 1M rows, 0 = in memory)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds allowed per page run")
+    parser.add_argument("--child", choices=["data", "page"], help=argparse.SUPPRESS)
+    parser.add_argument("--page", help=argparse.SUPPRESS)
+    parser.add_argument("--meta", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.WARNING)  # bare-mode and per-call deprecation notices would drown the results
+        rec = Recorder(args)
+        run_data_stages(args, rec) if args.child == "data" else run_page(args, rec)
+        return 0
+
+    args.output = os.path.abspath(args.output)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    stages = args.stages.split(",")
+    run_id = time.strftime("%Y%m%dT%H%M%S")
+    revision = git_revision()
+    config = {k: v for k, v in sorted(os.environ.items()) if k.startswith("DASHBOARD_")}
+    env = dict(os.environ, DASHBOARD_PROFILE="0", PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    failed = 0
+
+    for size in args.rows.split(","):
+        rows = parse_rows(size)
+        if args.source == "clean":
+            run_dir = os.path.abspath(os.path.join(args.workdir, f"{size.strip()}-clean"))
+            if not os.path.exists(os.path.join(run_dir, META_PATH)):
+                start = time.perf_counter()
+                write_clean_files(run_dir, rows, args.seed)
+                print(f"generated {rows:,} cleaned rows in {time.perf_counter() - start:.1f}s -> {run_dir}")
+        else:
+            run_dir = os.path.abspath(os.path.join(args.workdir, size.strip()))
+            raw_path = os.path.join(run_dir, "data", "application_train.csv")
+            if not os.path.exists(raw_path):
+                start = time.perf_counter()
+                write_raw_csv(raw_path, rows, seed=args.seed)
+                print(f"generated {rows:,} rows in {time.perf_counter() - start:.1f}s -> {raw_path}")
+        print(f"== {rows:,} rows ({run_id}, {revision})")
+
+        meta = json.dumps({"run": run_id, "revision": revision, "rows": rows, "source": args.source, "config": config})
+        common = [sys.executable, os.path.abspath(__file__), "--output", args.output, "--meta", meta,
+                  "--timeout", str(args.timeout), "--workers", str(args.workers)]
+        if args.chunksize is not None:
+            common += ["--chunksize", str(args.chunksize)]
+        data_stages = [s for s in stages if s != "pages" and not (s == "prep" and args.source == "clean")]
+        if data_stages:
+            failed += subprocess.run(common + ["--child", "data", "--stages", ",".join(data_stages)],
+                                     cwd=run_dir, env=env).returncode != 0
+        if "pages" in stages:
+            for page in args.pages.split(","):
+                failed += subprocess.run(common + ["--child", "page", "--page", page], cwd=run_dir, env=env).returncode != 0
+
+    print(f"results appended to {args.output}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Time the column-by-column cleaning pipeline against the batched one, on one and on several processes.
+
+    python benchmarks/bench_prep.py [data/application_train.csv] [--repeat 3] [--workers 4]
+
+All pipelines run on the same in-memory raw frame (CSV parsing is timed
+separately) and their outputs are checked to be identical. With `--workers`
+the batched fit (column groups) and the cleaned CSV write (row slices) are
+also timed on a process pool, as `python -m utils.prep --workers` runs them.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.prep import clean_data, clean_data_batched, fit_clean_data, write_csv  # noqa: E402
+
+def best_of(repeat, func, raw):
+    times, out = [], None
+    for _ in range(repeat):
+        frame = raw.copy()
+        start = time.perf_counter()
+        out = func(frame)
+        times.append(time.perf_counter() - start)
+    return min(times), out
+
+def time_csv(repeat, df, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clean.csv")
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            write_csv(df, path, workers)
+            times.append(time.perf_counter() - start)
+        with open(path, encoding="utf-8") as f:
+            return min(times), f.read()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="data/application_train.csv")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes for the parallel runs (1 skips them)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    raw = pd.read_csv(args.path)
+    print(f"read_csv            {time.perf_counter() - start:8.2f}s  ({len(raw):,} rows × {raw.shape[1]} cols)")
+
+    legacy_time, legacy = best_of(args.repeat, clean_data, raw)
+    batched_time, batched = best_of(args.repeat, clean_data_batched, raw)
+    print(f"column-by-column    {legacy_time:8.2f}s")
+    print(f"batched             {batched_time:8.2f}s")
+    print(f"speedup             {legacy_time / batched_time:8.2f}x")
+
+    same = legacy.to_csv(index=False) == batched.to_csv(index=False)
+    print(f"identical output    {same}")
+    if args.workers > 1:
+        workers = args.workers
+        fit_time, (fitted, params) = best_of(args.repeat, fit_clean_data, raw)
+        parallel_time, (parallel, parallel_params) = best_of(args.repeat, lambda f: fit_clean_data(f, workers), raw)
+        csv_time, text = time_csv(args.repeat, fitted, 1)
+        parallel_csv_time, parallel_text = time_csv(args.repeat, fitted, workers)
+        for step, one, many in (("fit", fit_time, parallel_time), ("csv", csv_time, parallel_csv_time)):
+            print(f"{step}, 1 process      {one:8.2f}s")
+            print(f"{f'{step}, {workers} workers':<20}{many:8.2f}s  ({one / many:.2f}x)")
+        same_parallel = params == parallel_params and parallel.equals(fitted) and text == parallel_text
+        print(f"identical output    {same_parallel}")
+        same = same and same_parallel
+    return 0 if same else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,92 +1,104 @@
 import streamlit as st
+import pandas as pd
 import plotly.express as px
-from utils.filters import load_data, get_global_filters, apply_global_filters
+from utils.filters import load_data, get_global_filters, dataset_profile
+from utils.charts import histogram, counts_pie, box
+from utils.grid import chart, chart_grid
+from utils.profiling import start_profile, section, finish_profile
+from utils.sampling import slice_view, metric
+from utils.store import memory_report
 
+start_profile("page 1")
+
+# Columns this page reads (the filter columns are added by load_data)
+PAGE_COLUMNS = ['SK_ID_CURR', 'TARGET', 'AGE_YEARS', 'AMT_INCOME_TOTAL', 'AMT_CREDIT',
+                'CODE_GENDER', 'NAME_EDUCATION_TYPE', 'NAME_FAMILY_STATUS']
+
+section("data")
 # --- Load Data + Global Filters ---
-df = load_data()
-filters, apply_filters, reset_filters = get_global_filters(df)
+df = load_data(PAGE_COLUMNS)
+section("filters")
+filters = get_global_filters()
 
-# By default: use original data
-working_df = df.copy()
+# Applied filters (None until "Apply Filters"); unfiltered is the shared frame itself, no copy.
+# In approximate mode large slices are answered from a stratified sample instead
+view = slice_view(df, filters)
+working_df = view.frame
 
-# Apply global filters only when the user clicks "Apply Filters"
-if apply_filters:
-    working_df = apply_global_filters(df, filters)
+# Key for cached chart summaries of this slice
+slice_key = view.cache_key
 
 # --- Page Title ---
 st.title("📊 Page 1 — Overview & Data Quality")
 
+section("kpis")
 # --- KPIs (10) ---
 col1, col2, col3 = st.columns(3)
 col4, col5, col6 = st.columns(3)
 col7, col8, col9 = st.columns(3)
 col10, _, _ = st.columns(3)
 
-col1.metric("Total Applicants", f"{working_df['SK_ID_CURR'].nunique():,}")
-col2.metric("Default Rate (%)", f"{working_df['TARGET'].mean() * 100:.2f}")
-col3.metric("Repaid Rate (%)", f"{(1 - working_df['TARGET'].mean()) * 100:.2f}")
+# SK_ID_CURR is unique per row, so applicants are the slice's row count
+metric(col1, "Total Applicants", view.count(), fmt="{:,.0f}")
+default_rate = view.mean("TARGET")
+metric(col2, "Default Rate (%)", default_rate, scale=100)
+metric(col3, "Repaid Rate (%)", default_rate._replace(value=1 - default_rate.value), scale=100)
 
-col4.metric("Total Features", f"{working_df.shape[1]}")
-col5.metric("Avg Missing per Feature (%)", f"{working_df.isnull().mean().mean() * 100:.2f}")
+# Feature counts and missingness describe the whole dataset, from file metadata (no full read)
+profile = dataset_profile()
+missing_share = pd.Series({col: nulls for col, (_, nulls) in profile.items()}) / len(df)
 
-num_features = working_df.select_dtypes(include=['number']).shape[1]
-cat_features = working_df.select_dtypes(include=['object']).shape[1]
+col4.metric("Total Features", f"{len(profile)}")
+col5.metric("Avg Missing per Feature (%)", f"{missing_share.mean() * 100:.2f}")
+
+num_features = sum(numeric for numeric, _ in profile.values())
+cat_features = len(profile) - num_features
 
 col6.metric("Numeric Features", f"{num_features}")
 col7.metric("Categorical Features", f"{cat_features}")
-col8.metric("Median Age (Years)", f"{working_df['AGE_YEARS'].median():.1f}")
-col9.metric("Median Income", f"{working_df['AMT_INCOME_TOTAL'].median():,.0f}")
-col10.metric("Average Credit", f"{working_df['AMT_CREDIT'].mean():,.0f}")
+metric(col8, "Median Age (Years)", view.median("AGE_YEARS"), fmt="{:.1f}")
+metric(col9, "Median Income", view.median("AMT_INCOME_TOTAL"), fmt="{:,.0f}")
+metric(col10, "Average Credit", view.mean("AMT_CREDIT"), fmt="{:,.0f}")
+
+footprint = memory_report()
+st.caption(f"{'Memory-mapped' if footprint['mapped'] else 'In-memory'} dataset: "
+           f"{footprint['loaded_columns']} of {footprint['total_columns']} columns loaded, {footprint['compact_bytes'] / 2**20:.1f} MB "
+           f"({footprint['plain_bytes'] / 2**20:.1f} MB with object strings and 64-bit numbers)")
+
+if view.approximate:
+    st.caption(view.caption())
 
 st.markdown("---")
 
+section("charts")
 # ---------------------------
 # Charts (10) in rows of 3
 # ---------------------------
 
-# Row 1
-row1_col1, row1_col2, row1_col3 = st.columns(3)
-
-fig1 = px.pie(working_df, names="TARGET", title="Target Distribution (0 = Repaid, 1 = Default)")
-row1_col1.plotly_chart(fig1, use_container_width=True)
-
-missing_pct = working_df.isnull().mean().sort_values(ascending=False).head(20)
-fig2 = px.bar(missing_pct, x=missing_pct.index, y=missing_pct.values, title="Top 20 Features by Missing %")
-row1_col2.plotly_chart(fig2, use_container_width=True)
-
-fig3 = px.histogram(working_df, x="AGE_YEARS", nbins=30, title="Age Distribution")
-row1_col3.plotly_chart(fig3, use_container_width=True)
+def missing_bar(missing_share):
+    missing_pct = missing_share.sort_values(ascending=False).head(20)
+    return px.bar(missing_pct, x=missing_pct.index, y=missing_pct.values, title="Top 20 Features by Missing %")
 
-# Row 2
-row2_col1, row2_col2, row2_col3 = st.columns(3)
+# Built concurrently and cached per filter state; None leaves a slot empty (last graph centered)
+chart_grid([
+    chart(counts_pie, working_df, names="TARGET", title="Target Distribution (0 = Repaid, 1 = Default)"),
+    chart(missing_bar, missing_share),
+    chart(histogram, working_df, x="AGE_YEARS", nbins=30, title="Age Distribution"),
 
-fig4 = px.histogram(working_df, x="AMT_INCOME_TOTAL", nbins=30, title="Annual Income Distribution")
-row2_col1.plotly_chart(fig4, use_container_width=True)
+    chart(histogram, working_df, x="AMT_INCOME_TOTAL", nbins=30, title="Annual Income Distribution"),
+    chart(histogram, working_df, x="AMT_CREDIT", nbins=30, title="Credit Amount Distribution"),
+    chart(box, working_df, y="AMT_INCOME_TOTAL", title="Income Boxplot", cache_key=slice_key),
 
-fig5 = px.histogram(working_df, x="AMT_CREDIT", nbins=30, title="Credit Amount Distribution")
-row2_col2.plotly_chart(fig5, use_container_width=True)
+    chart(box, working_df, y="AMT_CREDIT", title="Credit Amount Boxplot", cache_key=slice_key),
+    chart(histogram, working_df, x="CODE_GENDER", title="Gender Distribution", text_auto=True),
+    chart(histogram, working_df, x="NAME_FAMILY_STATUS", title="Family Status Distribution", text_auto=True),
 
-fig6 = px.box(working_df, y="AMT_INCOME_TOTAL", title="Income Boxplot")
-row2_col3.plotly_chart(fig6, use_container_width=True)
-
-# Row 3
-row3_col1, row3_col2, row3_col3 = st.columns(3)
-
-fig7 = px.box(working_df, y="AMT_CREDIT", title="Credit Amount Boxplot")
-row3_col1.plotly_chart(fig7, use_container_width=True)
-
-fig8 = px.histogram(working_df, x="CODE_GENDER", title="Gender Distribution", text_auto=True)
-row3_col2.plotly_chart(fig8, use_container_width=True)
-
-fig9 = px.histogram(working_df, x="NAME_FAMILY_STATUS", title="Family Status Distribution", text_auto=True)
-row3_col3.plotly_chart(fig9, use_container_width=True)
-
-# Row 4 (last graph centered)
-row4_col1, row4_col2, row4_col3 = st.columns(3)
-
-fig10 = px.histogram(working_df, x="NAME_EDUCATION_TYPE", title="Education Distribution", text_auto=True)
-row4_col2.plotly_chart(fig10, use_container_width=True)
+    None,
+    chart(histogram, working_df, x="NAME_EDUCATION_TYPE", title="Education Distribution", text_auto=True),
+    None,
+], cache_key=slice_key)
 
+section("narrative")
 # ---------------------------
 # Narrative
 # ---------------------------
@@ -97,3 +109,5 @@ st.write("""
 - **Income and credit** distributions are highly skewed, with long tails.  
 - **Age distribution** is fairly normal, centered in the mid-30s to 40s.  
 """)
+
+finish_profile()
@@ -1,106 +1,87 @@
 import streamlit as st
 import plotly.express as px
-from utils.filters import load_data, get_global_filters, apply_global_filters
+from utils.filters import load_data, get_global_filters
+from utils.charts import histogram, box, violin
+from utils.grid import chart, chart_grid
+from utils.cube import get_cube
+from utils.profiling import start_profile, section, finish_profile
+from utils.sampling import slice_view
 
+start_profile("page 2")
+
+# Columns this page reads (the filter columns are added by load_data)
+PAGE_COLUMNS = ['TARGET', 'AGE_YEARS', 'EMPLOYMENT_YEARS', 'AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY',
+                'NAME_CONTRACT_TYPE']
+
+section("data")
 # --- Load Data + Apply Global Filters ---
-df = load_data()
-filters, apply_filters, reset_filters = get_global_filters(df)
+df = load_data(PAGE_COLUMNS)
+section("filters")
+filters = get_global_filters()
 
-# Default: original data
-working_df = df.copy()
+# Applied filters persist across pages; None means the original data
+view = slice_view(df, filters)  # exact, or a stratified sample of large slices in approximate mode
+working_df = view.frame
 
-if apply_filters:
-    working_df = apply_global_filters(df, filters)
+# Rates and means below are summed from the pre-aggregated cube, not scanned
+cube = get_cube()
+active_filters = filters
+slice_key = view.cache_key
 
 # --- Page Title ---
 st.title("🎯 Page 2 — Target & Risk Segmentation")
 
+section("kpis")
 # --- KPIs ---
 col1, col2, col3 = st.columns(3)
 col4, col5, col6 = st.columns(3)
 col7, col8, col9, col10 = st.columns(4)
 
-col1.metric("Total Defaults", f"{working_df['TARGET'].sum():,}")
-col2.metric("Default Rate (%)", f"{working_df['TARGET'].mean() * 100:.2f}")
-col3.metric("Default Rate (Male %)", f"{working_df[working_df['CODE_GENDER']=='M']['TARGET'].mean()*100:.2f}")
-col4.metric("Default Rate (Female %)", f"{working_df[working_df['CODE_GENDER']=='F']['TARGET'].mean()*100:.2f}")
-col5.metric("Default Rate (Secondary Ed %)", f"{working_df[working_df['NAME_EDUCATION_TYPE']=='Secondary / secondary special']['TARGET'].mean()*100:.2f}")
-col6.metric("Default Rate (Married %)", f"{working_df[working_df['NAME_FAMILY_STATUS']=='Married']['TARGET'].mean()*100:.2f}")
-col7.metric("Avg Income — Defaulters", f"{working_df[working_df['TARGET']==1]['AMT_INCOME_TOTAL'].mean():,.0f}")
-col8.metric("Avg Credit — Defaulters", f"{working_df[working_df['TARGET']==1]['AMT_CREDIT'].mean():,.0f}")
-col9.metric("Avg Annuity — Defaulters", f"{working_df[working_df['TARGET']==1]['AMT_ANNUITY'].mean():,.0f}")
-col10.metric("Avg Employment (Years) — Defaulters", f"{working_df[working_df['TARGET']==1]['EMPLOYMENT_YEARS'].mean():.1f}")
+col1.metric("Total Defaults", f"{int(cube.totals(active_filters)['target_sum']):,}")
+col2.metric("Default Rate (%)", f"{cube.rate(active_filters) * 100:.2f}")
+col3.metric("Default Rate (Male %)", f"{cube.rate(active_filters, where={'CODE_GENDER': 'M'})*100:.2f}")
+col4.metric("Default Rate (Female %)", f"{cube.rate(active_filters, where={'CODE_GENDER': 'F'})*100:.2f}")
+col5.metric("Default Rate (Secondary Ed %)", f"{cube.rate(active_filters, where={'NAME_EDUCATION_TYPE': 'Secondary / secondary special'})*100:.2f}")
+col6.metric("Default Rate (Married %)", f"{cube.rate(active_filters, where={'NAME_FAMILY_STATUS': 'Married'})*100:.2f}")
+col7.metric("Avg Income — Defaulters", f"{cube.mean('AMT_INCOME_TOTAL', active_filters, where={'TARGET': 1}):,.0f}")
+col8.metric("Avg Credit — Defaulters", f"{cube.mean('AMT_CREDIT', active_filters, where={'TARGET': 1}):,.0f}")
+col9.metric("Avg Annuity — Defaulters", f"{cube.mean('AMT_ANNUITY', active_filters, where={'TARGET': 1}):,.0f}")
+col10.metric("Avg Employment (Years) — Defaulters", f"{cube.mean('EMPLOYMENT_YEARS', active_filters, where={'TARGET': 1}):.1f}")
+
+if view.approximate:
+    st.caption(view.caption())
 
 st.markdown("---")
 
+section("charts")
 # --- Graphs (10) organized into rows of 3 ---
 
-# Row 1
-row1_col1, row1_col2, row1_col3 = st.columns(3)
-
-fig1 = px.histogram(working_df, x="TARGET", title="Default vs Repaid (Counts)", text_auto=True)
-row1_col1.plotly_chart(fig1, use_container_width=True)
-
-fig2 = px.bar(
-    working_df.groupby("CODE_GENDER")["TARGET"].mean().reset_index(),
-    x="CODE_GENDER", y="TARGET", title="Default Rate by Gender (%)"
-)
-fig2.update_yaxes(tickformat=".0%")
-row1_col2.plotly_chart(fig2, use_container_width=True)
-
-fig3 = px.bar(
-    working_df.groupby("NAME_EDUCATION_TYPE")["TARGET"].mean().reset_index(),
-    x="NAME_EDUCATION_TYPE", y="TARGET", title="Default Rate by Education (%)"
-)
-fig3.update_yaxes(tickformat=".0%")
-row1_col3.plotly_chart(fig3, use_container_width=True)
-
-# Row 2
-row2_col1, row2_col2, row2_col3 = st.columns(3)
-
-fig4 = px.bar(
-    working_df.groupby("NAME_FAMILY_STATUS")["TARGET"].mean().reset_index(),
-    x="NAME_FAMILY_STATUS", y="TARGET", title="Default Rate by Family Status (%)"
-)
-fig4.update_yaxes(tickformat=".0%")
-row2_col1.plotly_chart(fig4, use_container_width=True)
-
-fig5 = px.bar(
-    working_df.groupby("NAME_HOUSING_TYPE")["TARGET"].mean().reset_index(),
-    x="NAME_HOUSING_TYPE", y="TARGET", title="Default Rate by Housing Type (%)"
-)
-fig5.update_yaxes(tickformat=".0%")
-row2_col2.plotly_chart(fig5, use_container_width=True)
-
-fig6 = px.box(working_df, x="TARGET", y="AMT_INCOME_TOTAL", title="Income by Target")
-row2_col3.plotly_chart(fig6, use_container_width=True)
-
-# Row 3
-row3_col1, row3_col2, row3_col3 = st.columns(3)
-
-fig7 = px.box(working_df, x="TARGET", y="AMT_CREDIT", title="Credit by Target")
-row3_col1.plotly_chart(fig7, use_container_width=True)
-
-fig8 = px.violin(working_df, x="TARGET", y="AGE_YEARS", box=True, points="all", title="Age vs Target")
-row3_col2.plotly_chart(fig8, use_container_width=True)
-
-fig9 = px.histogram(
-    working_df, x="EMPLOYMENT_YEARS", color="TARGET",
-    barmode="overlay", nbins=30,
-    title="Employment Years by Target"
-)
-row3_col3.plotly_chart(fig9, use_container_width=True)
-
-# Row 4 (last graph centered)
-row4_col1, row4_col2, row4_col3 = st.columns(3)
-
-fig10 = px.histogram(
-    working_df, x="NAME_CONTRACT_TYPE", color="TARGET",
-    barmode="stack", text_auto=True,
-    title="Contract Type vs Target"
-)
-row4_col2.plotly_chart(fig10, use_container_width=True)
+def rate_bar(rates, by, title):
+    fig = px.bar(rates, x=by, y="TARGET", title=title)
+    return fig.update_yaxes(tickformat=".0%")
+
+# Built concurrently and cached per filter state; None leaves a slot empty (last graph centered)
+chart_grid([
+    chart(histogram, working_df, x="TARGET", title="Default vs Repaid (Counts)", text_auto=True),
+    chart(rate_bar, cube.rate_by(active_filters, "CODE_GENDER"), "CODE_GENDER", "Default Rate by Gender (%)"),
+    chart(rate_bar, cube.rate_by(active_filters, "NAME_EDUCATION_TYPE"), "NAME_EDUCATION_TYPE", "Default Rate by Education (%)"),
 
+    chart(rate_bar, cube.rate_by(active_filters, "NAME_FAMILY_STATUS"), "NAME_FAMILY_STATUS", "Default Rate by Family Status (%)"),
+    chart(rate_bar, cube.rate_by(active_filters, "NAME_HOUSING_TYPE"), "NAME_HOUSING_TYPE", "Default Rate by Housing Type (%)"),
+    chart(box, working_df, x="TARGET", y="AMT_INCOME_TOTAL", title="Income by Target", cache_key=slice_key),
+
+    chart(box, working_df, x="TARGET", y="AMT_CREDIT", title="Credit by Target", cache_key=slice_key),
+    chart(violin, working_df, x="TARGET", y="AGE_YEARS", box=True, points="all", title="Age vs Target", cache_key=slice_key),
+    chart(histogram, working_df, x="EMPLOYMENT_YEARS", color="TARGET", barmode="overlay", nbins=30,
+          title="Employment Years by Target"),
+
+    None,
+    chart(histogram, working_df, x="NAME_CONTRACT_TYPE", color="TARGET", barmode="stack", text_auto=True,
+          title="Contract Type vs Target"),
+    None,
+], cache_key=slice_key)
+
+section("narrative")
 # ---------------------------
 # Narrative
 # ---------------------------
@@ -113,3 +94,5 @@ st.write("""
 
 👉 Segments with **highest risk** (low income, rented housing, lower education) may warrant stricter credit checks.  
 """)
+
+finish_profile()
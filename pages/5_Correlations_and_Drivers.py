@@ -1,44 +1,47 @@
 # pages/5_Correlations_and_Drivers.py
 
 import streamlit as st
-import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from utils.prep import load_and_clean_data
-from utils.filters import get_global_filters, apply_global_filters
-
-# --------------------------- Load & Prep ---------------------------
-@st.cache_data
-def get_data():
-    df = load_and_clean_data("data/application_train_clean.csv")
-    # Derived fields
-    df["DTI"] = df["AMT_ANNUITY"] / df["AMT_INCOME_TOTAL"].replace({0: np.nan})
-    df["LTI"] = df["AMT_CREDIT"] / df["AMT_INCOME_TOTAL"].replace({0: np.nan})
-    df["ANNUITY_TO_CREDIT"] = df["AMT_ANNUITY"] / df["AMT_CREDIT"].replace({0: np.nan})
-    return df
-
-df = get_data()
-corr_matrix = df.corr(numeric_only=True)
+from utils.filters import load_data, dataset_profile, get_global_filters
+from utils.charts import box, scatter
+from utils.grid import chart, chart_grid
+from utils.corr import get_moments
+from utils.cube import get_cube
+from utils.profiling import start_profile, section, finish_profile
+from utils.sampling import slice_view, sample_rows
+
+start_profile("page 5")
+
+section("data")
+# --------------------------- Load (shared, read-only; ratios derived in utils.store) ---------------------------
+# The correlation KPIs rank every numeric feature against TARGET, so all numeric columns are read
+NUMERIC_COLUMNS = [col for col, (numeric, _) in dataset_profile().items() if numeric]
+PAGE_COLUMNS = NUMERIC_COLUMNS + ["CODE_GENDER", "NAME_EDUCATION_TYPE", "NAME_FAMILY_STATUS"]
+df = load_data(PAGE_COLUMNS)
 
 # --------------------------- Page Config ---------------------------
 st.set_page_config(layout="wide", page_title="Page 5 — Correlations & Drivers")
 st.title("🔍 Page 5 — Correlations, Drivers & Interactive Slice-and-Dice")
 
+section("filters")
 # --------------------------- Sidebar Filters ---------------------------
-filters, apply_filters, reset_filters = get_global_filters(df)
+filters = get_global_filters()  # applied filters, None when unfiltered
+view = slice_view(df, filters)  # exact, or a stratified sample of large slices in approximate mode
+filtered_df = view.frame
 
-if apply_filters:
-    filtered_df = apply_global_filters(df, filters)
-else:
-    filtered_df = df.copy()
-
-if reset_filters:
-    filtered_df = df.copy()
+# Default rates come from the pre-aggregated cube (None = unfiltered)
+cube = get_cube()
+active_filters = filters
+slice_key = view.cache_key
 
+section("kpis")
 # --------------------------- KPIs ---------------------------
 st.subheader("📌 Correlation KPIs")
-filtered_corr = filtered_df.corr(numeric_only=True)
+# One pass of sufficient statistics per filter state; every correlation below is derived from it
+moments = get_moments(filtered_df, cache_key=slice_key)
+filtered_corr = moments.corr()
 
 def safe_corr(col1, col2):
     try:
@@ -69,63 +72,79 @@ with st.expander("Correlation-Based KPIs"):
     c10, _, _ = st.columns(3)
     c10.metric("# Features with |corr| > 0.5", f"{(filtered_corr['TARGET'].abs() > 0.5).sum()}")
 
+if view.approximate:
+    st.caption(view.caption())
+
 st.markdown("---")
 
+section("heatmap")
 # --------------------------- Correlation Heatmap ---------------------------
 st.subheader("📊 Correlation Heatmap")
-numeric_cols = filtered_df.select_dtypes(include=np.number).columns.tolist()
-selected_cols = st.multiselect(
-    "Select numeric features to compare:", 
-    options=numeric_cols,
-    default=["AGE_YEARS", "EMPLOYMENT_YEARS", "AMT_INCOME_TOTAL", "AMT_CREDIT", "DTI", "LTI", "TARGET"]
-)
-
-if len(selected_cols) >= 2:
-    corr_subset = filtered_df[selected_cols].corr()
-    fig_heat = go.Figure(data=go.Heatmap(
-        z=corr_subset.values,
-        x=corr_subset.columns,
-        y=corr_subset.index,
-        colorscale='RdBu',
-        zmin=-1, zmax=1,
-        colorbar=dict(title="corr")
-    ))
-    fig_heat.update_layout(title="Correlation Matrix (Selected Features)", height=600)
-    st.plotly_chart(fig_heat, use_container_width=True)
 
+# A fragment: changing the selection reruns only this block, from the moments of the applied filter state
+@st.fragment
+def correlation_heatmap(moments):
+    numeric_cols = moments.columns
+    selected_cols = st.multiselect(
+        "Select numeric features to compare:", 
+        options=numeric_cols,
+        default=["AGE_YEARS", "EMPLOYMENT_YEARS", "AMT_INCOME_TOTAL", "AMT_CREDIT", "DTI", "LTI", "TARGET"]
+    )
+
+    if len(selected_cols) >= 2:
+        corr_subset = moments.corr(selected_cols)
+        fig_heat = go.Figure(data=go.Heatmap(
+            z=corr_subset.values,
+            x=corr_subset.columns,
+            y=corr_subset.index,
+            colorscale='RdBu',
+            zmin=-1, zmax=1,
+            colorbar=dict(title="corr")
+        ))
+        fig_heat.update_layout(title="Correlation Matrix (Selected Features)", height=600)
+        st.plotly_chart(fig_heat, use_container_width=True)
+
+correlation_heatmap(moments)
+
+section("target correlations")
 # --------------------------- |Correlation| vs TARGET Bar ---------------------------
 st.subheader("📉 |Correlation| of Features vs TARGET")
 target_corrs = filtered_corr["TARGET"].drop("TARGET").abs().sort_values(ascending=False).head(20)
 fig_corr_bar = px.bar(target_corrs, title="Top |Correlations| with TARGET", labels={"value": "|corr|"}, height=400)
 st.plotly_chart(fig_corr_bar, use_container_width=True)
 
+section("charts")
 # --------------------------- All Scatter/Box/Bar/Pairplot in 3 per row ---------------------------
 st.subheader("🧮 Visual Correlations & Drivers")
 figs = []
 
 # Scatter / Box / Bar plots
-figs.append(px.scatter(filtered_df, x="AGE_YEARS", y="AMT_CREDIT", color="TARGET", title="Age vs Credit", opacity=0.5))
-figs.append(px.scatter(filtered_df, x="AGE_YEARS", y="AMT_INCOME_TOTAL", color="TARGET", title="Age vs Income", opacity=0.5))
-figs.append(px.scatter(filtered_df, x="EMPLOYMENT_YEARS", y="TARGET", title="Employment Years vs TARGET", opacity=0.4))
+figs.append(chart(scatter, filtered_df, x="AGE_YEARS", y="AMT_CREDIT", color="TARGET", title="Age vs Credit", opacity=0.5, cache_key=slice_key))
+figs.append(chart(scatter, filtered_df, x="AGE_YEARS", y="AMT_INCOME_TOTAL", color="TARGET", title="Age vs Income", opacity=0.5, cache_key=slice_key))
+figs.append(chart(scatter, filtered_df, x="EMPLOYMENT_YEARS", y="TARGET", title="Employment Years vs TARGET", opacity=0.4, cache_key=slice_key))
 
-figs.append(px.box(filtered_df, x="NAME_EDUCATION_TYPE", y="AMT_CREDIT", color="TARGET", title="Credit by Education"))
-figs.append(px.box(filtered_df, x="NAME_FAMILY_STATUS", y="AMT_INCOME_TOTAL", color="TARGET", title="Income by Family Status"))
+figs.append(chart(box, filtered_df, x="NAME_EDUCATION_TYPE", y="AMT_CREDIT", color="TARGET", title="Credit by Education", cache_key=slice_key))
+figs.append(chart(box, filtered_df, x="NAME_FAMILY_STATUS", y="AMT_INCOME_TOTAL", color="TARGET", title="Income by Family Status", cache_key=slice_key))
 
-sample_df = filtered_df[["AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY", "TARGET"]].dropna().sample(min(len(filtered_df), 3000))
-figs.append(px.scatter_matrix(sample_df, dimensions=["AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY"], color="TARGET", title="Scatter Matrix"))
+def scatter_matrix(frame, filters):
+    # Up to 3000 complete rows of the full slice, the same ones on every rerun
+    cols = ["AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY", "TARGET"]
+    sample_df = sample_rows(frame, filters, 3000, dropna=cols)[cols]
+    return px.scatter_matrix(sample_df, dimensions=["AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY"], color="TARGET", title="Scatter Matrix")
 
-df_g = filtered_df.groupby("CODE_GENDER")["TARGET"].mean().reset_index()
-figs.append(px.bar(df_g, x="CODE_GENDER", y="TARGET", title="Default Rate by Gender", labels={"TARGET":"Default Rate"}).update_yaxes(tickformat=".0%"))
+figs.append(chart(scatter_matrix, df, filters))
 
-df_e = filtered_df.groupby("NAME_EDUCATION_TYPE")["TARGET"].mean().reset_index()
-figs.append(px.bar(df_e, x="NAME_EDUCATION_TYPE", y="TARGET", title="Default Rate by Education", labels={"TARGET":"Default Rate"}).update_yaxes(tickformat=".0%"))
+def rate_bar(rates, by, title):
+    fig = px.bar(rates, x=by, y="TARGET", title=title, labels={"TARGET":"Default Rate"})
+    return fig.update_yaxes(tickformat=".0%")
 
-# Display plots in rows of 3
-for i in range(0, len(figs), 3):
-    cols = st.columns(3)
-    for j, fig in enumerate(figs[i:i+3]):
-        cols[j].plotly_chart(fig, use_container_width=True)
+figs.append(chart(rate_bar, cube.rate_by(active_filters, "CODE_GENDER"), "CODE_GENDER", "Default Rate by Gender"))
+figs.append(chart(rate_bar, cube.rate_by(active_filters, "NAME_EDUCATION_TYPE"), "NAME_EDUCATION_TYPE", "Default Rate by Education"))
 
+# Display plots in rows of 3 (built concurrently, cached per filter state)
+chart_grid(figs, cache_key=slice_key)
+
+section("narrative")
 # --------------------------- Narrative ---------------------------
 st.markdown("---")
 st.subheader("📘 Interpretation & Policy Candidates")
@@ -134,3 +153,5 @@ st.write("""
 - Consider thresholds based on **LTI > 6**, **DTI > 0.35**, or **Low Income Brackets**.
 - Use Education and Gender filtering to explore subgroup behavior and tailor policy accordingly.
 """)
+
+finish_profile()
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.filters import CATEGORY_FILTERS, RANGE_FILTERS
+from utils.synth import synthetic_chunk
+
+ALL = {"gender": "All", "education": "All", "family_status": "All", "housing": "All", "income_bracket": "All",
+       "age_range": (21, 69), "employment_years": (0, 50)}
+
+# Filter states the checks run over: defaults, single and combined filters, narrow and fractional ranges,
+# a level the data does not have
+FILTER_STATES = [
+    ALL,
+    dict(ALL, age_range=(25, 60), employment_years=(0, 20)),
+    dict(ALL, gender="F"),
+    dict(ALL, education="Higher education", income_bracket="High"),
+    dict(ALL, gender="M", family_status="Married", housing="House / apartment", age_range=(30, 45)),
+    dict(ALL, age_range=(40, 40), employment_years=(2, 3)),
+    dict(ALL, age_range=(30.5, 40.25)),
+    dict(ALL, housing="Castle"),
+]
+
+@pytest.fixture(scope="session")
+def clean_df():
+    """60k synthetic cleaned rows, with some AMT_GOODS_PRICE values missing."""
+    df = synthetic_chunk(60_000, rng=np.random.default_rng(0))
+    df.loc[df.index[::97], "AMT_GOODS_PRICE"] = np.nan
+    return df
+
+def pandas_mask(df, filters):
+    """Reference boolean mask for a filter state, with plain pandas comparisons."""
+    mask = pd.Series(True, index=df.index)
+    for key, col in CATEGORY_FILTERS.items():
+        if filters[key] != "All":
+            mask &= df[col] == filters[key]
+    for key, col in RANGE_FILTERS.items():
+        low, high = filters[key]
+        mask &= df[col].between(low, high)
+    return mask.to_numpy()
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from utils.cache import LRUCache
+
+def test_evicts_least_recently_used_first():
+    cache = LRUCache(100)
+    cache.put("a", b"a" * 40)
+    cache.put("b", b"b" * 40)
+    assert cache.get("a") == b"a" * 40  # now "b" is the least recently used
+    cache.put("c", b"c" * 40)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 80 and cache.stats()["evictions"] == 1
+
+def test_value_larger_than_the_budget_is_not_kept():
+    cache = LRUCache(100)
+    cache.put("a", b"a" * 40)
+    assert cache.get_or_compute("big", lambda: b"x" * 101) == b"x" * 101
+    assert cache.get("big") is None
+    assert cache.get("a") is not None and cache.stats()["evictions"] == 0
+
+def test_counters():
+    cache = LRUCache(100)
+    cache.get("a")
+    cache.get_or_compute("a", lambda: b"a")
+    cache.get_or_compute("a", lambda: b"b")
+    cache.get("a")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 1)
+    assert stats["hit_rate"] == 0.5
+
+def test_concurrent_misses_compute_once():
+    cache = LRUCache(1000)
+    calls = []
+    start = threading.Barrier(8)
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)  # long enough for the other threads to ask meanwhile
+        return bytearray(10)
+
+    def ask():
+        start.wait()
+        results.append(cache.get_or_compute("k", compute))
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+def test_failed_compute_lets_waiting_threads_retry():
+    cache = LRUCache(1000)
+    started, release = threading.Event(), threading.Event()
+    outcome = {}
+
+    def failing():
+        started.set()
+        release.wait()
+        raise RuntimeError("boom")
+
+    def lead():
+        try:
+            cache.get_or_compute("k", failing)
+        except RuntimeError as error:
+            outcome["error"] = error
+
+    def follow():
+        outcome["value"] = cache.get_or_compute("k", lambda: b"ok")
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=follow)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+    assert isinstance(outcome["error"], RuntimeError)
+    assert outcome["value"] == b"ok" and cache.get("k") == b"ok"
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pytest
+from conftest import FILTER_STATES, pandas_mask
+from utils.charts import box, box_stats, counts_pie, density_heatmap, histogram, kde_curve, scatter, violin
+
+BOX_FIELDS = ("q1", "median", "q3", "mean", "lowerfence", "upperfence")
+
+@pytest.fixture(scope="module")
+def sliced(clean_df):
+    return clean_df[pandas_mask(clean_df, FILTER_STATES[1])]
+
+def _counts(trace):
+    return dict(zip(map(str, trace.x), trace.y))
+
+def test_numeric_bins_match_np_histogram(sliced):
+    fig = histogram(sliced, x="AMT_GOODS_PRICE", nbins=30)
+    values = sliced["AMT_GOODS_PRICE"].dropna().to_numpy(dtype="float64")
+    counts, edges = np.histogram(values, bins=30)
+    bar = fig.data[0]
+    np.testing.assert_array_equal(bar.y, counts)
+    np.testing.assert_allclose(bar.x, (edges[:-1] + edges[1:]) / 2)
+    np.testing.assert_allclose(bar.width, np.diff(edges))
+
+def test_colour_levels_share_the_bins(sliced):
+    fig = histogram(sliced, x="AGE_YEARS", color="TARGET", nbins=20)
+    edges = np.histogram_bin_edges(sliced["AGE_YEARS"], bins=20)
+    reference = px.histogram(sliced, x="AGE_YEARS", color="TARGET")
+    assert [bar.name for bar in fig.data] == [trace.name for trace in reference.data]
+    for bar, trace in zip(fig.data, reference.data):
+        np.testing.assert_array_equal(bar.y, np.histogram(trace.x, bins=edges)[0])
+
+@pytest.mark.parametrize("x", ["NAME_EDUCATION_TYPE", "TARGET", "CNT_CHILDREN"])
+def test_discrete_counts_match_px(sliced, x):
+    fig = histogram(sliced, x=x, text_auto=True)
+    reference = px.histogram(sliced, x=x)
+    levels, counts = np.unique(reference.data[0].x.astype(str), return_counts=True)
+    assert _counts(fig.data[0]) == dict(zip(levels, counts))
+
+def test_pie_counts_match_px(sliced):
+    fig = counts_pie(sliced, names="NAME_FAMILY_STATUS")
+    reference = px.pie(sliced, names="NAME_FAMILY_STATUS")
+    levels, counts = np.unique(reference.data[0].labels.astype(str), return_counts=True)
+    assert dict(zip(fig.data[0].labels, fig.data[0].values)) == dict(zip(levels, counts))
+
+def _pandas_box(values):
+    values = pd.Series(values).dropna()
+    q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+    inside = values[values.between(q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))]
+    return {"n": len(values), "q1": q1, "median": median, "q3": q3, "mean": values.mean(),
+            "lowerfence": inside.min(), "upperfence": inside.max()}
+
+def _assert_box(summary, values):
+    # Only the fields the summary carries: box traces have no count
+    for field, expected in _pandas_box(values).items():
+        if field in summary:
+            assert summary[field] == pytest.approx(expected, rel=1e-12), field
+
+def _trace_box(trace, i):
+    return {field: getattr(trace, field)[i] for field in BOX_FIELDS}
+
+def test_box_stats_match_pandas(sliced):
+    values = sliced["AMT_INCOME_TOTAL"].to_numpy()
+    summary = box_stats(values, max_points=10**6)
+    _assert_box(summary, values)
+    outliers = values[(values < summary["lowerfence"]) | (values > summary["upperfence"])]
+    np.testing.assert_array_equal(np.sort(summary["points"]), np.sort(outliers))
+
+def test_box_points_are_a_capped_seeded_sample(sliced):
+    values = sliced["AMT_CREDIT"].to_numpy()
+    summary = box_stats(values, max_points=50, points="all", seed=3)
+    assert len(summary["points"]) == 50 and np.isin(summary["points"], values).all()
+    np.testing.assert_array_equal(summary["points"], box_stats(values, max_points=50, points="all", seed=3)["points"])
+    assert box_stats([np.nan, np.nan]) is None
+
+def test_kde_curve_matches_the_exact_gaussian_kde(sliced):
+    values = sliced["AGE_YEARS"].to_numpy()[:5000]
+    grid, density = kde_curve(values)
+    q1, q3 = np.percentile(values, [25, 75])
+    bw = 1.059 * min(values.std(ddof=1), (q3 - q1) / 1.349) * len(values) ** -0.2
+    exact = np.exp(-0.5 * ((grid[:, None] - values[None, :]) / bw) ** 2).sum(axis=1) / (len(values) * bw * np.sqrt(2 * np.pi))
+    np.testing.assert_allclose(density, exact, atol=2e-3 * exact.max())
+    assert np.trapezoid(density, grid) == pytest.approx(1, abs=0.01)
+
+def test_box_groups_match_px(sliced):
+    fig = box(sliced, y="AMT_CREDIT", x="NAME_EDUCATION_TYPE", color="TARGET")
+    reference = px.box(sliced, y="AMT_CREDIT", x="NAME_EDUCATION_TYPE", color="TARGET")
+    boxes = [trace for trace in fig.data if trace.type == "box"]
+    assert [trace.name for trace in boxes] == [trace.name for trace in reference.data]
+    for trace, expected in zip(boxes, reference.data):
+        assert set(trace.x) == set(expected.x)
+        for i, level in enumerate(trace.x):
+            group = (sliced["NAME_EDUCATION_TYPE"] == level) & (sliced["TARGET"] == int(trace.name))
+            _assert_box(_trace_box(trace, i), sliced.loc[group, "AMT_CREDIT"])
+
+def test_violin_summarizes_each_level(sliced):
+    fig = violin(sliced, y="AGE_YEARS", x="TARGET", points="all")
+    reference = px.violin(sliced, y="AGE_YEARS", x="TARGET")
+    boxes = [trace for trace in fig.data if trace.type == "box"]
+    assert [trace.name for trace in boxes] == [str(level) for level in sorted(set(reference.data[0].x))]
+    for trace in boxes:
+        _assert_box(_trace_box(trace, 0), sliced.loc[sliced["TARGET"] == int(trace.name), "AGE_YEARS"])
+
+def test_small_scatter_is_plain_px(sliced):
+    small = sliced.head(500)
+    fig = scatter(small, x="AGE_YEARS", y="AMT_CREDIT", color="TARGET", opacity=0.5, threshold=1000)
+    reference = px.scatter(small, x="AGE_YEARS", y="AMT_CREDIT", color="TARGET", opacity=0.5)
+    assert fig.to_dict() == reference.to_dict()
+
+def test_rasterized_scatter_counts_every_row_per_class(sliced):
+    fig = scatter(sliced, x="AGE_YEARS", y="AMT_CREDIT", color="TARGET", threshold=1000, bins=40)
+    x_edges = np.histogram_bin_edges(sliced["AGE_YEARS"], bins=40)
+    y_edges = np.histogram_bin_edges(sliced["AMT_CREDIT"], bins=40)
+    layers = [trace for trace in fig.data if trace.type == "heatmap"]
+    assert [layer.name for layer in layers] == ["0", "1"]
+    for layer in layers:
+        part = sliced[sliced["TARGET"] == int(layer.name)]
+        counts, _, _ = np.histogram2d(part["AGE_YEARS"], part["AMT_CREDIT"], bins=[x_edges, y_edges])
+        np.testing.assert_array_equal(np.asarray(layer.z), counts.T)
+
+def test_density_heatmap_matches_histogram2d(sliced):
+    fig = density_heatmap(sliced, x="AMT_INCOME_TOTAL", y="AMT_GOODS_PRICE", nbinsx=25, nbinsy=30)
+    complete = sliced.dropna(subset=["AMT_INCOME_TOTAL", "AMT_GOODS_PRICE"])
+    x_edges = np.histogram_bin_edges(sliced["AMT_INCOME_TOTAL"], bins=25)
+    y_edges = np.histogram_bin_edges(sliced["AMT_GOODS_PRICE"].dropna(), bins=30)
+    counts, _, _ = np.histogram2d(complete["AMT_INCOME_TOTAL"], complete["AMT_GOODS_PRICE"], bins=[x_edges, y_edges])
+    np.testing.assert_array_equal(np.asarray(fig.data[0].z), counts.T)
+    assert counts.sum() == len(complete)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.columns import open_columns, write_columns
+
+@pytest.fixture
+def store(clean_df, tmp_path):
+    write_columns(clean_df, "v1", str(tmp_path))
+    return open_columns("v1", str(tmp_path))
+
+def _assert_same(frame, expected):
+    # Column by column: assert_frame_equal also compares array classes, and these are memmaps
+    assert frame.index.equals(expected.index)
+    pd.testing.assert_series_equal(frame.dtypes, expected.dtypes)
+    for col in expected.columns:
+        np.testing.assert_array_equal(np.asarray(frame[col]), np.asarray(expected[col]), err_msg=col)
+
+def test_frame_round_trips(clean_df, store):
+    _assert_same(store.frame(), clean_df)
+    _assert_same(store.frame(["TARGET", "CODE_GENDER"]), clean_df[["TARGET", "CODE_GENDER"]])
+
+def test_columns_are_read_only_maps(store):
+    values = store.column("AMT_CREDIT")
+    assert isinstance(values, np.memmap) and not values.flags.writeable
+    assert not store.column("CODE_GENDER").codes.flags.writeable
+    with pytest.raises(ValueError):
+        values[0] = 0
+
+def test_sorted_index_orders_rows_with_missing_last(clean_df, store):
+    values, order = store.sorted_index("AMT_GOODS_PRICE")
+    expected = clean_df["AMT_GOODS_PRICE"].to_numpy()
+    np.testing.assert_array_equal(values, expected[order])
+    n = int(np.isfinite(expected).sum())
+    assert np.all(np.diff(values[:n]) >= 0) and np.isnan(values[n:]).all()
+    again, _ = store.sorted_index("AMT_GOODS_PRICE")
+    assert isinstance(again, np.memmap)
+
+def test_missing_store_and_text_columns(clean_df, tmp_path):
+    assert open_columns("v2", str(tmp_path)) is None
+    with pytest.raises(ValueError, match="only numeric and categorical"):
+        write_columns(pd.DataFrame({"name": ["a", "b"]}), "v2", str(tmp_path))
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from utils.corr import Moments
+
+def _assert_matches_pandas(df, columns=None):
+    expected = df.select_dtypes(include=np.number).corr()
+    if columns is not None:
+        expected = expected.loc[columns, columns]
+    pd.testing.assert_frame_equal(Moments(df).corr(columns), expected, check_exact=False, rtol=1e-7, atol=1e-9)
+
+def test_corr_matches_pandas_without_missing_values(clean_df):
+    _assert_matches_pandas(clean_df.drop(columns="AMT_GOODS_PRICE"))
+
+def test_corr_matches_pandas_with_pairwise_missing_values(clean_df):
+    df = clean_df.copy()
+    df.loc[df.index[::7], "EXT_SOURCE_1"] = np.nan
+    df.loc[df.index[::11], "EXT_SOURCE_2"] = np.nan
+    _assert_matches_pandas(df)
+
+def test_corr_submatrix(clean_df):
+    _assert_matches_pandas(clean_df, ["AMT_CREDIT", "EXT_SOURCE_2", "TARGET", "AGE_YEARS"])
+
+def test_constant_and_empty_columns_are_nan():
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0], "b": [5.0] * 4, "c": [np.nan] * 4, "d": [4.0, 1.0, 3.0, 2.0]})
+    _assert_matches_pandas(df)
+    _assert_matches_pandas(df.iloc[:1])
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from conftest import FILTER_STATES, pandas_mask
+from utils import cube as cube_module
+from utils.cube import MEASURES, AggregateCube
+from utils.filters import CATEGORY_FILTERS, FilterEngine
+
+@pytest.fixture(scope="module")
+def cube(clean_df):
+    return AggregateCube(clean_df)
+
+@pytest.fixture(autouse=True)
+def local_scan(monkeypatch):
+    # Fractional ranges scan the slice; resolve it on the test frame, not the app's dataset
+    monkeypatch.setattr(cube_module, "filter_rows", lambda df, filters: FilterEngine(df).rows(filters))
+
+def _close(a, b):
+    return np.isclose(a, b, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+@pytest.mark.parametrize("filters", FILTER_STATES)
+def test_rate_mean_std_match_pandas(clean_df, cube, filters):
+    sliced = clean_df[pandas_mask(clean_df, filters)].astype({measure: "float64" for measure in MEASURES})
+    defaulters = sliced[sliced["TARGET"] == 1]
+    assert _close(cube.rate(filters), sliced["TARGET"].mean())
+    for measure in MEASURES:
+        assert _close(cube.mean(measure, filters), sliced[measure].mean())
+        assert _close(cube.std(measure, filters), sliced[measure].std())
+        assert _close(cube.mean(measure, filters, where={"TARGET": 1}), defaulters[measure].mean())
+
+@pytest.mark.parametrize("filters", FILTER_STATES)
+@pytest.mark.parametrize("by", list(CATEGORY_FILTERS.values()))
+def test_rate_by_matches_groupby(clean_df, cube, filters, by):
+    sliced = clean_df[pandas_mask(clean_df, filters)]
+    expected = sliced.groupby(by, observed=True)["TARGET"].mean()
+    result = cube.rate_by(filters, by)
+    assert [str(v) for v in result[by]] == [str(v) for v in expected.index]
+    np.testing.assert_allclose(result["TARGET"], expected, rtol=1e-9)
+
+def test_totals_count_rows(clean_df, cube):
+    totals = cube.totals(None, by="CODE_GENDER")
+    expected = clean_df["CODE_GENDER"].value_counts()
+    for level, count in totals["count"].items():
+        assert count == expected[level]
+    assert cube.totals()["count"] == len(clean_df)
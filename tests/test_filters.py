@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from conftest import FILTER_STATES, pandas_mask
+from utils import filters as filters_module
+from utils.filters import FilterEngine, normalize_filters
+
+@pytest.mark.parametrize("filters", FILTER_STATES)
+def test_mask_and_rows_match_pandas(clean_df, filters):
+    engine = FilterEngine(clean_df)
+    expected = pandas_mask(clean_df, filters)
+    mask = engine.mask(filters)
+    rows = engine.rows(filters)
+    if mask is None:
+        assert expected.all() and rows is None
+    else:
+        np.testing.assert_array_equal(mask, expected)
+        np.testing.assert_array_equal(rows, np.flatnonzero(expected))
+
+def test_cached_rows_are_read_only_copies_of_rows(clean_df):
+    engine = FilterEngine(clean_df)
+    filters = FILTER_STATES[2]
+    rows = engine.cached_rows(filters)
+    np.testing.assert_array_equal(rows, engine.rows(filters))
+    assert engine.cached_rows(dict(reversed(list(filters.items())))) is rows
+    assert not rows.flags.writeable
+
+def test_equivalent_filter_states_share_a_key():
+    filters = FILTER_STATES[4]
+    assert normalize_filters(dict(filters, age_range=[30.0, 45.0])) == normalize_filters(filters)
+    assert normalize_filters(dict(filters, gender="F")) != normalize_filters(filters)
+    assert normalize_filters(None) == ()
+
+def test_slice_cache_stays_within_its_budget(clean_df, monkeypatch):
+    monkeypatch.setattr(filters_module, "SLICE_CACHE_MB", 0.2)
+    engine = FilterEngine(clean_df)
+    for filters in FILTER_STATES * 2:
+        rows = engine.cached_rows(filters)
+        expected = pandas_mask(clean_df, filters)
+        np.testing.assert_array_equal(np.arange(len(clean_df)) if rows is None else rows, np.flatnonzero(expected))
+    stats = engine.slices.stats()
+    assert stats["bytes"] <= stats["max_bytes"] and stats["evictions"] > 0
+
+def test_plain_text_columns_match_categoricals(clean_df):
+    text = clean_df.astype({col: str for col in ("CODE_GENDER", "NAME_HOUSING_TYPE")})
+    engine = FilterEngine(text)
+    for filters in FILTER_STATES:
+        mask = engine.mask(filters)
+        expected = pandas_mask(clean_df, filters)
+        np.testing.assert_array_equal(np.ones(len(text), dtype=bool) if mask is None else mask, expected)
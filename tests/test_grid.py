@@ -0,0 +1,64 @@
+import importlib.util
+
+import pandas as pd
+import plotly.express as px
+import pytest
+from utils import grid
+
+BUILDER = '''import plotly.graph_objects as go
+
+def titled():
+    return go.Figure(layout={{"title": "{title}"}})
+'''
+
+class _Dataset:
+    version = "tests"
+
+    def owns(self, df):
+        return False
+
+@pytest.fixture
+def figure_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(grid, "get_lazy_dataset", lambda: _Dataset())
+    monkeypatch.setattr(grid, "USE_FIGURE_DISK", True)
+    monkeypatch.setattr(grid, "FIGURE_DIR", str(tmp_path / "figures"))
+    monkeypatch.setattr(grid, "_disk_total", None)
+    grid._figure_cache().clear()
+    yield
+    grid._figure_cache().clear()
+
+def _load_builder(path, title):
+    path.write_text(BUILDER.format(title=title), encoding="utf-8")
+    spec = importlib.util.spec_from_file_location("page_builder", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.titled
+
+def _title(built):
+    return built[0].layout.title.text
+
+def test_cached_figure_is_reused(tmp_path, figure_disk):
+    build = _load_builder(tmp_path / "page.py", "Old title")
+    first = grid._build(grid.chart(build), ("state",), None)
+    assert grid._build(grid.chart(build), ("state",), None)[0] is first[0]
+    grid._figure_cache().clear()  # a restart: only the disk layer is left
+    assert _title(grid._build(grid.chart(build), ("state",), None)) == "Old title"
+
+def test_changed_builder_misses_memory_and_disk(tmp_path, figure_disk):
+    path = tmp_path / "page.py"
+    assert _title(grid._build(grid.chart(_load_builder(path, "Old title")), ("state",), None)) == "Old title"
+    # Same file, function name and arguments; only the code changed
+    changed = _load_builder(path, "A new, longer title")
+    assert _title(grid._build(grid.chart(changed), ("state",), None)) == "A new, longer title"
+    grid._figure_cache().clear()
+    assert _title(grid._build(grid.chart(changed), ("state",), None)) == "A new, longer title"
+
+def _bar(frame):
+    return px.bar(frame, x="level", y="count")
+
+def test_frames_passed_to_the_builder_key_the_figure(figure_disk):
+    small = pd.DataFrame({"level": ["a", "b"], "count": [1, 2]}, index=[0, 1])
+    other = pd.DataFrame({"level": ["a", "b"], "count": [3, 4]}, index=[5, 6])
+    first = grid._build(grid.chart(_bar, small), ("state",), None)[0]
+    assert grid._build(grid.chart(_bar, small), ("state",), None)[0] is first
+    assert list(grid._build(grid.chart(_bar, other), ("state",), None)[0].data[0].y) == [3, 4]
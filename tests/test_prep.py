@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.prep import (PARAMS_VERSION, WINSOR_COLUMNS, clean_data, clean_data_batched, fit_clean_data,
+                        fit_clean_data_streaming, load_params, save_params, stream_clean_data, transform_clean_data,
+                        write_csv)
+from utils.synth import write_raw_csv
+
+@pytest.fixture(scope="module")
+def raw_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("raw") / "application_train.csv"
+    write_raw_csv(str(path), 20_000, seed=0)
+    return str(path)
+
+@pytest.fixture(scope="module")
+def raw_df(raw_path):
+    return pd.read_csv(raw_path)
+
+@pytest.mark.parametrize("text", ["", "SK_ID_CURR,TARGET,AMT_CREDIT\n"], ids=["empty", "header only"])
+def test_streaming_fit_rejects_a_file_without_rows(tmp_path, text):
+    path = tmp_path / "application_train.csv"
+    path.write_text(text)
+    with pytest.raises(ValueError, match="no rows in"):
+        fit_clean_data_streaming(str(path), chunksize=1000)
+
+def test_batched_matches_column_by_column(raw_df):
+    expected = clean_data(raw_df.copy())
+    batched = clean_data_batched(raw_df.copy())
+    assert "OWN_CAR_AGE" not in batched and "EXT_SOURCE_1" in batched
+    assert batched.notna().all().all()
+    for col in batched.select_dtypes("category").columns.drop("INCOME_BRACKET"):
+        shares = batched[col].value_counts(normalize=True)
+        assert (shares.drop("Other", errors="ignore") >= 0.01).all(), col
+    assert batched.to_csv(index=False) == expected.to_csv(index=False)
+
+def test_transform_with_saved_params_matches_fit(raw_df, tmp_path):
+    df, params = fit_clean_data(raw_df.copy())
+    path = tmp_path / "clean_params.json"
+    save_params(params, str(path))
+    assert load_params(str(path)) == params
+    pd.testing.assert_frame_equal(transform_clean_data(raw_df.copy(), load_params(str(path))), df)
+
+def test_transform_reuses_fitted_params_on_a_new_extract(raw_df):
+    df, params = fit_clean_data(raw_df.copy())
+    # Fills, levels, bounds and bracket edges all come from the fit, so a part cleans like the whole
+    part = raw_df.iloc[-2000:].copy()
+    pd.testing.assert_frame_equal(transform_clean_data(part, params), df.iloc[-2000:])
+
+def test_transform_rejects_params_of_another_version(raw_df):
+    params = dict(fit_clean_data(raw_df.copy())[1], version=PARAMS_VERSION - 1)
+    with pytest.raises(ValueError, match="refit"):
+        transform_clean_data(raw_df.copy(), params)
+
+def _rank(values, value):
+    return np.searchsorted(np.sort(values), value) / len(values)
+
+def test_streaming_fit_matches_the_in_memory_fit(raw_path, raw_df):
+    df, params = fit_clean_data(raw_df.copy())
+    streamed = fit_clean_data_streaming(raw_path, chunksize=3000)
+    # Counts are exact; medians, bounds and edges come from sketches and land within a small rank error
+    for key in ["version", "drop_columns", "text_columns", "categories"]:
+        assert streamed[key] == params[key], key
+    for col in params["text_columns"]:
+        assert streamed["fills"][col] == params["fills"][col]
+    filled = raw_df.fillna(params["fills"]).assign(AGE_YEARS=-raw_df["DAYS_BIRTH"] / 365.25)
+    for col in ["AMT_ANNUITY", "AMT_GOODS_PRICE", "EXT_SOURCE_1"]:
+        assert abs(_rank(raw_df[col].dropna(), streamed["fills"][col]) - 0.5) < 0.01, col
+    for col in WINSOR_COLUMNS:
+        for q, bound in zip([0.01, 0.99], streamed["winsor_bounds"][col]):
+            assert abs(_rank(filled[col], bound) - q) < 0.01, col
+    np.testing.assert_allclose(streamed["income_bracket_edges"], params["income_bracket_edges"], rtol=0.02)
+
+def test_streamed_output_matches_transform(raw_path, raw_df, tmp_path):
+    params = fit_clean_data(raw_df.copy())[1]
+    csv_path = tmp_path / "clean.csv"
+    stream_clean_data(raw_path, params, chunksize=3000, unseen_labels=False,
+                      parquet_path=str(tmp_path / "clean.parquet"), csv_path=str(csv_path))
+    expected = transform_clean_data(raw_df.copy(), params)
+    assert csv_path.read_text(encoding="utf-8") == expected.to_csv(index=False)
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "clean.parquet"), expected, check_dtype=False,
+                                  check_categorical=False)
+
+def test_workers_do_not_change_the_output(raw_path, raw_df, tmp_path):
+    params = fit_clean_data_streaming(raw_path, chunksize=3000)
+    assert fit_clean_data_streaming(raw_path, chunksize=3000, workers=2) == params
+    outputs = {}
+    for workers in (1, 2):
+        out = tmp_path / str(workers)
+        out.mkdir()
+        stream_clean_data(raw_path, params, chunksize=3000, workers=workers,
+                          parquet_path=str(out / "clean.parquet"), csv_path=str(out / "clean.csv"))
+        write_csv(raw_df, str(out / "raw.csv"), workers)
+        outputs[workers] = [(out / name).read_bytes() for name in ("clean.csv", "clean.parquet", "raw.csv")]
+    assert outputs[2] == outputs[1]
+    assert outputs[1][2] == raw_df.to_csv(index=False).encode("utf-8")
+
+def test_column_groups_on_workers_match_one_process(raw_df):
+    df, params = fit_clean_data(raw_df)
+    grouped, grouped_params = fit_clean_data(raw_df, workers=3)
+    pd.testing.assert_frame_equal(grouped, df)
+    assert grouped_params == params
+    pd.testing.assert_frame_equal(transform_clean_data(raw_df, params, workers=3), df)
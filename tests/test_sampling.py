@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import ALL, pandas_mask
+from utils import sampling
+from utils.filters import FILTER_COLUMNS, FilterEngine
+from utils.sampling import RowOrder, StratifiedSamples, SliceView, difference, sample_rows
+from utils.synth import synthetic_chunk
+
+STATES = [ALL, dict(ALL, gender="F"), dict(ALL, age_range=(25, 60), employment_years=(0, 20))]
+
+class _Dataset:
+    # Stands in for the shared dataset: the test frame is the one sample rows point into
+    def owns(self, df):
+        return True
+
+@pytest.fixture(scope="module")
+def big_df():
+    return synthetic_chunk(400_000, rng=np.random.default_rng(1))
+
+@pytest.fixture
+def samples(big_df, monkeypatch):
+    samples = StratifiedSamples(big_df["TARGET"].to_numpy(), RowOrder(len(big_df), "tests").order, big_df.shape[1])
+    monkeypatch.setattr(sampling, "get_samples", lambda: samples)
+    monkeypatch.setattr(sampling, "get_lazy_dataset", lambda: _Dataset())
+    return samples
+
+def _within(estimate, truth):
+    # Zero-width intervals are fine where the TARGET stratification pins the answer down exactly
+    assert not estimate.exact
+    assert abs(estimate.value - truth) <= estimate.half_width + 1e-9 * abs(truth), (estimate, truth)
+
+@pytest.mark.parametrize("filters", STATES)
+def test_estimates_cover_the_exact_values(big_df, samples, filters):
+    view = SliceView(big_df, filters)
+    assert view.approximate
+    sliced = big_df[pandas_mask(big_df, filters)]
+    defaulters = sliced[sliced["TARGET"] == 1]
+    _within(view.count(where={"TARGET": 1}), len(defaulters))
+    _within(view.mean("TARGET"), sliced["TARGET"].mean())
+    _within(view.mean("AMT_CREDIT"), sliced["AMT_CREDIT"].mean())
+    _within(view.mean(lambda f: f["EXT_SOURCE_2"] < 0.3), (sliced["EXT_SOURCE_2"] < 0.3).mean())
+    _within(view.median("AMT_INCOME_TOTAL", where={"TARGET": 1}), defaulters["AMT_INCOME_TOTAL"].median())
+    gap = difference(view.mean("AMT_CREDIT", where={"TARGET": 1}), view.mean("AMT_CREDIT", where={"TARGET": 0}))
+    _within(gap, defaulters["AMT_CREDIT"].mean() - sliced.loc[sliced["TARGET"] == 0, "AMT_CREDIT"].mean())
+
+def test_sample_frame_is_the_sampled_slice(big_df, samples):
+    filters = STATES[1]
+    view = SliceView(big_df, filters)
+    rows = samples.rows(view.sample_size)[0]
+    expected = big_df.take(rows)
+    expected = expected[pandas_mask(expected, filters)]
+    assert view.frame.index.equals(expected.index)
+    assert dict(view.cache_key)["sample"] == view.sample_size
+
+def test_stratified_samples_keep_the_default_mix(big_df, samples):
+    target = big_df["TARGET"].to_numpy()
+    for size in samples.sizes:
+        rows = samples.rows(size)[0]
+        assert abs(len(rows) - size) <= len(samples.strata)
+        assert abs(target[rows].mean() - target.mean()) < 1 / size + 1e-4
+
+def _values(series):
+    return series.array.codes if isinstance(series.dtype, pd.CategoricalDtype) else series.to_numpy()
+
+def test_wide_sample_columns_stay_cached(big_df, samples):
+    size = samples.sizes[-1]
+    wide, engine = samples.frame(big_df, size)
+    narrow, same_engine = samples.frame(big_df[["AMT_CREDIT"] + FILTER_COLUMNS], size)
+    again, _ = samples.frame(big_df, size)
+    assert same_engine is engine
+    for col in big_df.columns:
+        assert np.shares_memory(_values(again[col]), _values(wide[col])), col
+    assert np.shares_memory(_values(narrow["AMT_CREDIT"]), _values(wide["AMT_CREDIT"]))
+    assert again.index is wide.index
+
+def _in_order(order, positions, n):
+    # Reference: walk the whole permutation and keep the first n positions of the set
+    return order[np.isin(order, positions)][:n]
+
+def test_row_order_is_fixed_per_version():
+    order = RowOrder(10_000, "v1")
+    np.testing.assert_array_equal(RowOrder(10_000, "v1").order, order.order)
+    assert not np.array_equal(RowOrder(10_000, "v2").order, order.order)
+    np.testing.assert_array_equal(np.sort(order.order), np.arange(10_000))
+    assert not order.order.flags.writeable
+
+def test_head_takes_the_first_matching_rows():
+    order = RowOrder(100_000, "v1")
+    rows = np.flatnonzero(np.random.default_rng(0).random(100_000) < 0.01)
+    np.testing.assert_array_equal(order.head(None, 50), order.order[:50])
+    np.testing.assert_array_equal(order.head(rows, 300), _in_order(order.order, rows, 300))
+    even = lambda candidates: candidates % 2 == 0
+    np.testing.assert_array_equal(order.head(rows, 300, even), _in_order(order.order, rows[rows % 2 == 0], 300))
+    # Fewer matches than asked for: the walk ends at the end of the permutation with all of them
+    assert sorted(order.head(rows[:40], 100)) == list(rows[:40])
+    assert len(order.head(rows[:0], 100)) == 0
+
+@pytest.mark.parametrize("filters", [None] + STATES)
+def test_sample_rows_is_the_head_of_the_filtered_slice(big_df, monkeypatch, filters):
+    df = big_df[["AMT_CREDIT", "EXT_SOURCE_1"] + FILTER_COLUMNS].copy()
+    df.loc[df.index[::3], "EXT_SOURCE_1"] = np.nan
+    order = RowOrder(len(df), "tests")
+    monkeypatch.setattr(sampling, "get_row_order", lambda: order)
+    monkeypatch.setattr(sampling, "get_lazy_dataset", lambda: _Dataset())
+    monkeypatch.setattr(sampling, "filter_rows", lambda frame, state: FilterEngine(frame).rows(state))
+    sample = sample_rows(df, filters, 2000, dropna=["EXT_SOURCE_1"])
+    keep = df["EXT_SOURCE_1"].notna().to_numpy()
+    if filters is not None:
+        keep = keep & pandas_mask(df, filters)
+    assert sample.index.equals(df.index[_in_order(order.order, np.flatnonzero(keep), 2000)])
+    assert sample_rows(df, filters, 2000, dropna=["EXT_SOURCE_1"]).index.equals(sample.index)
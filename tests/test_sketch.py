@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.sketch import QuantileSketch
+
+QS = np.linspace(0.01, 0.99, 99)
+
+@pytest.fixture(scope="module")
+def values():
+    return np.random.default_rng(0).lognormal(12, 0.5, 500_000)
+
+def _rank_error(values, answers):
+    # Largest gap between the requested quantile and the rank the answer actually has in the data
+    ranks = np.searchsorted(np.sort(values), answers) / len(values)
+    return np.abs(ranks - QS).max()
+
+def test_exact_before_compaction(values):
+    sketch = QuantileSketch(k=4096).update(values[:1000])
+    np.testing.assert_allclose(sketch.quantile(QS), pd.Series(values[:1000]).quantile(QS), rtol=1e-12)
+
+@pytest.mark.parametrize("k", [128, 1024])
+def test_streamed_rank_error_within_bound(values, k):
+    sketch = QuantileSketch(k)
+    for part in np.array_split(values, 50):
+        sketch.update(part)
+    assert sketch.count == len(values)
+    assert _rank_error(values, sketch.quantile(QS)) <= 4 / k
+
+@pytest.mark.parametrize("k", [128, 1024])
+def test_merged_rank_error_within_bound(values, k):
+    parts = [QuantileSketch(k).update(part) for part in np.array_split(values, 7)]
+    sketch = parts[0]
+    for part in parts[1:]:
+        sketch.merge(part)
+    assert _rank_error(values, sketch.quantile(QS)) <= 4 / k
+
+def test_min_max_and_weighted_values(values):
+    sketch = QuantileSketch(k=256).update(values).update([np.nan, np.nan])
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+    # A fill value standing in for as many missing entries as there are values takes the lower half
+    fill = values.min() - 1
+    sketch.update([fill], weight=len(values))
+    assert sketch.count == 2 * len(values)
+    assert sketch.quantile(0.25) == fill
+    assert sketch.quantile(0.75) > fill
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils.columns import open_columns
+from utils.synth import (FILLS, IMPUTED, INCOME_BRACKET_EDGES, SCHEMA, WINSOR_BOUNDS, synthetic_chunk,
+                         write_synthetic_data)
+
+@pytest.fixture(scope="module")
+def chunk():
+    return synthetic_chunk(200_000, rng=np.random.default_rng(0))
+
+def test_chunk_has_the_cleaned_schema(chunk):
+    assert list(chunk.columns) == list(SCHEMA)
+    for col, dtype in SCHEMA.items():
+        if dtype == "category":
+            assert isinstance(chunk[col].dtype, pd.CategoricalDtype), col
+        else:
+            assert chunk[col].dtype == dtype, col
+    assert chunk.notna().all().all()
+    seeded = synthetic_chunk(1000, rng=np.random.default_rng(5))
+    pd.testing.assert_frame_equal(synthetic_chunk(1000, rng=np.random.default_rng(5)), seeded)
+    assert synthetic_chunk(10, start=500)["SK_ID_CURR"].iloc[0] == chunk["SK_ID_CURR"].iloc[0] + 500
+
+def test_chunk_looks_cleaned(chunk):
+    assert 0.07 < chunk["TARGET"].mean() < 0.09
+    for col, (low, high) in WINSOR_BOUNDS.items():
+        assert chunk[col].between(low, high).all(), col
+    brackets = np.searchsorted(INCOME_BRACKET_EDGES, chunk["AMT_INCOME_TOTAL"], side="left")
+    np.testing.assert_array_equal(chunk["INCOME_BRACKET"].cat.codes, brackets)
+    # Imputed shares: the fill value shows up at least as often as the raw values were missing
+    for col, share in IMPUTED.items():
+        assert (chunk[col] == FILLS[col]).mean() >= 0.9 * share, col
+
+def test_written_files_hold_the_seeded_chunks(tmp_path):
+    paths = {"parquet_path": str(tmp_path / "clean.parquet"), "csv_path": str(tmp_path / "clean.csv"),
+             "meta_path": str(tmp_path / "meta.json"), "columns_dir": str(tmp_path / "columns")}
+    written = write_synthetic_data(5000, seed=3, chunk_rows=2000, formats=["parquet", "csv", "columns"], **paths)
+    expected = pd.concat([synthetic_chunk(min(2000, 5000 - start), start, np.random.default_rng([3, i]))
+                          for i, start in enumerate(range(0, 5000, 2000))], ignore_index=True)
+    pd.testing.assert_frame_equal(pd.read_parquet(paths["parquet_path"]), expected)
+    assert open(paths["csv_path"], encoding="utf-8").read() == expected.to_csv(index=False)
+    store = open_columns(os.path.basename(written[2]), paths["columns_dir"])
+    assert store.manifest["rows"] == 5000
+    np.testing.assert_array_equal(store.column("SK_ID_CURR"), expected["SK_ID_CURR"])
+    with pytest.raises(ValueError, match="Unknown format"):
+        write_synthetic_data(10, formats=["feather"], **paths)
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+# path -> ((mtime, size), digest), so unchanged files are hashed once
+_source_digests = {}
+_source_lock = threading.Lock()
+
+def source_fingerprint(path):
+    """Digest of a source file's bytes, for cache keys that must change when the code does."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _source_lock:
+        entry = _source_digests.get(path)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+    with open(path, "rb") as f:
+        digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    with _source_lock:
+        _source_digests[path] = (stamp, digest)
+    return digest
+
+def sizeof(value):
+    """Approximate payload size in bytes (NumPy/pandas `nbytes`, str/bytes length)."""
+    if value is None:
+        return 0
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+class _Pending:
+    # A value being computed by one thread, handed to the others asking for it
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = _MISSING
+
+class LRUCache:
+    """Thread-safe least-recently-used cache bounded by the total size of its values.
+
+    Shared across Streamlit sessions, so every access goes through one lock.
+    A value larger than the whole budget is returned to the caller but not kept.
+    `get_or_compute` is single-flight: while a key is being computed, other
+    threads asking for it wait for that result instead of computing it again.
+    """
+
+    def __init__(self, max_bytes, sizeof=sizeof):
+        self.max_bytes = int(max_bytes)
+        self._sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> _Pending, while one thread computes it
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Cached value of `key`, else `compute()` — called once however many threads ask meanwhile.
+
+        `compute` must not ask this cache for the same key. If it raises, the
+        error goes to its caller and the waiting threads try again.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            pending = self._pending.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._pending[key] = _Pending()
+        if not leader:
+            pending.done.wait()
+            if pending.value is _MISSING:
+                return self.get_or_compute(key, compute)
+            return pending.value  # even when it was too large to keep
+        try:
+            pending.value = compute()
+            self.put(key, pending.value)
+            return pending.value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
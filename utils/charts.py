@@ -0,0 +1,344 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+from utils.cache import LRUCache, source_fingerprint
+
+# Most individual points a box/violin trace carries (outliers or "all" points)
+MAX_POINTS = 500
+
+# Memory budget for summary statistics keyed by filter state
+STATS_CACHE_MB = 32
+
+# Scatter plots with more rows than this are rasterized into a 2D grid
+RASTER_THRESHOLD = int(os.environ.get("DASHBOARD_RASTER_THRESHOLD", "20000"))
+RASTER_BINS = 120
+
+def _label(labels, col):
+    return (labels or {}).get(col, col)
+
+def _levels(series):
+    """Observed levels, in category order for categoricals and sorted otherwise."""
+    present = series.dropna().unique().tolist()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        present = set(present)
+        return [level for level in series.cat.categories if level in present]
+    return sorted(present)
+
+def _split(df, color):
+    """(level, row mask) per level of `color`, or a single all-rows group."""
+    if color is None:
+        return [(None, None)]
+    keys = df[color].to_numpy()
+    return [(level, keys == level) for level in _levels(df[color])]
+
+def _is_discrete(values, nbins):
+    # Integer codes with few levels (e.g. TARGET) are counted per value, like categories
+    if not pd.api.types.is_numeric_dtype(values.dtype):
+        return True
+    return pd.api.types.is_integer_dtype(values.dtype) and values.nunique() <= nbins
+
+def histogram(df, x, nbins=30, color=None, title=None, labels=None, color_discrete_sequence=None,
+              barmode="relative", opacity=None, text_auto=False):
+    """Pre-binned replacement for `px.histogram`.
+
+    Counts are computed here with NumPy (equal-width bins over the data range,
+    `nbins` of them) or `value_counts` for categorical x, so the figure carries
+    one bar per bin and colour level instead of every row.
+    """
+    values = df[x]
+    discrete = _is_discrete(values, nbins)
+    if not discrete:
+        finite = values.to_numpy(dtype="float64", na_value=np.nan)
+        finite = finite[~np.isnan(finite)]
+        edges = np.histogram_bin_edges(finite, bins=nbins) if len(finite) else np.array([0.0, 1.0])
+        centers = (edges[:-1] + edges[1:]) / 2
+        widths = np.diff(edges)
+    else:
+        categories = _levels(values)
+
+    fig = go.Figure()
+    palette = color_discrete_sequence or []
+    for i, (level, rows) in enumerate(_split(df, color)):
+        part = values if rows is None else values[rows]
+        if discrete:
+            counts = part.value_counts().reindex(categories, fill_value=0)
+            bar = go.Bar(x=list(categories), y=counts.to_numpy())
+        else:
+            part = part.to_numpy(dtype="float64", na_value=np.nan)
+            counts, _ = np.histogram(part[~np.isnan(part)], bins=edges)
+            bar = go.Bar(x=centers, y=counts, width=widths,
+                         customdata=np.column_stack([edges[:-1], edges[1:]]),
+                         hovertemplate="%{customdata[0]:.4g} – %{customdata[1]:.4g}<br>count=%{y}<extra></extra>")
+        if level is not None:
+            bar.name = str(level)
+            bar.legendgroup = str(level)
+        if palette:
+            bar.marker.color = palette[i % len(palette)]
+        if opacity is not None:
+            bar.opacity = opacity
+        if text_auto:
+            bar.texttemplate = "%{y}"
+        fig.add_trace(bar)
+
+    fig.update_layout(
+        title=title, barmode=barmode, bargap=0 if not discrete else None,
+        legend_title_text=_label(labels, color) if color else None,
+        showlegend=color is not None,
+    )
+    fig.update_xaxes(title_text=_label(labels, x))
+    fig.update_yaxes(title_text="count")
+    return fig
+
+def counts_pie(df, names, title=None, color_discrete_sequence=None):
+    """`px.pie(df, names=...)` from pre-computed counts."""
+    counts = df[names].value_counts()
+    counts = counts[counts > 0]
+    fig = go.Figure(go.Pie(labels=counts.index.astype(str).tolist(), values=counts.to_numpy()))
+    if color_discrete_sequence:
+        fig.update_traces(marker_colors=color_discrete_sequence)
+    fig.update_layout(title=title)
+    return fig
+
+@st.cache_resource(show_spinner=False)
+def _stats_cache():
+    return LRUCache(STATS_CACHE_MB * 2**20)
+
+def _cached(cache_key, spec, compute):
+    # Summaries depend only on (filter state, chart spec) and this module's code; None disables caching
+    if cache_key is None:
+        return compute()
+    return _stats_cache().get_or_compute((cache_key, source_fingerprint(__file__)) + spec, compute)
+
+def _finite(values):
+    values = np.asarray(values, dtype="float64")
+    return values[~np.isnan(values)]
+
+def box_stats(values, max_points=MAX_POINTS, points="outliers", seed=0):
+    """Quartiles, 1.5×IQR whiskers, mean and a capped, seeded sample of points."""
+    v = _finite(values)
+    if len(v) == 0:
+        return None
+    q1, median, q3 = np.percentile(v, [25, 50, 75])
+    iqr = q3 - q1
+    low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inside = v[(v >= low) & (v <= high)]
+    shown = v if points == "all" else v[(v < low) | (v > high)]
+    if len(shown) > max_points:
+        shown = np.random.default_rng(seed).choice(shown, size=max_points, replace=False)
+    return {
+        "n": len(v), "q1": q1, "median": median, "q3": q3, "mean": v.mean(),
+        "lowerfence": inside.min(), "upperfence": inside.max(), "points": shown,
+    }
+
+def kde_curve(values, grid_points=200):
+    """Gaussian KDE (Silverman bandwidth, as plotly's violin uses) via binning + convolution."""
+    v = _finite(values)
+    if len(v) < 2:
+        return None
+    q1, q3 = np.percentile(v, [25, 75])
+    spread = min(v.std(ddof=1), (q3 - q1) / 1.349) or v.std(ddof=1)
+    bw = 1.059 * spread * len(v) ** -0.2
+    if not bw > 0:
+        return None
+    lo, hi = v.min() - 2 * bw, v.max() + 2 * bw
+    edges = np.linspace(lo, hi, 1025)
+    counts, _ = np.histogram(v, bins=edges)
+    dx = edges[1] - edges[0]
+    half = min(int(np.ceil(4 * bw / dx)), len(counts) - 1)
+    offsets = np.arange(-half, half + 1) * dx
+    kernel = np.exp(-0.5 * (offsets / bw) ** 2)
+    density = np.convolve(counts, kernel, mode="same") / (len(v) * bw * np.sqrt(2 * np.pi))
+    centers = (edges[:-1] + edges[1:]) / 2
+    grid = np.linspace(lo, hi, grid_points)
+    return grid, np.interp(grid, centers, density)
+
+def _group_stats(df, y, x, color, points, max_points):
+    """{(x level, colour level): box stats} over the observed combinations."""
+    values = df[y].to_numpy(dtype="float64", na_value=np.nan)
+    stats = {}
+    for x_level, x_rows in _split(df, x):
+        for c_level, c_rows in _split(df, color):
+            if x_rows is None or c_rows is None:
+                rows = c_rows if x_rows is None else x_rows
+            else:
+                rows = x_rows & c_rows
+            summary = box_stats(values if rows is None else values[rows], max_points, points)
+            if summary is not None:
+                stats[(x_level, c_level)] = summary
+    return stats
+
+def box(df, y, x=None, color=None, title=None, labels=None, color_discrete_sequence=None,
+        max_points=MAX_POINTS, cache_key=None):
+    """`px.box` from precomputed quartiles/whiskers plus a capped outlier sample."""
+    spec = ("box", y, x, color, max_points)
+    stats = _cached(cache_key, spec, lambda: _group_stats(df, y, x, color, "outliers", max_points))
+
+    fig = go.Figure()
+    palette = color_discrete_sequence or []
+    c_levels = list(dict.fromkeys(c for _, c in stats))
+    for i, c_level in enumerate(c_levels):
+        cells = [(x_level, summary) for (x_level, c), summary in stats.items() if c == c_level]
+        xs = [x_level if x is not None else _label(labels, y) for x_level, _ in cells]
+        summaries = [summary for _, summary in cells]
+        name = str(c_level) if c_level is not None else _label(labels, y)
+        trace = go.Box(
+            x=xs, name=name, offsetgroup=name, legendgroup=name, boxpoints=False,
+            **{field: [summary[field] for summary in summaries]
+               for field in ("q1", "median", "q3", "mean", "lowerfence", "upperfence")},
+        )
+        dots = go.Scatter(
+            x=[xv for xv, summary in zip(xs, summaries) for _ in summary["points"]],
+            y=np.concatenate([summary["points"] for summary in summaries]),
+            mode="markers", name=name, offsetgroup=name, legendgroup=name, showlegend=False,
+            marker=dict(size=4),
+        )
+        if palette:
+            trace.marker.color = palette[i % len(palette)]
+            dots.marker.color = palette[i % len(palette)]
+        fig.add_trace(trace)
+        fig.add_trace(dots)
+
+    fig.update_layout(title=title, boxmode="group", scattermode="group",
+                      showlegend=color is not None,
+                      legend_title_text=_label(labels, color) if color else None)
+    fig.update_xaxes(title_text=_label(labels, x) if x else None)
+    fig.update_yaxes(title_text=_label(labels, y))
+    return fig
+
+def violin(df, y, x=None, title=None, labels=None, box=True, points="outliers",
+           color_discrete_sequence=None, max_points=MAX_POINTS, cache_key=None):
+    """`px.violin` from a server-side KDE, drawn as filled outlines around a precomputed box.
+
+    Plotly's Violin trace only computes its density in the browser from raw
+    samples, so the outline is a filled scatter and `points` is a capped sample.
+    """
+    def compute():
+        out = {}
+        for level, rows in _split(df, x):
+            values = df[y].to_numpy(dtype="float64", na_value=np.nan)
+            values = values if rows is None else values[rows]
+            out[level] = (box_stats(values, max_points, points), kde_curve(values))
+        return out
+
+    summaries = _cached(cache_key, ("violin", y, x, points, max_points), compute)
+    levels = list(summaries)
+    numeric = all(isinstance(level, (int, float, np.number)) for level in levels)
+    positions = levels if numeric else list(range(len(levels)))
+
+    fig = go.Figure()
+    palette = color_discrete_sequence or ["#636EFA"]
+    for i, (pos, level) in enumerate(zip(positions, levels)):
+        stats, curve = summaries[level]
+        if stats is None:
+            continue
+        colour = palette[i % len(palette)]
+        if curve is not None:
+            grid, density = curve
+            half = density / density.max() * 0.4
+            fig.add_trace(go.Scatter(
+                x=np.concatenate([pos + half, (pos - half)[::-1]]), y=np.concatenate([grid, grid[::-1]]),
+                fill="toself", mode="lines", line=dict(color=colour, width=1), opacity=0.6,
+                name=str(level), hoverinfo="skip", showlegend=False,
+            ))
+        if box:
+            fig.add_trace(go.Box(
+                x=[pos], q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+                lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]], mean=[stats["mean"]],
+                width=0.1, boxpoints=False, marker_color=colour, name=str(level), showlegend=False,
+            ))
+        if points and len(stats["points"]):
+            jitter = np.random.default_rng(i).uniform(-0.15, 0.15, len(stats["points"]))
+            fig.add_trace(go.Scatter(x=pos + jitter, y=stats["points"], mode="markers", opacity=0.5,
+                                     marker=dict(size=3, color=colour), showlegend=False, name=str(level)))
+
+    fig.update_layout(title=title)
+    fig.update_xaxes(title_text=_label(labels, x) if x else None, tickvals=positions,
+                     ticktext=[str(level) if x else _label(labels, y) for level in levels])
+    fig.update_yaxes(title_text=_label(labels, y))
+    return fig
+
+def _raster(df, x, y, rows, x_edges, y_edges):
+    xs = df[x].to_numpy(dtype="float64", na_value=np.nan)
+    ys = df[y].to_numpy(dtype="float64", na_value=np.nan)
+    if rows is not None:
+        xs, ys = xs[rows], ys[rows]
+    keep = ~(np.isnan(xs) | np.isnan(ys))
+    counts, _, _ = np.histogram2d(xs[keep], ys[keep], bins=[x_edges, y_edges])
+    return counts.T  # heatmap z is indexed [y][x]
+
+def _edges(df, col, bins):
+    values = _finite(df[col].to_numpy(dtype="float64", na_value=np.nan))
+    if len(values) == 0:
+        return np.linspace(0.0, 1.0, bins + 1)
+    return np.histogram_bin_edges(values, bins=bins)
+
+def _rgba(colour, alpha):
+    colour = colour.lstrip("#")
+    r, g, b = (int(colour[i:i + 2], 16) for i in (0, 2, 4))
+    return f"rgba({r},{g},{b},{alpha})"
+
+def density_heatmap(df, x, y, nbinsx=50, nbinsy=50, title=None, labels=None,
+                    color_continuous_scale="Viridis", cache_key=None):
+    """`px.density_heatmap` with the 2D counts computed here over every row."""
+    def compute():
+        x_edges, y_edges = _edges(df, x, nbinsx), _edges(df, y, nbinsy)
+        return x_edges, y_edges, _raster(df, x, y, None, x_edges, y_edges)
+
+    x_edges, y_edges, counts = _cached(cache_key, ("density", x, y, nbinsx, nbinsy), compute)
+    fig = go.Figure(go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2, z=counts.astype("float32"),
+        colorscale=color_continuous_scale, colorbar=dict(title="count"),
+    ))
+    fig.update_layout(title=title)
+    fig.update_xaxes(title_text=_label(labels, x))
+    fig.update_yaxes(title_text=_label(labels, y))
+    return fig
+
+def scatter(df, x, y, color=None, title=None, labels=None, opacity=None, color_discrete_sequence=None,
+            threshold=None, bins=RASTER_BINS, cache_key=None):
+    """`px.scatter` that switches to a rasterized density image above `threshold` rows.
+
+    Points are binned into a `bins`×`bins` grid per colour level (e.g. each
+    TARGET class) and drawn as stacked heatmaps with empty cells transparent,
+    so the figure size no longer depends on the number of rows.
+    """
+    threshold = RASTER_THRESHOLD if threshold is None else threshold
+    if len(df) <= threshold:
+        return px.scatter(df, x=x, y=y, color=color, title=title, labels=labels, opacity=opacity,
+                          color_discrete_sequence=color_discrete_sequence)
+
+    def compute():
+        x_edges, y_edges = _edges(df, x, bins), _edges(df, y, bins)
+        layers = [(level, _raster(df, x, y, rows, x_edges, y_edges)) for level, rows in _split(df, color)]
+        return x_edges, y_edges, layers
+
+    x_edges, y_edges, layers = _cached(cache_key, ("raster", x, y, color, bins), compute)
+    palette = color_discrete_sequence or px.colors.qualitative.Plotly
+    x_mid, y_mid = (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
+
+    fig = go.Figure()
+    for i, (level, counts) in enumerate(layers):
+        colour = palette[i % len(palette)]
+        nonzero = counts[counts > 0]
+        # Saturate the densest 1% of cells so sparse regions stay visible; empty cells are transparent
+        zmax = max(float(np.percentile(nonzero, 99)), 1.0) if len(nonzero) else 1.0
+        name = str(level) if level is not None else _label(labels, y)
+        fig.add_trace(go.Heatmap(
+            x=x_mid, y=y_mid, z=counts.astype("float32"), name=name, showscale=False, zsmooth=False,
+            zmin=0, zmax=zmax, colorscale=[[0, _rgba(colour, 0.0)], [1e-6, _rgba(colour, 0.25)], [1, _rgba(colour, 1.0)]],
+            opacity=opacity, hovertemplate=f"{name}: %{{z:.0f}} rows<extra></extra>",
+        ))
+        if level is not None:
+            # Legend entry for the layer (heatmaps have none of their own)
+            fig.add_trace(go.Scatter(x=[None], y=[None], mode="markers", name=name,
+                                     marker=dict(color=colour, size=10)))
+
+    fig.update_layout(title=title, legend_title_text=_label(labels, color) if color else None,
+                      showlegend=color is not None)
+    fig.update_xaxes(title_text=_label(labels, x))
+    fig.update_yaxes(title_text=_label(labels, y))
+    return fig
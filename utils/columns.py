@@ -0,0 +1,194 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+COLUMNS_DIR = "data/columns"
+
+# Bump when the on-disk layout changes
+LAYOUT_VERSION = 1
+
+# One empty file per process reading a store, named by its pid
+READERS_DIR = "readers"
+
+def _safe_name(col):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in col)
+
+def write_columns(df, version, directory=COLUMNS_DIR, extra=None):
+    """Write `df` as one `.npy` file per column under `directory/<version>/`.
+
+    Numeric columns are saved as-is and categoricals as their integer codes,
+    with categories and missing counts in `manifest.json`. Files go to a temporary directory
+    that is renamed into place, so concurrent builders never expose a half
+    written store. Other versions no process still reads are removed afterwards.
+    """
+    writer = ColumnWriter(version, len(df), directory)
+    writer.append(df)
+    return writer.close(extra)
+
+class ColumnWriter:
+    """`write_columns` one chunk at a time, for tables larger than memory.
+
+    The row count is fixed up front and every chunk must have the columns and
+    dtypes of the first (categoricals with the same categories). Chunks are
+    copied into memory-mapped `.npy` files, so memory depends on the chunk size.
+    """
+
+    def __init__(self, version, rows, directory=COLUMNS_DIR):
+        self.directory = directory
+        self.version = version
+        self.rows = int(rows)
+        self.final = os.path.join(directory, version)
+        self.tmp = f"{self.final}.tmp-{os.getpid()}"
+        os.makedirs(self.tmp, exist_ok=True)
+        self.entries = None
+        self.arrays = {}
+        self.dtypes = {}
+        self.written = 0
+
+    def _open(self, df):
+        self.entries = []
+        for col in df.columns:
+            s = df[col]
+            entry = {"name": col, "file": f"{_safe_name(col)}.npy", "nulls": 0}
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                entry["categories"] = s.cat.categories.tolist()
+                entry["ordered"] = bool(s.cat.ordered)
+                dtype = s.array.codes.dtype
+            elif s.dtype.kind in "biuf":
+                dtype = s.dtype
+            else:
+                raise ValueError(f"Column {col!r} has dtype {s.dtype}; only numeric and categorical columns can be mapped")
+            self.entries.append(entry)
+            self.dtypes[col] = s.dtype
+            self.arrays[col] = np.lib.format.open_memmap(os.path.join(self.tmp, entry["file"]), mode="w+",
+                                                         dtype=dtype, shape=(self.rows,))
+
+    def append(self, df):
+        if self.entries is None:
+            self._open(df)
+        if list(df.columns) != [entry["name"] for entry in self.entries]:
+            raise ValueError("Chunk columns differ from the first chunk's")
+        stop = self.written + len(df)
+        if stop > self.rows:
+            raise ValueError(f"More than the {self.rows:,} rows announced")
+        for entry in self.entries:
+            col = entry["name"]
+            s = df[col]
+            if s.dtype != self.dtypes[col]:
+                raise ValueError(f"Column {col!r} is {s.dtype} in this chunk, {self.dtypes[col]} in the first")
+            entry["nulls"] += int(s.isna().sum())
+            self.arrays[col][self.written:stop] = s.array.codes if "categories" in entry else s.to_numpy()
+        self.written = stop
+
+    def close(self, extra=None):
+        """Publish the store (all announced rows must have been appended) and return its path."""
+        if self.written != self.rows:
+            raise ValueError(f"{self.written:,} of {self.rows:,} rows written")
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+        manifest = {"layout": LAYOUT_VERSION, "rows": self.rows, "columns": self.entries or [], **(extra or {})}
+        with open(os.path.join(self.tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        try:
+            os.rename(self.tmp, self.final)
+        except OSError:
+            shutil.rmtree(self.tmp, ignore_errors=True)  # another process finished first
+        prune_columns(self.version, self.directory)
+        return self.final
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _live_readers(path):
+    readers = os.path.join(path, READERS_DIR)
+    if not os.path.isdir(readers):
+        return []
+    return [name for name in os.listdir(readers) if name.isdigit() and _pid_alive(int(name))]
+
+def prune_columns(keep, directory=COLUMNS_DIR):
+    """Remove column stores other than `keep` that no running process reads.
+
+    Readers register themselves when they open a store and columns are
+    mapped on first use, so a version is only deleted once every process
+    that opened it has exited. Temporary builds are only removed when the
+    process that started them is gone.
+    """
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name == keep or not os.path.isdir(path):
+            continue
+        base, tmp, pid = name.rpartition(".tmp-")
+        if tmp:
+            if pid.isdigit() and _pid_alive(int(pid)):
+                continue  # another writer's build in progress
+        elif _live_readers(path):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+class ColumnStore:
+    """Read-only, memory-mapped view of a directory written by `write_columns`.
+
+    Every process that maps the same files shares their page-cache pages,
+    so the dataset costs RAM once per host instead of once per server process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.entries = {entry["name"]: entry for entry in self.manifest["columns"]}
+        # Keeps `prune_columns` away from this version while the process lives
+        readers = os.path.join(path, READERS_DIR)
+        os.makedirs(readers, exist_ok=True)
+        open(os.path.join(readers, str(os.getpid())), "w").close()
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, name), mmap_mode="r", allow_pickle=False)
+
+    def column(self, col):
+        entry = self.entries[col]
+        values = self._load(entry["file"])
+        if "categories" in entry:
+            dtype = pd.CategoricalDtype(entry["categories"], ordered=entry["ordered"])
+            # Codes were written by write_columns: skip the validation pass that would page in the whole file
+            return pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        return values
+
+    def frame(self, columns=None):
+        """DataFrame over the mapped arrays (one block per column, nothing copied)."""
+        columns = list(self.entries) if columns is None else list(columns)
+        data = {col: self.column(col) for col in columns}
+        return pd.DataFrame(data, index=pd.RangeIndex(self.manifest["rows"]), copy=False)
+
+    def sorted_index(self, col):
+        """(sorted float64 values, row order) of `col`, built on first use and mapped after that."""
+        values_file = os.path.join(self.path, f"{_safe_name(col)}.sorted.npy")
+        order_file = os.path.join(self.path, f"{_safe_name(col)}.order.npy")
+        if not (os.path.exists(values_file) and os.path.exists(order_file)):
+            values = np.asarray(self.column(col), dtype="float64")
+            order = np.argsort(values, kind="stable")  # NaNs sort last
+            order = order.astype(np.int32) if len(order) < 2**31 else order
+            for path, array in ((values_file, values[order]), (order_file, order)):
+                tmp = f"{path}.tmp-{os.getpid()}.npy"
+                np.save(tmp, array, allow_pickle=False)
+                os.replace(tmp, path)
+        return self._load(os.path.basename(values_file)), self._load(os.path.basename(order_file))
+
+def open_columns(version, directory=COLUMNS_DIR):
+    """The column store for `version`, or None if it has not been written."""
+    path = os.path.join(directory, version)
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        return None
+    columns = ColumnStore(path)
+    return columns if columns.manifest.get("layout") == LAYOUT_VERSION else None
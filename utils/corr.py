@@ -0,0 +1,78 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.cache import LRUCache
+
+# Memory budget for per-slice moment matrices
+MOMENTS_CACHE_MB = 64
+
+class Moments:
+    """Sufficient statistics for Pearson correlation between all numeric columns of a slice.
+
+    Keeps pairwise-complete counts, sums, sums of squares and cross products,
+    so any correlation submatrix is derived in O(k²) without rescanning rows
+    and matches `DataFrame.corr()` (pairwise NaN handling included).
+    """
+
+    def __init__(self, df):
+        self.columns = df.select_dtypes(include=np.number).columns.tolist()
+        x = df[self.columns].to_numpy(dtype="float64", na_value=np.nan)
+        present = ~np.isnan(x)
+        # Correlation is shift-invariant: centre each column to keep the sums well conditioned
+        with np.errstate(invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN / empty columns
+            shift = np.nan_to_num(np.nanmean(x, axis=0)) if len(x) else 0.0
+        x = np.where(present, x - shift, 0.0)
+
+        if present.all():
+            # No missing values: one matmul of [1 | X] gives n, column sums and X'X
+            a = np.hstack([np.ones((len(x), 1)), x])
+            gram = a.T @ a
+            k = len(self.columns)
+            self.count = np.full((k, k), gram[0, 0])
+            self.sums = np.repeat(gram[1:, 0][:, None], k, axis=1)
+            self.squares = np.repeat(np.diag(gram)[1:][:, None], k, axis=1)
+            self.cross = gram[1:, 1:]
+        else:
+            # sums[i, j] is the sum of column i over rows where column j is present, etc.
+            mask = present.astype("float64")
+            self.count = mask.T @ mask
+            self.sums = x.T @ mask
+            self.squares = (x * x).T @ mask
+            self.cross = x.T @ x
+
+    @property
+    def nbytes(self):
+        return self.count.nbytes + self.sums.nbytes + self.squares.nbytes + self.cross.nbytes
+
+    def corr(self, columns=None):
+        """Correlation matrix for `columns` (default: all numeric columns) as a DataFrame."""
+        columns = self.columns if columns is None else list(columns)
+        idx = [self.columns.index(c) for c in columns]
+        ix = np.ix_(idx, idx)
+        n = self.count[ix]
+        sx, sy = self.sums[ix], self.sums[ix].T
+        sxx, syy = self.squares[ix], self.squares[ix].T
+        sxy = self.cross[ix]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * sxy - sx * sy
+            var_x, var_y = n * sxx - sx * sx, n * syy - sy * sy
+            r = cov / np.sqrt(var_x * var_y)
+            r[(var_x <= 0) | (var_y <= 0) | (n < 2)] = np.nan
+        r = np.clip(r, -1.0, 1.0)
+        diagonal = np.diag_indices_from(r)
+        r[diagonal] = np.where(np.isnan(r[diagonal]), np.nan, 1.0)
+        return pd.DataFrame(r, index=columns, columns=columns)
+
+@st.cache_resource(show_spinner=False)
+def _moments_cache():
+    return LRUCache(MOMENTS_CACHE_MB * 2**20)
+
+def get_moments(df, cache_key=None):
+    """Moments of `df`, memoized per filter state and column set when `cache_key` is given."""
+    if cache_key is None:
+        return Moments(df)
+    # Pages load different column sets, so the same filter state can mean different frames
+    return _moments_cache().get_or_compute((cache_key, tuple(df.columns)), lambda: Moments(df))
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.filters import CATEGORY_FILTERS, RANGE_FILTERS, filter_rows, load_data
+
+# Numeric columns whose sums / sums of squares are kept per cell
+MEASURES = ["AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY", "AMT_GOODS_PRICE", "AGE_YEARS", "EMPLOYMENT_YEARS"]
+
+# Range filter column -> its bucket dimension in the cube
+BUCKETS = {col: f"{col}_BUCKET" for col in RANGE_FILTERS.values()}
+
+DIMENSIONS = list(CATEGORY_FILTERS.values()) + list(BUCKETS.values()) + ["TARGET"]
+
+def bucket_codes(values):
+    """Integer bucket per value: 2k holds exactly k, 2k+1 holds (k, k+1); NaN -> -1.
+
+    An inclusive integer slider range [a, b] is then exactly the codes 2a..2b.
+    """
+    values = np.asarray(values, dtype="float64")
+    missing = np.isnan(values)
+    floor = np.floor(np.where(missing, 0, values))
+    codes = 2 * floor + (values != floor)
+    return np.where(missing, -1, codes).astype(np.int64)
+
+def _dimension_codes(df):
+    """{dimension: (integer code per row, labels)}; codes index the labels, -1 is missing."""
+    dims = {}
+    for col in CATEGORY_FILTERS.values():
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            dims[col] = (np.asarray(series.array.codes, dtype=np.int64), series.cat.categories)
+        else:
+            codes, labels = pd.factorize(series, sort=True)
+            dims[col] = (codes.astype(np.int64), labels)
+    for col, bucket in BUCKETS.items():
+        codes = bucket_codes(df[col].to_numpy(dtype="float64", na_value=np.nan))
+        # Bucket codes are their own labels: shift them to start at 0
+        low = int(codes[codes >= 0].min()) if (codes >= 0).any() else 0
+        dims[bucket] = (np.where(codes >= 0, codes - low, -1), pd.RangeIndex(low, int(codes.max(initial=low)) + 1))
+    codes, labels = pd.factorize(df["TARGET"], sort=True)
+    dims["TARGET"] = (codes.astype(np.int64), labels)
+    return dims
+
+def _measure_values(df):
+    """(value column names, rows × values float64 matrix) summed into the cells."""
+    names = ["count", "target_sum"]
+    columns = [np.ones(len(df)), df["TARGET"].to_numpy(dtype="float64")]
+    for m in MEASURES:
+        if m not in df.columns:
+            continue
+        values = df[m].to_numpy(dtype="float64", na_value=np.nan)
+        present = ~np.isnan(values)
+        values = np.where(present, values, 0.0)
+        names += [f"{m}_n", f"{m}_sum", f"{m}_sq"]
+        columns += [present.astype("float64"), values, values * values]
+    return names, columns
+
+class AggregateCube:
+    """Count, TARGET sum and AMT_* sums/sums of squares over every filter dimension.
+
+    Default rates and means for any filter state are answered by summing cells.
+    Cells are NumPy arrays: one code array per dimension and a cells × values
+    matrix, so a query is a few integer compares and one masked sum.
+    Category filters always map onto cells; slider ranges do when both ends are
+    whole numbers (always true for the sidebar sliders), otherwise the slice is
+    scanned from the shared dataset and aggregated the same way.
+    """
+
+    def __init__(self, df):
+        self.source = df
+        dims = _dimension_codes(df)
+        self.labels = {dim: labels for dim, (_, labels) in dims.items()}
+
+        # One integer key per row over all dimensions (missing -> an extra slot), factorized into cells
+        sizes = [len(labels) + 1 for labels in self.labels.values()]
+        key = np.ravel_multi_index([codes + 1 for codes, _ in dims.values()], sizes)
+        cell, keys = pd.factorize(key)
+        self.codes = {dim: codes - 1 for dim, codes in zip(dims, np.unravel_index(keys, sizes))}
+
+        self.value_columns, columns = _measure_values(df)
+        # Column-major, so a query sums only the value columns it needs, each contiguous
+        self.values = np.empty((len(keys), len(columns)), order="F")
+        for j, column in enumerate(columns):
+            self.values[:, j] = np.bincount(cell, weights=column, minlength=len(keys))
+
+    @property
+    def n_cells(self):
+        return len(self.values)
+
+    def _code(self, dim, value):
+        labels = self.labels[dim]
+        return int(labels.get_loc(value)) if value in labels else None
+
+    def _equal(self, keep, dim, value):
+        code = self._code(dim, value)
+        if code is None:
+            return np.zeros(self.n_cells, dtype=bool)
+        mask = self.codes[dim] == code
+        return mask if keep is None else keep & mask
+
+    def _slice(self, filters):
+        """(cube, cell mask or None for all) for the filter state."""
+        if filters is None:
+            return self, None
+
+        ranges = {key: filters[key] for key in RANGE_FILTERS}
+        if not all(float(v).is_integer() for bounds in ranges.values() for v in bounds):
+            # Range not aligned to bucket edges: scan the slice instead
+            rows = filter_rows(self.source, filters)
+            return AggregateCube(self.source if rows is None else self.source.take(rows)), None
+
+        keep = None
+        for key, col in CATEGORY_FILTERS.items():
+            if filters[key] != 'All':
+                keep = self._equal(keep, col, filters[key])
+        for key, col in RANGE_FILTERS.items():
+            low, high = ranges[key]
+            start = self.labels[BUCKETS[col]].start
+            codes = self.codes[BUCKETS[col]]
+            mask = (codes >= 2 * int(low) - start) & (codes <= 2 * int(high) - start)
+            keep = mask if keep is None else keep & mask
+        return self, keep
+
+    def _mask(self, filters, where):
+        cube, keep = self._slice(filters)
+        for col, value in (where or {}).items():
+            keep = cube._equal(keep, col, value)
+        return cube, keep
+
+    def _sums(self, filters, where, columns):
+        """{value column: sum over the slice's cells} for the requested `columns`."""
+        cube, keep = self._mask(filters, where)
+        idx = [self.value_columns.index(col) for col in columns]
+        if keep is None:
+            sums = cube.values[:, idx].sum(axis=0)
+        else:
+            sums = keep.astype(np.float64) @ cube.values[:, idx]
+        return dict(zip(columns, sums))
+
+    def _group_sums(self, filters, where, by, columns):
+        """(levels of `by` the slice has cells in, {column: sums per level}) for the requested `columns`."""
+        cube, keep = self._mask(filters, where)
+        labels = cube.labels[by]
+        cells = slice(None) if keep is None else np.flatnonzero(keep)
+        bins = cube.codes[by][cells] + 1  # bin 0 collects missing levels and is dropped
+        seen = np.bincount(bins, minlength=len(labels) + 1)[1:] > 0
+        sums = {}
+        for col in columns:
+            values = cube.values[cells, self.value_columns.index(col)]
+            sums[col] = np.bincount(bins, weights=values, minlength=len(labels) + 1)[1:][seen]
+        return labels[seen], sums
+
+    def totals(self, filters=None, by=None, where=None):
+        """Summed cells of the slice, restricted by `where` ({dimension: value}) and grouped by `by`."""
+        if by is None:
+            return pd.Series(self._sums(filters, where, self.value_columns))
+        levels, sums = self._group_sums(filters, where, by, self.value_columns)
+        return pd.DataFrame(sums, index=pd.Index(levels, name=by))
+
+    def rate(self, filters=None, where=None):
+        t = self._sums(filters, where, ["count", "target_sum"])
+        return t["target_sum"] / t["count"] if t["count"] else np.nan
+
+    def rate_by(self, filters, by):
+        """Same shape as `df.groupby(by)["TARGET"].mean().reset_index()`."""
+        levels, sums = self._group_sums(filters, None, by, ["count", "target_sum"])
+        nonzero = sums["count"] > 0
+        return pd.DataFrame({by: levels[nonzero], "TARGET": sums["target_sum"][nonzero] / sums["count"][nonzero]})
+
+    def mean(self, measure, filters=None, where=None):
+        t = self._sums(filters, where, [f"{measure}_n", f"{measure}_sum"])
+        n = t[f"{measure}_n"]
+        return t[f"{measure}_sum"] / n if n else np.nan
+
+    def std(self, measure, filters=None, where=None):
+        """Sample standard deviation from the stored sums of squares."""
+        t = self._sums(filters, where, [f"{measure}_n", f"{measure}_sum", f"{measure}_sq"])
+        n = t[f"{measure}_n"]
+        if n < 2:
+            return np.nan
+        var = (t[f"{measure}_sq"] - t[f"{measure}_sum"] ** 2 / n) / (n - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+@st.cache_resource(show_spinner=False)
+def get_cube():
+    return AggregateCube(load_data(MEASURES + ["TARGET"]))
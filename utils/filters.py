@@ -1,70 +1,280 @@
+import os
+
 import streamlit as st
+from streamlit import runtime
 import pandas as pd
+import numpy as np
+from utils.cache import LRUCache
+from utils.profiling import span
+from utils.store import get_column_store, get_lazy_dataset
+
+# Filter key -> column, for the equality filters and the inclusive range sliders
+CATEGORY_FILTERS = {
+    'gender': 'CODE_GENDER',
+    'education': 'NAME_EDUCATION_TYPE',
+    'family_status': 'NAME_FAMILY_STATUS',
+    'housing': 'NAME_HOUSING_TYPE',
+    'income_bracket': 'INCOME_BRACKET',
+}
+RANGE_FILTERS = {
+    'age_range': 'AGE_YEARS',
+    'employment_years': 'EMPLOYMENT_YEARS',
+}
+
+# Columns every page loads so the sidebar and the filter engine can work
+FILTER_COLUMNS = list(CATEGORY_FILTERS.values()) + list(RANGE_FILTERS.values())
+
+# Memory budget for filtered row-index sets, shared by every session of the process
+SLICE_CACHE_MB = float(os.environ.get("DASHBOARD_SLICE_CACHE_MB", "64"))
+
+def load_data(columns=None):
+    """Shared, read-only frame of `columns` plus FILTER_COLUMNS (all columns if None).
+
+    Only those columns are read, once per process (see utils.store.LazyDataset);
+    never mutate the frame in place. Text columns are categoricals, flags and
+    counts small ints, and floats float32 (see utils.store.FLOAT32_RTOL), so
+    `groupby` on text needs `observed=True`.
+    """
+    if columns is not None:
+        columns = list(columns) + FILTER_COLUMNS
+    return get_lazy_dataset().frame(columns)
+
+def dataset_profile():
+    """{column: (is_numeric, missing count)} for every column of the dataset, mostly from file metadata."""
+    return get_lazy_dataset().profile()
+
+# Initial slider positions, clamped to the data
+RANGE_DEFAULTS = {'age_range': (25, 60), 'employment_years': (0, 20)}
+
+@st.cache_resource(show_spinner=False)
+def _filter_options(version):
+    df = load_data([])
+    options = {key: ['All'] + sorted(df[col].unique().tolist()) for key, col in CATEGORY_FILTERS.items()}
+    for key, col in RANGE_FILTERS.items():
+        options[key] = (int(df[col].min()), int(df[col].max()))
+    return options
+
+def filter_options():
+    """Sidebar choices, computed once per dataset version: `['All', *levels]` or `(min, max)` per filter."""
+    return _filter_options(get_lazy_dataset().version)
+
+def default_filters():
+    options = filter_options()
+    filters = {key: 'All' for key in CATEGORY_FILTERS}
+    for key, (low, high) in RANGE_DEFAULTS.items():
+        lo, hi = options[key]
+        filters[key] = (min(max(low, lo), hi), max(min(high, hi), lo))
+    return filters
+
+def _filter_state():
+    """This session's sidebar draft and applied filters (None = unfiltered); they persist across pages."""
+    state = st.session_state
+    if "filters_draft" not in state:
+        state["filters_draft"] = default_filters()
+        state["filters_applied"] = None
+    return state
+
+def set_applied_filters(filters):
+    """Make `filters` the session's applied state, unless it normalizes to the current one.
+
+    Keeping the same object when nothing changed lets everything keyed on it
+    (cached slices, the last filtered frame) be reused as is.
+    """
+    state = _filter_state()
+    if normalize_filters(filters) == normalize_filters(state["filters_applied"]):
+        return False
+    state["filters_applied"] = None if filters is None else dict(filters)
+    return True
+
+def _on_change(key):
+    state = _filter_state()
+    value = state[f"filter_{key}"]
+    state["filters_draft"][key] = tuple(value) if key in RANGE_FILTERS else value
+
+def _on_apply():
+    state = _filter_state()
+    state["filters_rerun"] = set_applied_filters(state["filters_draft"])
 
-@st.cache_data
-def load_data():
-    return pd.read_csv("data/application_train_clean.csv")
-
-def get_global_filters(df):
-    st.sidebar.header("🔧 Global Filters")
-
-    gender_options = ['All'] + sorted(df['CODE_GENDER'].unique().tolist())
-    education_options = ['All'] + sorted(df['NAME_EDUCATION_TYPE'].unique().tolist())
-    family_status_options = ['All'] + sorted(df['NAME_FAMILY_STATUS'].unique().tolist())
-    housing_options = ['All'] + sorted(df['NAME_HOUSING_TYPE'].unique().tolist())
-    income_bracket_options = ['All'] + sorted(df['INCOME_BRACKET'].unique().tolist())
-
-    filters = {
-        'gender': st.sidebar.selectbox("Gender", gender_options),
-        'education': st.sidebar.selectbox("Education", education_options),
-        'family_status': st.sidebar.selectbox("Family Status", family_status_options),
-        'housing': st.sidebar.selectbox("Housing Type", housing_options),
-        'income_bracket': st.sidebar.selectbox("Income Bracket", income_bracket_options),
-        'age_range': st.sidebar.slider(
-            "Age Range (Years)", 
-            int(df['AGE_YEARS'].min()), 
-            int(df['AGE_YEARS'].max()), 
-            (25, 60)
-        ),
-        'employment_years': st.sidebar.slider(
-            "Employment Years", 
-            int(df['EMPLOYMENT_YEARS'].min()), 
-            int(df['EMPLOYMENT_YEARS'].max()), 
-            (0, 20)
-        ),
+def _on_reset():
+    state = _filter_state()
+    state["filters_draft"] = default_filters()
+    for key in list(CATEGORY_FILTERS) + list(RANGE_FILTERS):
+        state.pop(f"filter_{key}", None)
+    state["filters_rerun"] = set_applied_filters(None)
+
+def get_global_filters():
+    """Render the sidebar filters and return the session's applied filters, or None when unfiltered.
+
+    Widgets edit a draft; "Apply Filters" makes it the applied state, which
+    stays in effect on every page and rerun until it is changed or reset.
+    """
+    with st.sidebar:
+        _filter_sidebar()
+    return _filter_state()["filters_applied"]
+
+@st.fragment
+def _filter_sidebar():
+    # A fragment: editing the draft reruns only the sidebar; the page reruns
+    # only when Apply/Reset actually changes the applied filters
+    st.header("🔧 Global Filters")
+    state = _filter_state()
+    options = filter_options()
+    draft = state["filters_draft"]
+
+    labels = {
+        'gender': "Gender",
+        'education': "Education",
+        'family_status': "Family Status",
+        'housing': "Housing Type",
+        'income_bracket': "Income Bracket",
+        'age_range': "Age Range (Years)",
+        'employment_years': "Employment Years",
     }
+    for key, label in labels.items():
+        widget_key = f"filter_{key}"
+        # Seed every widget from the draft: widget state does not survive a page switch
+        state[widget_key] = draft[key]
+        if key in RANGE_FILTERS:
+            low, high = options[key]
+            st.slider(label, low, high, key=widget_key, on_change=_on_change, args=(key,))
+        else:
+            st.selectbox(label, options[key], key=widget_key, on_change=_on_change, args=(key,))
 
-    apply_filters = st.sidebar.button("🔍 Apply Filters")
-    reset_filters = st.sidebar.button("🔄 Reset Filters")
+    st.button("🔍 Apply Filters", on_click=_on_apply)
+    st.button("🔄 Reset Filters", on_click=_on_reset)
 
-    return filters, apply_filters, reset_filters
+    if state.pop("filters_rerun", False):
+        st.rerun()
 
-def apply_global_filters(df, filters):
-    filtered_df = df.copy()
+    applied = state["filters_applied"]
+    if applied is not None and normalize_filters(applied) != normalize_filters(draft):
+        st.caption("Changes not applied yet")
+
+def normalize_filters(filters):
+    """Hashable, key-order independent form of a `filters` dict; `()` means unfiltered."""
+    if filters is None:
+        return ()
+    items = [(key, str(filters[key])) for key in CATEGORY_FILTERS]
+    items += [(key, (float(filters[key][0]), float(filters[key][1]))) for key in RANGE_FILTERS]
+    return tuple(items)
+
+class FilterEngine:
+    """Precomputed indexes over one frame so a filter state resolves to a single row mask.
+
+    Category filters compare the column's integer codes (a categorical's own
+    codes, so nothing is copied) and every range column has a sorted order,
+    so evaluating the sidebar filters is a handful of in-place ANDs on one
+    mask instead of a new DataFrame per predicate. `sorted_index` can supply
+    prebuilt (sorted values, order) pairs, e.g. memory-mapped ones.
+    """
 
-    if filters['gender'] != 'All':
-        filtered_df = filtered_df[filtered_df['CODE_GENDER'] == filters['gender']]
+    def __init__(self, df, sorted_index=None):
+        self.source = df
+        self.n_rows = len(df)
 
-    if filters['education'] != 'All':
-        filtered_df = filtered_df[filtered_df['NAME_EDUCATION_TYPE'] == filters['education']]
+        self.codes = {}
+        for key, col in CATEGORY_FILTERS.items():
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, levels = series.array.codes, series.cat.categories  # `.cat.codes` would copy
+            else:
+                codes, levels = pd.factorize(series)
+            self.codes[key] = (codes, {level: i for i, level in enumerate(levels)})
 
-    if filters['family_status'] != 'All':
-        filtered_df = filtered_df[filtered_df['NAME_FAMILY_STATUS'] == filters['family_status']]
+        self.sorted_index = dict(sorted_index or {})
+        for key, col in RANGE_FILTERS.items():
+            if key in self.sorted_index:
+                continue
+            values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            order = np.argsort(values, kind="stable")  # NaNs sort last
+            self.sorted_index[key] = (values[order], order)
 
-    if filters['housing'] != 'All':
-        filtered_df = filtered_df[filtered_df['NAME_HOUSING_TYPE'] == filters['housing']]
+        # Popular slices are resolved once and then served to every session
+        self.slices = LRUCache(SLICE_CACHE_MB * 2**20)
 
-    if filters['income_bracket'] != 'All':
-        filtered_df = filtered_df[filtered_df['INCOME_BRACKET'] == filters['income_bracket']]
+    def mask(self, filters):
+        """Boolean row mask for `filters`, or None when no row is excluded."""
+        mask = None
 
-    filtered_df = filtered_df[
-        (filtered_df['AGE_YEARS'] >= filters['age_range'][0]) &
-        (filtered_df['AGE_YEARS'] <= filters['age_range'][1])
-    ]
+        for key in CATEGORY_FILTERS:
+            value = filters[key]
+            if value == 'All':
+                continue
+            codes, lookup = self.codes[key]
+            code = lookup.get(value)
+            if code is None:
+                return np.zeros(self.n_rows, dtype=bool)
+            if mask is None:
+                mask = codes == code
+            else:
+                mask &= codes == code
 
-    filtered_df = filtered_df[
-        (filtered_df['EMPLOYMENT_YEARS'] >= filters['employment_years'][0]) &
-        (filtered_df['EMPLOYMENT_YEARS'] <= filters['employment_years'][1])
-    ]
+        for key in RANGE_FILTERS:
+            low, high = filters[key]
+            values, order = self.sorted_index[key]
+            start = np.searchsorted(values, low, side="left")
+            stop = np.searchsorted(values, high, side="right")
+            if start == 0 and stop == self.n_rows:
+                continue
+            if mask is None:
+                mask = np.ones(self.n_rows, dtype=bool)
+            # Clear the rows outside [start, stop) of the sorted order — no temporary mask
+            mask[order[:start]] = False
+            mask[order[stop:]] = False
 
-    return filtered_df
+        return mask
+
+    def rows(self, filters):
+        """Positional row indexes matching `filters`, or None for every row."""
+        mask = self.mask(filters)
+        if mask is None:
+            return None
+        rows = np.flatnonzero(mask)
+        return rows.astype(np.int32) if self.n_rows < 2**31 else rows
+
+    def cached_rows(self, filters):
+        """`rows()` memoized on the normalized filter state; results are read-only."""
+        def compute():
+            rows = self.rows(filters)
+            if rows is not None:
+                rows.flags.writeable = False
+            return rows
+        return self.slices.get_or_compute(normalize_filters(filters), compute)
+
+@st.cache_resource(show_spinner=False)
+def get_filter_engine():
+    columns = get_column_store()
+    sorted_index = None
+    if columns is not None:
+        sorted_index = {key: columns.sorted_index(col) for key, col in RANGE_FILTERS.items()}
+    return FilterEngine(load_data([]), sorted_index)
+
+def filter_rows(df, filters):
+    engine = get_filter_engine()
+    if engine.source is not df and not get_lazy_dataset().owns(df):
+        # Not a frame of the shared dataset (e.g. an already filtered frame): index it on the fly
+        return FilterEngine(df).rows(filters)
+    return engine.cached_rows(filters)
+
+def slice_cache_stats():
+    return get_filter_engine().slices.stats()
+
+def apply_global_filters(df, filters):
+    # Unfiltered state hands back the shared frame itself; otherwise one row gather
+    if filters is None:
+        return df
+    with span("filter", columns=df.shape[1]) as info:
+        rows = filter_rows(df, filters)
+        info["rows"] = len(df) if rows is None else len(rows)
+        if rows is None:
+            return df
+        if not runtime.exists():
+            return df.take(rows)
+        # Reruns with an unchanged filter get the same cached rows object: reuse the session's last gather
+        last = st.session_state.get("filters_frame")
+        if last is not None and last[0] is df and last[1] is rows:
+            info["reused"] = True
+            return last[2]
+        filtered = df.take(rows)
+        st.session_state["filters_frame"] = (df, rows, filtered)
+        return filtered
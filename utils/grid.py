@@ -0,0 +1,220 @@
+import hashlib
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.io as pio
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from utils import charts as chart_helpers
+from utils.cache import LRUCache, source_fingerprint
+from utils.profiling import span
+from utils.store import get_lazy_dataset
+
+# Threads building a page's figures (1 = build them one after another on the script thread)
+CHART_WORKERS = int(os.environ.get("DASHBOARD_CHART_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Memory budget for finished figures, shared by every session of the process
+FIGURE_CACHE_MB = float(os.environ.get("DASHBOARD_FIGURE_CACHE_MB", "64"))
+
+# Optional on-disk layer of serialized figures, shared by processes and kept across restarts
+USE_FIGURE_DISK = os.environ.get("DASHBOARD_FIGURE_DISK", "0") == "1"
+FIGURE_DIR = "data/figures"
+FIGURE_DISK_MB = float(os.environ.get("DASHBOARD_FIGURE_DISK_MB", "256"))
+
+def chart(build, *args, **kwargs):
+    """A figure to be built by `chart_grid` as `build(*args, **kwargs)`.
+
+    The cache key covers the arguments, not what the builder reads from
+    elsewhere: pass every frame or series the figure is drawn from as an
+    argument, never through page globals or a closure.
+    """
+    return build, args, kwargs
+
+# id(frame) -> (weak reference, token), so each frame object is fingerprinted once
+_frame_tokens = {}
+_frame_tokens_lock = threading.Lock()
+
+def _fingerprint(value):
+    if isinstance(value, pd.DataFrame) and get_lazy_dataset().owns(value):
+        return ("dataset",)  # fixed by the dataset version, which is part of the key
+    index = value.index
+    if isinstance(index, pd.RangeIndex):
+        # Renumbered rows say nothing about which rows they are: hash the values too
+        hashed = pd.util.hash_pandas_object(value, index=False)
+        return ("values", hashlib.blake2b(hashed.to_numpy().tobytes(), digest_size=16).hexdigest())
+    # Frames derived from the dataset keep its row positions as labels
+    labels = np.ascontiguousarray(index.to_numpy())
+    if labels.dtype == object:
+        labels = pd.util.hash_pandas_object(index, index=False).to_numpy()
+    return ("rows", hashlib.blake2b(labels.tobytes(), digest_size=16).hexdigest())
+
+def _frame_token(value):
+    """Which rows a frame or series holds, cheap to repeat for the same object."""
+    with _frame_tokens_lock:
+        entry = _frame_tokens.get(id(value))
+        if entry is not None and entry[0]() is value:
+            return entry[1]
+    token = _fingerprint(value)
+    with _frame_tokens_lock:
+        for key in [key for key, (ref, _) in _frame_tokens.items() if ref() is None]:
+            del _frame_tokens[key]
+        _frame_tokens[id(value)] = (weakref.ref(value), token)
+    return token
+
+def _freeze(value):
+    """Hashable stand-in for a chart argument.
+
+    Frames are described by their columns, dtypes and length plus a token of
+    their rows: the dataset version for the shared frames, otherwise a hash
+    of the row labels (of the values when the index was renumbered).
+    """
+    if isinstance(value, pd.DataFrame):
+        return ("frame", tuple(value.columns), tuple(map(str, value.dtypes)), len(value), _frame_token(value))
+    if isinstance(value, pd.Series):
+        return ("series", value.name, str(value.dtype), len(value), _frame_token(value))
+    if isinstance(value, np.ndarray):
+        return ("array", value.shape, value.tobytes())
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if callable(value):
+        # By name, so the key (and its on-disk hash) is the same in every process
+        return ("callable", getattr(value, "__module__", None), getattr(value, "__qualname__", repr(value)))
+    return value
+
+def _chart_key(build, args, kwargs, cache_key):
+    code = getattr(build, "__code__", None)
+    # Pages all run as __main__, so the defining file tells their local builders apart
+    where = code.co_filename if code is not None else getattr(build, "__module__", None)
+    # Editing the builder's file or the shared chart helpers must not serve figures drawn by the old code
+    sources = (source_fingerprint(where) if code is not None else None, source_fingerprint(chart_helpers.__file__))
+    return (get_lazy_dataset().version, cache_key, where, sources, build.__qualname__, _freeze(args),
+            _freeze(kwargs))
+
+@st.cache_resource(show_spinner=False)
+def _figure_cache():
+    return LRUCache(FIGURE_CACHE_MB * 2**20, sizeof=lambda entry: entry[1])
+
+@st.cache_resource(show_spinner=False)
+def _chart_pool():
+    return ThreadPoolExecutor(max_workers=CHART_WORKERS, thread_name_prefix="charts")
+
+def _disk_path(key):
+    digest = hashlib.sha256(repr((plotly.__version__,) + key).encode("utf-8")).hexdigest()
+    return os.path.join(FIGURE_DIR, f"{digest}.json")
+
+def _disk_get(key):
+    path = _disk_path(key)
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        os.utime(path)  # recently used files are evicted last
+    except OSError:
+        return None
+    return text
+
+# Running estimate of the bytes in FIGURE_DIR (None until the first write scans it)
+_disk_total = None
+_disk_lock = threading.Lock()
+
+def _disk_evict():
+    """Scan FIGURE_DIR, drop least recently used files down to the budget and return the bytes left."""
+    files = []
+    for entry in os.scandir(FIGURE_DIR):
+        if entry.name.endswith(".json"):
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, old in sorted(files):
+        if total <= FIGURE_DISK_MB * 2**20:
+            break
+        try:
+            os.remove(old)
+        except OSError:
+            pass  # removed by another process
+        total -= size
+    return total
+
+def _disk_put(key, text):
+    global _disk_total
+    os.makedirs(FIGURE_DIR, exist_ok=True)
+    path = _disk_path(key)
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    size = os.path.getsize(tmp)
+    os.replace(tmp, path)
+
+    # The directory is only scanned when this process's count passes the budget; files
+    # written by other processes are picked up by that scan
+    with _disk_lock:
+        if _disk_total is None:
+            _disk_total = _disk_evict()
+        else:
+            _disk_total += size
+            if _disk_total > FIGURE_DISK_MB * 2**20:
+                _disk_total = _disk_evict()
+
+def _build(spec, cache_key, ctx):
+    if ctx is not None:
+        # Builders may use st.cache_resource helpers, which expect the session's script context
+        add_script_run_ctx(ctx=ctx)
+    build, args, kwargs = spec
+    with span("figure", chart=build.__qualname__) as info:
+        if cache_key is None:
+            info["source"] = "built"
+            return build(*args, **kwargs), None
+        key = _chart_key(build, args, kwargs, cache_key)
+        info["source"] = "memory"
+
+        def compute():
+            text = _disk_get(key) if USE_FIGURE_DISK else None
+            if text is not None:
+                info["source"] = "disk"
+                return pio.from_json(text), len(text)
+            info["source"] = "built"
+            fig = build(*args, **kwargs)
+            text = pio.to_json(fig, validate=False)
+            if USE_FIGURE_DISK:
+                _disk_put(key, text)
+            # Memory keeps the figure object (charged at its serialized size): st.plotly_chart
+            # re-validates anything else, which costs more than the serialization it would save
+            return fig, len(text)
+
+        return _figure_cache().get_or_compute(key, compute)
+
+def chart_grid(charts, cache_key=None, per_row=3):
+    """Build `charts` concurrently and draw them `per_row` to a row, in their order.
+
+    `None` leaves a slot empty. With a `cache_key` (the normalized filter
+    state) finished figures are cached per (chart spec, filter state, dataset
+    version) and shared by every session, and with DASHBOARD_FIGURE_DISK=1
+    their JSON is also kept on disk; without a key they are always rebuilt.
+    """
+    slots = []
+    for i in range(0, len(charts), per_row):
+        slots.extend(st.columns(per_row))
+
+    ctx = get_script_run_ctx()
+    if CHART_WORKERS > 1:
+        pool = _chart_pool()
+        pending = [None if spec is None else pool.submit(_build, spec, cache_key, ctx) for spec in charts]
+        figures = (None if future is None else future.result() for future in pending)
+    else:
+        figures = (None if spec is None else _build(spec, cache_key, None) for spec in charts)
+
+    # Emitted in order: each slot is filled as soon as its figure (and all before it) is ready
+    for slot, spec, built in zip(slots, charts, figures):
+        if built is not None:
+            fig, nbytes = built
+            with span("plotly_chart", chart=spec[0].__qualname__, bytes=nbytes):
+                slot.plotly_chart(fig, use_container_width=True)
+
+def figure_cache_stats():
+    return _figure_cache().stats()
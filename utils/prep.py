@@ -1,22 +1,48 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 
-def load_and_clean_data(path="data/application_train.csv"):
-    # 1. Load raw data
-    df = pd.read_csv(path)
+if not __package__:
+    # Run as `python utils/prep.py`: make the repo root importable, as with `python -m utils.prep`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sketch import QuantileSketch  # noqa: E402
 
-    # 2. Derived columns
-    df["AGE_YEARS"] = -df["DAYS_BIRTH"] / 365.25
+RAW_CSV_PATH = "data/application_train.csv"
+CLEAN_CSV_PATH = "data/application_train_clean.csv"
+CLEAN_PARQUET_PATH = "data/application_train_clean.parquet"
 
-    emp = df["DAYS_EMPLOYED"].copy()
-    emp = emp.mask(emp >= 365000, np.nan)  # 365243 = not employed code
-    emp = emp.mask(emp > 0, np.nan)        # remove weird positives
-    df["EMPLOYMENT_YEARS"] = -emp / 365.25
+# Fitted cleaning parameters, and the fingerprint of the source/params the artifacts were built from
+PARAMS_PATH = "data/clean_params.json"
+META_PATH = "data/application_train_clean.meta.json"
+# Bump when the cleaning steps change so stale parameter files are refitted, not misapplied
+PARAMS_VERSION = 2
 
-    # 3. Ratios
-    df["DTI"] = df["AMT_ANNUITY"] / df["AMT_INCOME_TOTAL"].replace({0: np.nan})
-    df["LOAN_TO_INCOME"] = df["AMT_CREDIT"] / df["AMT_INCOME_TOTAL"].replace({0: np.nan})
-    df["ANNUITY_TO_CREDIT"] = df["AMT_ANNUITY"] / df["AMT_CREDIT"].replace({0: np.nan})
+# Winsorized at the 1%/99% quantiles
+WINSOR_COLUMNS = ["AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY", "AGE_YEARS"]
+
+# Rows per chunk in streaming mode
+DEFAULT_CHUNKSIZE = 100_000
+
+# Columns that hold counts/flags and are stored as small ints even when they arrive as floats
+INT_COLUMN_PREFIXES = ("TARGET", "CNT_", "FLAG_", "OBS_", "DEF_", "AMT_REQ_CREDIT_BUREAU_")
+
+def load_and_clean_data(path=RAW_CSV_PATH, batched=True):
+    # 1. Load raw data
+    df = pd.read_csv(path)
+    return clean_data_batched(df) if batched else clean_data(df)
+
+def clean_data(df):
+    """Reference column-by-column pipeline (kept for comparison with the batched one)."""
+    # 2-3. Derived columns and ratios
+    df = add_raw_derived_columns(df)
 
     # 4. Drop columns > 60% missing
     missing_pct = df.isnull().mean()
@@ -51,7 +77,622 @@ def load_and_clean_data(path="data/application_train.csv"):
 
     return df
 
+def add_raw_derived_columns(df):
+    # 2. Derived columns
+    derived = {"AGE_YEARS": -df["DAYS_BIRTH"] / 365.25}
+
+    emp = df["DAYS_EMPLOYED"]
+    emp = emp.mask((emp >= 365000) | (emp > 0))  # 365243 = not employed code, weird positives
+    derived["EMPLOYMENT_YEARS"] = -emp / 365.25
+
+    # 3. Ratios
+    income = df["AMT_INCOME_TOTAL"].replace({0: np.nan})
+    derived["DTI"] = df["AMT_ANNUITY"] / income
+    derived["LOAN_TO_INCOME"] = df["AMT_CREDIT"] / income
+    derived["ANNUITY_TO_CREDIT"] = df["AMT_ANNUITY"] / df["AMT_CREDIT"].replace({0: np.nan})
+    # Added in one go: raw CSV frames hold a block per column, and inserting one at a time fragments them further
+    return pd.concat([df.drop(columns=list(derived), errors="ignore"), pd.DataFrame(derived, index=df.index)], axis=1)
+
+def _code_counts(cat):
+    codes = cat.cat.codes.to_numpy()
+    return np.bincount(codes[codes >= 0], minlength=len(cat.cat.categories))
+
+def _mode_fill(cat):
+    # Most frequent category; ties go to the smallest label, like Series.mode()[0]
+    counts = _code_counts(cat)
+    return cat.cat.categories[counts.argmax()] if counts.sum() else np.nan
+
+def _frequent_levels(categories, counts, n_rows, threshold=0.01, other="Other"):
+    """Categories kept as-is: those at or above `threshold` frequency, plus `other` if any were merged."""
+    freqs = np.asarray(counts) / max(n_rows, 1)
+    kept = [c for c, freq in zip(categories, freqs) if freq >= threshold]
+    if len(kept) < len(categories) and other not in kept:
+        kept.append(other)
+    return kept
+
+def _recode(cat, levels, other="Other"):
+    """Remap categories outside `levels` onto `other` by rewriting codes."""
+    categories = cat.cat.categories
+    if list(categories) == list(levels):
+        return cat
+    levels = list(levels)
+    if other not in levels and not categories.isin(levels).all():
+        levels.append(other)
+    lookup = {c: i for i, c in enumerate(levels)}
+    remap = np.array([lookup.get(c, lookup.get(other)) for c in categories], dtype=np.int64)
+    codes = cat.cat.codes.to_numpy()
+    new_codes = np.where(codes >= 0, remap[codes], -1) if len(remap) else codes
+    return pd.Series(pd.Categorical.from_codes(new_codes, categories=levels), index=cat.index, name=cat.name)
+
+def _to_json(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+def clean_data_batched(df):
+    """Same steps and output as the column-by-column pipeline, done in bulk.
+
+    Medians come from one `DataFrame.quantile` call, text columns become
+    categoricals (mode and rare-label merging work on their integer codes),
+    and imputation / winsorization are single `fillna` / `clip` calls.
+    """
+    return fit_clean_data(df)[0]
+
+def fit_clean_data(df, workers=1):
+    """Clean a raw extract and return it with the parameters learned from it.
+
+    With `workers` > 1 the columns are cleaned in groups on a process pool;
+    the frame and parameters are identical to a single process.
+    """
+    return _clean(df, None, workers)
+
+def transform_clean_data(df, params, workers=1):
+    """Clean a raw extract with previously fitted parameters (nothing is re-derived)."""
+    if params.get("version") != PARAMS_VERSION:
+        raise ValueError(f"Cleaning parameters are version {params.get('version')}, expected {PARAMS_VERSION}; refit them")
+    return _clean(df, params, workers)[0]
+
+def _clean(df, params, workers=1):
+    # Every data-dependent step is fitted on `df` when `params` is None, otherwise read from it
+    fit = params is None
+    df = add_raw_derived_columns(df)
+    if workers > 1 and df.shape[1] > 1:
+        # Steps 4-7 only look at one column at a time: interleaved groups mix text and numeric columns
+        groups = [list(df.columns[i::workers]) for i in range(min(workers, df.shape[1]))]
+        parts = list(_map_ordered(_clean_group, [(df[cols], params) for cols in groups], workers))
+        order = {col: i for i, col in enumerate(df.columns)}
+        df = pd.concat([part for part, _ in parts], axis=1)
+        df = df[sorted(df.columns, key=order.get)]
+        if fit:
+            params = _merge_group_params([part_params for _, part_params in parts], order)
+    else:
+        df, params = _clean_columns(df, params)
+
+    # 8. Income brackets (quartile edges of the fitting data; outer edges open for new extracts)
+    if fit:
+        params["income_bracket_edges"] = [float(v) for v in df["AMT_INCOME_TOTAL"].quantile([0, 0.25, 0.75, 1])]
+    edges = params["income_bracket_edges"]
+    df["INCOME_BRACKET"] = pd.cut(
+        df["AMT_INCOME_TOTAL"],
+        bins=[-np.inf, *edges[1:-1], np.inf],
+        labels=["Low", "Mid", "High"]
+    )
+
+    return df, params
+
+def _clean_group(task):
+    df, params = task
+    return _clean_columns(df, params)
+
+def _merge_group_params(parts, order):
+    """Parameters fitted on column groups, as one fit on all the columns would list them."""
+    params = {}
+    for part in parts:
+        for key, value in part.items():
+            if isinstance(value, list):
+                params.setdefault(key, []).extend(value)
+            elif isinstance(value, dict):
+                params.setdefault(key, {}).update(value)
+            else:
+                params[key] = value
+    for key, value in params.items():
+        if isinstance(value, list):
+            params[key] = sorted(value, key=order.get)  # column names, in frame order
+    return params
+
+def _clean_columns(df, params):
+    # Steps 4-7, each column on its own, so any group of columns can be cleaned apart from the rest
+    fit = params is None
+    if fit:
+        params = {"version": PARAMS_VERSION}
+
+    # 4. Drop columns > 60% missing
+    if fit:
+        missing_pct = df.isnull().mean()
+        params["drop_columns"] = missing_pct[missing_pct > 0.6].index.tolist()
+    df = df.drop(columns=params["drop_columns"], errors="ignore")
+
+    # 5. Impute missing values (medians for float64/int64, modes for the rest)
+    if fit:
+        num_cols = [c for c in df.columns if df[c].dtype in ["float64", "int64"]]
+        other_cols = [c for c in df.columns if c not in set(num_cols)]
+        params["text_columns"] = [c for c in other_cols if _is_text(df[c])]
+        params["float_columns"] = [c for c in num_cols if df[c].dtype == "float64"]
+    text_cols = [c for c in params["text_columns"] if c in df.columns]
+    df[text_cols] = df[text_cols].astype("category")
+    if fit:
+        fills = df[num_cols].quantile(0.5).to_dict() if num_cols else {}
+        for col in other_cols:
+            fills[col] = _mode_fill(df[col]) if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].mode()[0]
+        params["fills"] = {col: _to_json(value) for col, value in fills.items()}
+    for col in text_cols:
+        # A new extract may lack the fitted fill level
+        fill = params["fills"].get(col)
+        if fill is not None and fill not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories([fill])
+    df = df.fillna(params["fills"])
+    # Keep the fitted numeric dtypes even if this extract has no missing values
+    float_cols = [c for c in params["float_columns"] if c in df.columns]
+    df[float_cols] = df[float_cols].astype("float64")
+
+    # 6. Standardize categories (rare -> "Other")
+    if fit:
+        params["categories"] = {
+            col: [_to_json(c) for c in _frequent_levels(df[col].cat.categories, _code_counts(df[col]), len(df))]
+            for col in text_cols
+        }
+    for col in text_cols:
+        df[col] = _recode(df[col], params["categories"][col])
+
+    # 7. Outlier handling (Winsorize 1%/99%)
+    wins_cols = [c for c in WINSOR_COLUMNS if c in df.columns]
+    if fit:
+        bounds = df[wins_cols].quantile([0.01, 0.99])
+        params["winsor_bounds"] = {col: [float(bounds.at[0.01, col]), float(bounds.at[0.99, col])] for col in wins_cols}
+    lower = pd.Series({col: params["winsor_bounds"][col][0] for col in wins_cols})
+    upper = pd.Series({col: params["winsor_bounds"][col][1] for col in wins_cols})
+    df[wins_cols] = df[wins_cols].clip(lower=lower, upper=upper, axis=1)
+    return df, params
+
+def _map_ordered(func, items, workers=1):
+    """`map(func, items)`, on a process pool when `workers` > 1 — results stay in input order.
+
+    At most two tasks per worker are in flight, so large results do not pile up.
+    """
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _csv_parts(path, rows_per_part):
+    """Column names and byte ranges of consecutive `rows_per_part`-row parts of a CSV.
+
+    Lets each worker parse its own part. Assumes one record per line (no
+    quoted line breaks), as in the raw extracts.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        columns = pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist() if header.strip() else []
+        offsets = [f.tell()]
+        base, lines = offsets[0], 0
+        for block in iter(lambda: f.read(2**24), b""):
+            ends = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord("\n")) + base + 1
+            offsets.extend(ends[rows_per_part - lines - 1::rows_per_part].tolist())
+            lines = (lines + len(ends)) % rows_per_part
+            base += len(block)
+    if offsets[-1] != base:
+        offsets.append(base)
+    return columns, list(zip(offsets[:-1], offsets[1:]))
+
+def _read_part(path, columns, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return pd.read_csv(io.BytesIO(f.read(end - start)), header=None, names=columns)
+
+def _part_stats(task):
+    # Missing counts, dtypes seen, label counts and quantile sketches of one part
+    path, columns, start, end = task
+    chunk = add_raw_derived_columns(_read_part(path, columns, start, end))
+    stats = {"n_rows": len(chunk), "missing": {}, "kinds": {}, "counts": {}, "sketches": {}}
+    for col in chunk.columns:
+        s = chunk[col]
+        n_missing = int(s.isna().sum())
+        stats["missing"][col] = n_missing
+        stats["kinds"][col] = set()
+        if n_missing == len(s):
+            continue  # all-missing part: its dtype says nothing about the column
+        if s.dtype in ["float64", "int64"]:
+            stats["kinds"][col].add(str(s.dtype))
+            stats["sketches"][col] = QuantileSketch().update(s.to_numpy(dtype="float64"))
+        else:
+            stats["kinds"][col].add("text" if _is_text(s) else "other")
+            stats["counts"][col] = s.value_counts()
+    return stats
+
+def _merge_stats(total, part):
+    total["n_rows"] += part["n_rows"]
+    for col, n in part["missing"].items():
+        total["missing"][col] = total["missing"].get(col, 0) + n
+        total["kinds"].setdefault(col, set()).update(part["kinds"][col])
+    for col, vc in part["counts"].items():
+        total["counts"][col] = vc if col not in total["counts"] else total["counts"][col].add(vc, fill_value=0)
+    for col, sketch in part["sketches"].items():
+        total["sketches"][col] = sketch if col not in total["sketches"] else total["sketches"][col].merge(sketch)
+    return total
+
+def fit_clean_data_streaming(path, chunksize=DEFAULT_CHUNKSIZE, workers=1):
+    """Fit the cleaning parameters in one pass over `path`, `chunksize` rows at a time.
+
+    Missing and label counts are exact. Medians, winsor bounds and income
+    bracket edges come from mergeable quantile sketches (utils.sketch), so
+    memory depends on the chunk size, not the file size. Parts are summarized
+    on `workers` processes and merged in file order, so the result does not
+    depend on the number of workers.
+    """
+    columns, ranges = _csv_parts(path, chunksize)
+    if not ranges:
+        raise ValueError(f"no rows in {path}")
+    tasks = [(path, columns, start, end) for start, end in ranges]
+    stats = None
+    for part in _map_ordered(_part_stats, tasks, workers):
+        stats = part if stats is None else _merge_stats(stats, part)
+    n_rows, missing, kinds = stats["n_rows"], stats["missing"], stats["kinds"]
+    counts, sketches = stats["counts"], stats["sketches"]
+
+    params = {"version": PARAMS_VERSION}
+    params["drop_columns"] = [c for c in missing if missing[c] / max(n_rows, 1) > 0.6]
+    kept = [c for c in missing if c not in set(params["drop_columns"])]
+    num_cols = [c for c in kept if kinds[c] and kinds[c] <= {"float64", "int64"}]
+    other_cols = [c for c in kept if c not in set(num_cols)]
+    params["text_columns"] = [c for c in other_cols if "text" in kinds[c]]
+    params["float_columns"] = [c for c in num_cols if "float64" in kinds[c]]
+
+    fills = {col: float(sketches[col].quantile(0.5)) for col in num_cols}
+    for col in other_cols:
+        # Most frequent label; ties go to the smallest, like Series.mode()[0]
+        ordered = counts[col].sort_index() if col in counts else pd.Series(dtype="int64")
+        fills[col] = _to_json(ordered.idxmax()) if len(ordered) else None
+    params["fills"] = {col: value for col, value in fills.items() if value is not None}
+
+    params["categories"] = {}
+    for col in params["text_columns"]:
+        # Frequencies after imputation: missing entries count towards the fill label
+        filled = counts[col].add(pd.Series({fills[col]: missing[col]}), fill_value=0).sort_index()
+        params["categories"][col] = [_to_json(c) for c in _frequent_levels(filled.index, filled.to_numpy(), n_rows)]
+
+    params["winsor_bounds"] = {}
+    for col in WINSOR_COLUMNS:
+        sketch = sketches[col].update([fills[col]], weight=missing[col])
+        params["winsor_bounds"][col] = [float(v) for v in sketch.quantile([0.01, 0.99])]
+    # Quantiles commute with clipping, so the bracket edges of the winsorized income follow directly
+    low, high = params["winsor_bounds"]["AMT_INCOME_TOTAL"]
+    edges = np.clip(sketches["AMT_INCOME_TOTAL"].quantile([0, 0.25, 0.75, 1]), low, high)
+    params["income_bracket_edges"] = [float(v) for v in edges]
+    return params
+
+def _transform_part(task):
+    # One cleaned part with the fixed category lists, plus its CSV rows
+    path, columns, start, end, params, levels = task
+    chunk = transform_clean_data(_read_part(path, columns, start, end), params)
+    for col, cats in levels.items():
+        if col in chunk.columns:
+            chunk[col] = chunk[col].cat.set_categories(cats)
+    return chunk, chunk.to_csv(index=False, header=False)
+
+def stream_clean_data(path, params, chunksize=DEFAULT_CHUNKSIZE, unseen_labels=True, workers=1,
+                      parquet_path=CLEAN_PARQUET_PATH, csv_path=CLEAN_CSV_PATH):
+    """Transform `path` chunk by chunk with fitted `params`, writing the cleaned files as it goes.
+
+    Every chunk gets the same columns, dtypes and category lists, so the
+    Parquet row groups share one schema. With `unseen_labels=False` (the
+    params were fitted on this file) no spare "Other" level is added.
+    Numeric columns keep their int64/float64 dtypes; downcasting needs a view
+    of the whole column and is left to the in-memory path. Chunks are cleaned
+    and formatted on `workers` processes and written in file order.
+    """
+    levels = {}
+    for col, kept in params["categories"].items():
+        levels[col] = kept + ["Other"] if unseen_labels and "Other" not in kept else kept
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("⚠️ pyarrow not installed — skipped columnar output, loaders will use the CSV")
+        pq = None
+
+    columns, ranges = _csv_parts(path, chunksize)
+    if not ranges:
+        raise ValueError(f"no rows in {path}")
+    tasks = [(path, columns, start, end, params, levels) for start, end in ranges]
+    writer = None
+    try:
+        with open(csv_path, "w", encoding="utf-8", newline="") as csv_file:
+            for i, (chunk, rows) in enumerate(_map_ordered(_transform_part, tasks, workers)):
+                if i == 0:
+                    csv_file.write(chunk.iloc[:0].to_csv(index=False))
+                csv_file.write(rows)
+                if pq is not None:
+                    if writer is None:
+                        table = pa.Table.from_pandas(chunk, preserve_index=False)
+                        writer = pq.ParquetWriter(parquet_path, table.schema)
+                    else:
+                        table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                    writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return [parquet_path, csv_path] if pq is not None else [csv_path]
+
+def _csv_rows(frame):
+    return frame.to_csv(index=False, header=False)
+
+def write_csv(df, path, workers=1):
+    """`df.to_csv(path, index=False)`, with the row formatting split across `workers` processes.
+
+    Formatting floats dominates writing the cleaned CSV; the output is byte-identical.
+    """
+    if workers <= 1:
+        df.to_csv(path, index=False)
+        return
+    rows = max(len(df) // (4 * workers), 1000)
+    slices = (df.iloc[i:i + rows] for i in range(0, len(df), rows))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(df.iloc[:0].to_csv(index=False))
+        for text in _map_ordered(_csv_rows, slices, workers):
+            f.write(text)
+
+def _is_text(series):
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+def _fits_float32(values, rtol):
+    with np.errstate(over="ignore"):
+        narrowed = values.astype("float32").astype("float64")
+    if rtol <= 0:
+        return np.array_equal(narrowed, values, equal_nan=True)
+    return np.allclose(narrowed, values, rtol=rtol, atol=0, equal_nan=True)
+
+def apply_schema(df, float_rtol=0.0):
+    """Dictionary-encode text columns and downcast numerics wherever it is lossless.
+
+    Floats become float32 when every value round-trips within `float_rtol`
+    relative error (0 = exactly).
+    """
+    typed = {}
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            typed[col] = s
+        elif _is_text(s):
+            typed[col] = s.astype("category")
+        elif pd.api.types.is_bool_dtype(s.dtype):
+            typed[col] = s.astype("int8")
+        elif pd.api.types.is_integer_dtype(s.dtype):
+            typed[col] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s.dtype):
+            values = s.to_numpy(dtype="float64")
+            if col.startswith(INT_COLUMN_PREFIXES) and s.notna().all() and np.array_equal(values, np.round(values)):
+                typed[col] = pd.to_numeric(s.astype("int64"), downcast="integer")
+            elif _fits_float32(values, float_rtol):
+                typed[col] = s.astype("float32")
+            else:
+                typed[col] = s
+        else:
+            typed[col] = s
+    return pd.DataFrame(typed, index=df.index)
+
+def save_clean_data(df, parquet_path=CLEAN_PARQUET_PATH, csv_path=CLEAN_CSV_PATH, workers=1):
+    write_csv(df, csv_path, workers)
+    try:
+        apply_schema(df).to_parquet(parquet_path, index=False)
+    except ImportError:
+        print("⚠️ pyarrow not installed — skipped columnar output, loaders will use the CSV")
+        return [csv_path]
+    return [parquet_path, csv_path]
+
+def read_clean_data(columns=None, parquet_path=CLEAN_PARQUET_PATH, csv_path=CLEAN_CSV_PATH):
+    """Read the cleaned table, preferring the columnar artifact; `columns` projects on read."""
+    columns = list(columns) if columns is not None else None
+    if os.path.exists(parquet_path):
+        try:
+            return pd.read_parquet(parquet_path, columns=columns)
+        except ImportError:
+            pass
+    return pd.read_csv(csv_path, usecols=columns)
+
+def clean_data_columns(parquet_path=CLEAN_PARQUET_PATH, csv_path=CLEAN_CSV_PATH):
+    """Column names of the cleaned table, from the Parquet footer or the CSV header (no data read)."""
+    if os.path.exists(parquet_path):
+        try:
+            import pyarrow.parquet as pq
+            return list(pq.read_schema(parquet_path).names)
+        except ImportError:
+            pass
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+def clean_data_profile(parquet_path=CLEAN_PARQUET_PATH):
+    """{column: (is_numeric, missing count)} from the Parquet footer statistics.
+
+    Columns whose statistics were not written are left out; empty if there is
+    no Parquet file or pyarrow is not installed.
+    """
+    if not os.path.exists(parquet_path):
+        return {}
+    try:
+        import pyarrow.parquet as pq
+        import pyarrow.types as pat
+    except ImportError:
+        return {}
+    parquet = pq.ParquetFile(parquet_path)
+    meta = parquet.metadata
+    nulls = {}
+    for group in range(meta.num_row_groups):
+        for i in range(meta.num_columns):
+            chunk = meta.row_group(group).column(i)
+            stats = chunk.statistics
+            count = stats.null_count if stats is not None and stats.has_null_count else None
+            name = chunk.path_in_schema
+            nulls[name] = None if count is None or nulls.get(name, 0) is None else nulls.get(name, 0) + count
+    profile = {}
+    for field in parquet.schema_arrow:
+        if nulls.get(field.name) is None:
+            continue
+        numeric = pat.is_integer(field.type) or pat.is_floating(field.type) or pat.is_boolean(field.type)
+        profile[field.name] = (numeric, int(nulls[field.name]))
+    return profile
+
+def _tmp_path(path):
+    return f"{path}.tmp-{os.getpid()}"
+
+def _write_json(obj, path, **kwargs):
+    # Written aside and renamed into place, so readers never see a partial file
+    tmp = _tmp_path(path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, **kwargs)
+    os.replace(tmp, path)
+
+def save_params(params, path=PARAMS_PATH):
+    _write_json(params, path, indent=2, sort_keys=True)
+
+def load_params(path=PARAMS_PATH):
+    """Saved cleaning parameters, or None if they have not been fitted yet."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def file_fingerprint(path, chunk_size=2**20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def params_fingerprint(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+def file_stamp(path):
+    """Cheap change detector for a source file: its size and modification time."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _load_meta(meta_path=META_PATH):
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _artifacts_match(meta, source_sha256, params):
+    return (
+        meta is not None
+        and meta.get("source_sha256") == source_sha256
+        and meta.get("params_sha256") == params_fingerprint(params)
+        and all(os.path.exists(p) for p in meta.get("outputs", []))
+    )
+
+def clean_data_stale(raw_path=RAW_CSV_PATH, meta_path=META_PATH):
+    """Whether the cleaned files are missing or were built from another version of `raw_path`.
+
+    Only compares the size and mtime recorded at build time, so it is cheap
+    enough to call when a server starts; `prepare_clean_data` settles it.
+    """
+    meta = _load_meta(meta_path)
+    if meta is None or not all(os.path.exists(p) for p in meta.get("outputs", [])):
+        return True
+    return meta.get("source") == raw_path and meta.get("source_stamp") != file_stamp(raw_path)
+
+def dataset_version(parquet_path=CLEAN_PARQUET_PATH, csv_path=CLEAN_CSV_PATH, meta_path=META_PATH):
+    """Short identifier of the cleaned data on disk: its build fingerprint, else file size and mtime."""
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        return f"{meta['source_sha256'][:12]}-{meta['params_sha256'][:12]}"
+    path = parquet_path if os.path.exists(parquet_path) else csv_path
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def prepare_clean_data(raw_path=RAW_CSV_PATH, refit=False, force=False, chunksize=None, workers=1):
+    """Clean `raw_path` into the data artifacts, reusing the saved parameters unless `refit`.
+
+    Skipped when the artifacts were already built from this exact file and
+    parameter set. With `chunksize`, the file is streamed in chunks of that many
+    rows instead of being loaded whole. `workers` > 1 spreads the chunks (or,
+    in memory, the column groups and the CSV formatting) over a process pool
+    with identical output.
+    Returns the paths written (empty when nothing was done).
+    """
+    params = None if refit else load_params()
+    if params is not None and params.get("version") != PARAMS_VERSION:
+        params = None
+    meta = _load_meta()
+    stamp = file_stamp(raw_path)
+    if params is not None and not force and meta is not None and meta.get("source_stamp") == stamp:
+        # Same size and mtime as the build: skip hashing the whole file
+        source_sha256 = meta.get("source_sha256")
+    else:
+        source_sha256 = file_fingerprint(raw_path)
+    if params is not None and not force and _artifacts_match(meta, source_sha256, params):
+        if meta.get("source_stamp") != stamp:
+            _write_json({**meta, "source": raw_path, "source_stamp": stamp}, META_PATH, indent=2)
+        return []
+
+    # Outputs are written next to their final paths and renamed into place, so
+    # a server reading them meanwhile sees the old files or the new ones
+    tmp = {CLEAN_PARQUET_PATH: _tmp_path(CLEAN_PARQUET_PATH), CLEAN_CSV_PATH: _tmp_path(CLEAN_CSV_PATH)}
+    written = []
+    try:
+        fitted = params is None
+        if chunksize:
+            if fitted:
+                params = fit_clean_data_streaming(raw_path, chunksize, workers)
+            tmp_outputs = stream_clean_data(raw_path, params, chunksize, unseen_labels=not fitted, workers=workers,
+                                            parquet_path=tmp[CLEAN_PARQUET_PATH], csv_path=tmp[CLEAN_CSV_PATH])
+        else:
+            raw = pd.read_csv(raw_path)
+            if fitted:
+                df, params = fit_clean_data(raw, workers)
+            else:
+                df = transform_clean_data(raw, params, workers)
+            tmp_outputs = save_clean_data(df, parquet_path=tmp[CLEAN_PARQUET_PATH], csv_path=tmp[CLEAN_CSV_PATH],
+                                          workers=workers)
+        outputs = [path for path, tmp_path in tmp.items() if tmp_path in tmp_outputs]
+        for path in outputs:
+            os.replace(tmp[path], path)
+    finally:
+        for tmp_path in tmp.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    if fitted:
+        save_params(params)
+        written.append(PARAMS_PATH)
+    _write_json({
+        "version": PARAMS_VERSION,
+        "source": raw_path,
+        "source_stamp": stamp,
+        "source_sha256": source_sha256,
+        "params_sha256": params_fingerprint(params),
+        "outputs": outputs,
+    }, META_PATH, indent=2)
+    return written + outputs
+
 if __name__ == "__main__":
-    df_clean = load_and_clean_data()
-    df_clean.to_csv("data/application_train_clean.csv", index=False)
-    print("✅ Cleaned dataset saved to data/application_train_clean.csv")
+    parser = argparse.ArgumentParser(description="Clean a raw application extract into the dashboard's data files.")
+    parser.add_argument("path", nargs="?", default=RAW_CSV_PATH)
+    parser.add_argument("--refit", action="store_true", help=f"learn new cleaning parameters from this extract (overwrites {PARAMS_PATH})")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the outputs already match the source file")
+    parser.add_argument("--chunksize", type=int, nargs="?", const=DEFAULT_CHUNKSIZE,
+                        help=f"stream the file in chunks of this many rows (default {DEFAULT_CHUNKSIZE:,}) for extracts larger than RAM")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to use (0 = one per CPU); output is identical to a single process")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count()
+    written = prepare_clean_data(args.path, refit=args.refit, force=args.force, chunksize=args.chunksize, workers=workers)
+    if not written:
+        print("✅ Cleaned dataset is up to date")
+    for out_path in written:
+        print(f"✅ Saved {out_path}")
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+import streamlit as st
+from streamlit import runtime
+
+# Time each rerun's data loading, filtering, page sections and figures (off by default)
+PROFILE = os.environ.get("DASHBOARD_PROFILE", "0") == "1"
+# One JSON object per rerun is appended here while profiling
+PROFILE_LOG = os.environ.get("DASHBOARD_PROFILE_LOG", "data/profile.jsonl")
+
+_log_lock = threading.Lock()
+
+class RunProfile:
+    """Spans recorded during one rerun of one page (appended from any thread)."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.wall_time = time.time()
+        self.spans = []
+        self.section = None
+        self._lock = threading.Lock()
+
+    def add(self, name, start, end, **fields):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start_ms": round((start - self.started) * 1000, 3),
+                "ms": round((end - start) * 1000, 3),
+                "thread": threading.current_thread().name,
+                **fields,
+            })
+
+    def close_section(self, now):
+        if self.section is not None:
+            name, start = self.section
+            self.add(f"section:{name}", start, now)
+            self.section = None
+
+def _current():
+    if not PROFILE or not runtime.exists():
+        return None
+    try:
+        return st.session_state.get("profile_run")
+    except Exception:
+        return None  # a thread without the session's script context
+
+def start_profile(page):
+    """Begin recording this rerun of `page`; no-op unless DASHBOARD_PROFILE=1."""
+    if PROFILE and runtime.exists():
+        st.session_state["profile_run"] = RunProfile(page)
+
+@contextmanager
+def _timed(run, name, fields):
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        run.add(name, start, time.perf_counter(), **fields)
+
+def span(name, **fields):
+    """Context manager timing a block of the current rerun.
+
+    Yields a dict that the block can add fields to (e.g. a payload size).
+    Costs next to nothing when profiling is off.
+    """
+    run = _current()
+    if run is None:
+        return nullcontext({})
+    return _timed(run, name, fields)
+
+def section(name):
+    """Mark the start of a page section; it runs until the next section or `finish_profile()`."""
+    run = _current()
+    if run is None:
+        return
+    now = time.perf_counter()
+    run.close_section(now)
+    run.section = (name, now)
+
+def finish_profile():
+    """Close the rerun: show the sidebar debug panel and append the run to PROFILE_LOG."""
+    run = _current()
+    if run is None:
+        return
+    now = time.perf_counter()
+    run.close_section(now)
+    total_ms = round((now - run.started) * 1000, 3)
+    record = {"ts": run.wall_time, "page": run.page, "total_ms": total_ms, "spans": run.spans}
+
+    with st.sidebar.expander("⏱️ Render profile"):
+        st.caption(f"{run.page}: {total_ms:.0f} ms this rerun")
+        if run.spans:
+            table = pd.DataFrame(run.spans)
+            st.dataframe(table.drop(columns=["thread"]), hide_index=True, use_container_width=True)
+
+    if PROFILE_LOG:
+        os.makedirs(os.path.dirname(PROFILE_LOG) or ".", exist_ok=True)
+        with _log_lock, open(PROFILE_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+    del st.session_state["profile_run"]
@@ -0,0 +1,346 @@
+import hashlib
+import os
+import threading
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.cache import LRUCache
+from utils.filters import (FILTER_COLUMNS, FilterEngine, apply_global_filters, filter_rows, load_data,
+                           normalize_filters)
+from utils.store import get_lazy_dataset
+
+# Answer KPIs and charts of large slices from a stratified sample (off by default: everything is exact)
+APPROX = os.environ.get("DASHBOARD_APPROX", "0") == "1"
+# Largest accepted 95% confidence half-width, relative to the estimate
+APPROX_ERROR = float(os.environ.get("DASHBOARD_APPROX_ERROR", "0.02"))
+# Slices (and datasets) with at most this many rows are always computed exactly
+EXACT_ROWS = int(os.environ.get("DASHBOARD_APPROX_EXACT_ROWS", "200000"))
+
+# Nested sample sizes tried in order; each is stratified by TARGET with proportional allocation
+SAMPLE_SIZES = (20_000, 200_000, 2_000_000)
+Z_95 = 1.959964
+
+# Memory budget for sampled columns, shared by every session (0 = room for the largest sample of every column)
+SAMPLE_CACHE_MB = float(os.environ.get("DASHBOARD_SAMPLE_CACHE_MB", "0"))
+
+class Estimate(NamedTuple):
+    value: float
+    half_width: float  # of the 95% confidence interval; 0 when exact
+    exact: bool
+    rows: int  # rows the value was computed from
+
+class RowOrder:
+    """A random permutation of the dataset's row positions, fixed per dataset version.
+
+    Seeded by the version, so every rerun, session and process sees the same
+    order until the data changes. Taking the first rows of a slice in this
+    order is a uniform random sample of it that stays put between reruns.
+    """
+
+    def __init__(self, n_rows, version):
+        self.seed = int(hashlib.sha256(str(version).encode("utf-8")).hexdigest()[:16], 16)
+        self.n_rows = n_rows
+        order = np.random.default_rng(self.seed).permutation(n_rows)
+        self.order = order.astype(np.int32) if n_rows < 2**31 else order
+        self.order.flags.writeable = False
+
+    def head(self, rows, n, valid=None):
+        """First `n` of `rows` (sorted positions, None for every row) in permuted order.
+
+        Walks the permutation in doubling blocks, so the cost is about
+        n / (share of rows kept) whatever the dataset size. `valid(candidates)`
+        can drop further rows, e.g. ones with missing values.
+        """
+        if rows is not None and not len(rows):
+            return self.order[:0]
+        picked, found, start, step = [], 0, 0, max(4 * n, 1024)
+        while found < n and start < self.n_rows:
+            candidates = self.order[start:start + step]
+            if rows is not None:
+                at = np.minimum(np.searchsorted(rows, candidates), len(rows) - 1)
+                candidates = candidates[rows[at] == candidates]
+            if valid is not None and len(candidates):
+                candidates = candidates[valid(candidates)]
+            picked.append(candidates[:n - found])
+            found += len(picked[-1])
+            start, step = start + step, step * 2
+        return np.concatenate(picked) if picked else self.order[:0]
+
+@st.cache_resource(show_spinner=False)
+def _row_order(version, n_rows):
+    return RowOrder(n_rows, version)
+
+def get_row_order():
+    dataset = get_lazy_dataset()
+    return _row_order(dataset.version, dataset.n_rows)
+
+def sample_rows(df, filters, n, dropna=()):
+    """Stable stand-in for `apply_global_filters(df, filters).dropna(subset=dropna).sample(n)`.
+
+    The first `n` rows of the slice in the dataset's fixed random order: the
+    same rows for the same filter state on every rerun, without materializing
+    the slice. Frames not handed out by the dataset fall back to a sample
+    seeded the same way.
+    """
+    order = get_row_order()
+    dropna = list(dropna)
+    if not get_lazy_dataset().owns(df):
+        frame = apply_global_filters(df, filters).dropna(subset=dropna)
+        return frame.sample(min(n, len(frame)), random_state=order.seed % 2**32)
+    rows = None if filters is None else filter_rows(df, filters)
+    valid = None
+    if dropna:
+        valid = lambda candidates: df[dropna].take(candidates).notna().all(axis=1).to_numpy()
+    return df.take(order.head(rows, n, valid))
+
+class StratifiedSamples:
+    """Nested random samples of the dataset, stratified by TARGET, fixed per dataset version.
+
+    Each TARGET class keeps its rows in the dataset's RowOrder; a sample of
+    size n takes the first n·N_h/N rows of every class h. Every sample
+    contains the smaller ones, the default mix is exactly the population's,
+    and the same version gives the same samples in every process and after
+    restarts.
+    """
+
+    def __init__(self, target, order, n_columns=1):
+        self.n_rows = len(target)
+        self.levels, codes = np.unique(np.asarray(target), return_inverse=True)
+        ordered = codes[order]
+        self.strata = [order[ordered == h] for h in range(len(self.levels))]
+        self.sizes = [size for size in SAMPLE_SIZES if size < self.n_rows]
+        # Columns are cached one by one, so pages asking for overlapping column sets share them
+        max_bytes = SAMPLE_CACHE_MB * 2**20
+        if not max_bytes:
+            max_bytes = max(self.sizes, default=0) * 8 * (n_columns + 1)  # 8 bytes a value, plus the index
+        self._columns = LRUCache(max_bytes)
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._engines = {}
+
+    def rows(self, size):
+        """(sorted row positions, stratum of each, population and sample count per stratum) of a sample."""
+        with self._lock:
+            if size not in self._rows:
+                population = np.array([len(rows) for rows in self.strata])
+                taken = np.maximum(np.round(population * size / self.n_rows).astype(np.int64), 1)
+                taken = np.minimum(taken, population)
+                rows = np.concatenate([stratum[:n] for stratum, n in zip(self.strata, taken)])
+                strata = np.repeat(np.arange(len(self.strata)), taken)
+                order = np.argsort(rows, kind="stable")
+                self._rows[size] = (rows[order], strata[order], population, taken)
+            return self._rows[size]
+
+    def frame(self, df, size):
+        """The sample's rows of a dataset frame `df` and a filter index over them.
+
+        The sampled columns are cached per column and the filter index per
+        size, so the frame is reassembled without copying any values.
+        """
+        rows = self.rows(size)[0]
+        index = self._columns.get_or_compute(("index", size), lambda: df.index.take(rows))
+        data = {col: self._columns.get_or_compute(("column", size, col), lambda col=col: df[col].array.take(rows))
+                for col in df.columns}
+        sample = pd.DataFrame(data, index=index, copy=False)
+        with self._lock:
+            engine = self._engines.get(size)
+        if engine is None:
+            engine = FilterEngine(sample[FILTER_COLUMNS])
+            with self._lock:
+                engine = self._engines.setdefault(size, engine)
+        return sample, engine
+
+@st.cache_resource(show_spinner="Drawing samples…")
+def _samples(version):
+    return StratifiedSamples(load_data(["TARGET"])["TARGET"].to_numpy(), get_row_order().order,
+                             len(get_lazy_dataset().columns))
+
+def get_samples():
+    """Samples of the current dataset, or None when approximate mode is off or the dataset is small."""
+    if not APPROX:
+        return None
+    dataset = get_lazy_dataset()
+    if dataset.n_rows <= EXACT_ROWS:
+        return None
+    return _samples(dataset.version)
+
+def _values(frame, y):
+    values = y(frame) if callable(y) else frame[y]
+    return np.asarray(values, dtype="float64")
+
+def _domain(frame, mask, where):
+    d = np.ones(len(frame), dtype=bool) if mask is None else mask.copy()
+    for col, value in (where or {}).items():
+        d &= (frame[col] == value).to_numpy()
+    return d
+
+def _stratified_var(z, strata, population, taken):
+    """Variance of the expanded total of `z`: sum over strata of N_h² (1 - n_h/N_h) s²_h / n_h."""
+    var = 0.0
+    for h, (big_n, n) in enumerate(zip(population, taken)):
+        if n < 2:
+            continue
+        zh = z[strata == h]
+        var += big_n ** 2 * (1 - n / big_n) * zh.var(ddof=1) / n
+    return var
+
+def _weighted_quantile(values, weights, q):
+    order = np.argsort(values, kind="stable")
+    cum = np.cumsum(weights[order])
+    return values[order][min(np.searchsorted(cum, q * cum[-1]), len(values) - 1)]
+
+class SliceView:
+    """KPIs and a chart frame for the filtered slice of `df`, exact or estimated from a sample.
+
+    With approximate mode off, or when the slice is small (EXACT_ROWS), the
+    slice is filtered as usual and every answer is exact. Otherwise each KPI
+    is estimated from the smallest sample whose 95% confidence interval is
+    within APPROX_ERROR of the estimate (exact if none is), and `frame` is
+    the slice of the smallest sample that pins the default rate down that
+    well, for charts.
+    """
+
+    def __init__(self, df, filters):
+        self.df = df
+        self.filters = filters
+        self.samples = get_samples()
+        if self.samples is not None and (not self.samples.sizes or not get_lazy_dataset().owns(df)):
+            self.samples = None  # sample rows are positions in the shared dataset's frames
+        self._exact = None
+        self._slices = {}
+        self.sample_size = None
+        if self.samples is not None:
+            # Slice size estimated from the smallest sample decides whether sampling pays off
+            if self._estimate(self.samples.sizes[0], "count", None, None).value <= EXACT_ROWS:
+                self.samples = None
+            else:
+                self.sample_size = self._first_size(lambda size: self._estimate(size, "mean", "TARGET", None))
+
+    @property
+    def approximate(self):
+        return self.sample_size is not None
+
+    @property
+    def exact_frame(self):
+        if self._exact is None:
+            self._exact = apply_global_filters(self.df, self.filters)
+        return self._exact
+
+    @property
+    def frame(self):
+        """Frame for charts: the exact slice, or the slice of the chosen sample."""
+        if not self.approximate:
+            return self.exact_frame
+        sample, mask, _ = self._slice(self.sample_size)
+        return sample if mask is None else sample[mask]
+
+    @property
+    def cache_key(self):
+        """Cache key for summaries of `frame` (the filter state, plus the sample size when sampled)."""
+        key = normalize_filters(self.filters)
+        return key + ((("sample", self.sample_size),) if self.approximate else ())
+
+    def caption(self):
+        if not self.approximate:
+            return None
+        return (f"≈ Approximate mode: charts are drawn from a {self.sample_size:,}-row sample stratified by TARGET "
+                f"(counts are sample counts); sampled KPIs show their 95% confidence interval.")
+
+    def _slice(self, size):
+        if size not in self._slices:
+            sample, engine = self.samples.frame(self.df, size)
+            mask = None if self.filters is None else engine.mask(self.filters)
+            self._slices[size] = (sample, mask, self.samples.rows(size))
+        return self._slices[size]
+
+    def _first_size(self, estimate):
+        for size in self.samples.sizes:
+            est = estimate(size)
+            if np.isfinite(est.value) and est.half_width <= APPROX_ERROR * abs(est.value):
+                return size
+        return None
+
+    def _estimate(self, size, kind, y, where):
+        sample, mask, (_, strata, population, taken) = self._slice(size)
+        weights = (population / taken)[strata]
+        d = _domain(sample, mask, where)
+        if kind == "count":
+            total = float(weights[d].sum())
+            half = Z_95 * np.sqrt(_stratified_var(d.astype("float64"), strata, population, taken))
+            return Estimate(total, half, False, int(d.sum()))
+
+        values = _values(sample, y)
+        d &= ~np.isnan(values)
+        size_d = weights[d].sum()
+        if not d.any():
+            return Estimate(np.nan, np.nan, False, 0)
+        if kind == "mean":
+            value = float((weights[d] * values[d]).sum() / size_d)
+            z = np.where(d, values - value, 0.0) / size_d
+            half = Z_95 * np.sqrt(_stratified_var(z, strata, population, taken))
+            return Estimate(value, half, False, int(d.sum()))
+
+        # Median with a Woodruff interval: the CI of the CDF at the median, mapped back through the quantiles
+        value = float(_weighted_quantile(values[d], weights[d], 0.5))
+        below = np.where(d, (values <= value) - 0.5, 0.0) / size_d
+        se = np.sqrt(_stratified_var(below, strata, population, taken))
+        low = _weighted_quantile(values[d], weights[d], max(0.5 - Z_95 * se, 0.0))
+        high = _weighted_quantile(values[d], weights[d], min(0.5 + Z_95 * se, 1.0))
+        return Estimate(value, float(high - low) / 2, False, int(d.sum()))
+
+    def _exact_estimate(self, kind, y, where):
+        frame = self.exact_frame
+        d = _domain(frame, None, where)
+        if kind == "count":
+            return Estimate(float(d.sum()), 0.0, True, len(frame))
+        values = _values(frame, y)[d]
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return Estimate(np.nan, 0.0, True, 0)
+        value = values.mean() if kind == "mean" else np.median(values)
+        return Estimate(float(value), 0.0, True, len(values))
+
+    def _answer(self, kind, y=None, where=None):
+        if self.samples is None:
+            return self._exact_estimate(kind, y, where)
+        for size in self.samples.sizes:
+            est = self._estimate(size, kind, y, where)
+            if np.isfinite(est.value) and est.half_width <= APPROX_ERROR * abs(est.value):
+                return est
+        return self._exact_estimate(kind, y, where)
+
+    def count(self, where=None):
+        """Rows in the slice (restricted by `where`, {column: value})."""
+        return self._answer("count", where=where)
+
+    def mean(self, y, where=None):
+        """Mean of column `y` (or of `y(frame)`, e.g. a condition for a share) over the slice, NaNs skipped."""
+        return self._answer("mean", y, where)
+
+    def median(self, y, where=None):
+        return self._answer("median", y, where)
+
+def slice_view(df, filters):
+    return SliceView(df, filters)
+
+def difference(a, b):
+    """a - b for estimates over different TARGET classes (sampled independently, so the variances add)."""
+    return Estimate(a.value - b.value, float(np.hypot(a.half_width, b.half_width)), a.exact and b.exact, a.rows + b.rows)
+
+def format_estimate(estimate, fmt="{:,.2f}", scale=1.0, na="N/A"):
+    """Text of an Estimate, with "± half-width" of its 95% interval when it is uncertain."""
+    if estimate.value is None or not np.isfinite(estimate.value):
+        return na
+    text = fmt.format(estimate.value * scale)
+    if np.isfinite(estimate.half_width) and estimate.half_width > 0:
+        text += f" ± {fmt.format(estimate.half_width * scale)}"
+    return text
+
+def metric(col, label, estimate, fmt="{:,.2f}", scale=1.0, na="N/A"):
+    """`col.metric` of an Estimate; sampled ones show their interval and say where it came from."""
+    help = None
+    if not estimate.exact and estimate.half_width > 0:
+        help = f"95% confidence interval, estimated from {estimate.rows:,} sampled rows"
+    col.metric(label, format_estimate(estimate, fmt, scale, na), help=help)
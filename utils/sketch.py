@@ -0,0 +1,98 @@
+import numpy as np
+
+class QuantileSketch:
+    """Mergeable approximate quantiles over a stream of numbers (KLL-style compactors).
+
+    Level i holds items that each stand for 2**i input values. When a level
+    overflows, it is sorted and every other item is promoted one level up,
+    so memory stays around a few times `k` values however long the stream is.
+    Rank error is roughly 1/k of the count. The sketch is exact until the
+    first compaction, and the min and max are always exact. Values added with
+    a weight (e.g. a fill value standing in for many missing entries) are kept
+    exactly on the side. Compaction offsets alternate deterministically, so the
+    same input gives the same answers.
+    """
+
+    def __init__(self, k=4096):
+        self.k = int(k)
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.weighted = {}  # value -> weight
+        self._offset = 0
+
+    def update(self, values, weight=1):
+        """Add `values` (NaNs ignored), each counted `weight` times."""
+        values = np.asarray(values, dtype="float64").ravel()
+        values = values[~np.isnan(values)]
+        if not len(values) or weight <= 0:
+            return self
+        self.count += len(values) * int(weight)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        if weight == 1:
+            self._add(0, values)
+            self._compress()
+        else:
+            for value in values:
+                self.weighted[value] = self.weighted.get(value, 0) + int(weight)
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for level, items in enumerate(other.levels):
+            self._add(level, items)
+        for value, weight in other.weighted.items():
+            self.weighted[value] = self.weighted.get(value, 0) + weight
+        self._compress()
+        return self
+
+    def _add(self, level, items):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0))
+        self.levels[level] = np.concatenate([self.levels[level], items])
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 8)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                self._add(level + 1, pairs[self._offset::2])
+                self._offset ^= 1
+                self.levels[level] = keep
+            level += 1
+
+    def quantile(self, q):
+        """Linearly interpolated quantile(s), like `Series.quantile` (exact before any compaction)."""
+        scalar = np.ndim(q) == 0
+        qs = np.atleast_1d(np.asarray(q, dtype="float64"))
+        if not self.count:
+            result = np.full(len(qs), np.nan)
+            return result[0] if scalar else result
+        values = np.concatenate(self.levels + [np.fromiter(self.weighted, dtype="float64", count=len(self.weighted))])
+        weights = np.concatenate(
+            [np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)]
+            + [np.fromiter(self.weighted.values(), dtype="float64", count=len(self.weighted))]
+        )
+        order = np.argsort(values, kind="stable")
+        values, ends = values[order], np.cumsum(weights[order])
+
+        def at_rank(rank):
+            # Item occupying 0-based rank `rank` in the weighted sorted order
+            return values[np.minimum(np.searchsorted(ends, rank, side="right"), len(values) - 1)]
+
+        rank = qs * (ends[-1] - 1)
+        low, high = np.floor(rank), np.ceil(rank)
+        result = at_rank(low) + (at_rank(high) - at_rank(low)) * (rank - low)
+        result = np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
+        return float(result[0]) if scalar else result
@@ -0,0 +1,236 @@
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.columns import open_columns, write_columns
+from utils.profiling import span
+from utils.prep import (
+    RAW_CSV_PATH, apply_schema, clean_data_columns, clean_data_profile, clean_data_stale, dataset_version,
+    prepare_clean_data, read_clean_data,
+)
+
+log = logging.getLogger(__name__)
+
+# Relative error accepted when narrowing floats to float32 in memory (the data files keep full precision)
+FLOAT32_RTOL = 1e-6
+
+# Rebuild stale cleaned files from the raw extract when a server process starts (normally `python -m utils.prep`)
+PREPARE_ON_START = os.environ.get("DASHBOARD_PREPARE_ON_START", "0") == "1"
+
+# Serve the dataset from memory-mapped column files shared by every server process on the host
+USE_COLUMN_STORE = os.environ.get("DASHBOARD_COLUMN_STORE", "0") == "1"
+# Bump when derived columns or in-memory dtypes change, so stale column files are rebuilt
+COLUMN_STORE_VERSION = 2
+
+# Columns add_derived_columns computes on load, in the order it appends them, and their inputs
+DERIVED_COLUMNS = ["DTI", "LTI", "ANNUITY_TO_CREDIT", "INCOME_BRACKET"]
+DERIVED_INPUTS = ["AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY"]
+
+def add_derived_columns(df):
+    """Affordability ratios and the income bracket every page charts."""
+    # Ensure financial columns exist so the ratios are always defined
+    for col in ["AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY", "AMT_GOODS_PRICE"]:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    # Safe ratios (avoid division by zero)
+    income = df["AMT_INCOME_TOTAL"].replace({0: np.nan})
+    df["DTI"] = df["AMT_ANNUITY"] / income
+    df["LTI"] = df["AMT_CREDIT"] / income
+    df["ANNUITY_TO_CREDIT"] = df["AMT_ANNUITY"] / df["AMT_CREDIT"].replace({0: np.nan})
+
+    # Income bracket (if not present)
+    if "INCOME_BRACKET" not in df.columns:
+        try:
+            df["INCOME_BRACKET"] = pd.qcut(
+                df["AMT_INCOME_TOTAL"].fillna(df["AMT_INCOME_TOTAL"].median()),
+                q=[0, 0.25, 0.75, 1.0],
+                labels=["Low", "Mid", "High"]
+            )
+        except Exception:
+            df["INCOME_BRACKET"] = "Unknown"
+
+    return df
+
+def plain_column_nbytes(df):
+    """Per-column footprint of `df` with plain dtypes: object strings and 8-byte numbers, as `read_csv` gives."""
+    sizes = {}
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype) or s.dtype == object:
+            sizes[col] = int(s.astype(object).memory_usage(deep=True, index=False))
+        else:
+            sizes[col] = 8 * len(s)
+    return sizes
+
+def plain_nbytes(df):
+    return int(df.index.memory_usage()) + sum(plain_column_nbytes(df).values())
+
+def build_dataset():
+    """Cleaned data with derived columns in compact dtypes, and its per-column footprint with plain dtypes."""
+    df = add_derived_columns(read_clean_data())
+    before = plain_column_nbytes(df)
+    return apply_schema(df, float_rtol=FLOAT32_RTOL), before
+
+@st.cache_resource(show_spinner="Mapping dataset…")
+def get_column_store():
+    """Memory-mapped column files of the dataset (written by the first process to need them), or None."""
+    if not USE_COLUMN_STORE:
+        return None
+    version = f"{dataset_version()}-{COLUMN_STORE_VERSION}"
+    columns = open_columns(version)
+    if columns is None:
+        df, before = build_dataset()
+        write_columns(df, version, extra={"plain_bytes": before})
+        columns = open_columns(version)
+    return columns
+
+class LazyDataset:
+    """The cleaned, derived dataset, read one column at a time as pages ask for them.
+
+    Each column is read (Parquet projection, CSV `usecols`, or a memory-mapped
+    `.npy` file), narrowed with `apply_schema` and kept read-only for every
+    later session, so memory grows only with the columns actually used.
+    Derived ratios are computed from their inputs on first request. `frame()`
+    returns the same DataFrame object for the same column set, so per-frame
+    indexes (the filter engine, caches keyed on identity) keep working.
+    """
+
+    def __init__(self, columns=None, version=None):
+        self.store = columns
+        self.version = version
+        if columns is not None:
+            # Built from the full frame: derived columns are stored like any other
+            names, self.derived = list(columns.entries), set()
+        else:
+            names = clean_data_columns()
+            self.derived = {"DTI", "LTI", "ANNUITY_TO_CREDIT"} | ({"INCOME_BRACKET"} - set(names))
+        self.columns = names + [col for col in DERIVED_COLUMNS if col in self.derived and col not in names]
+        self._series = {}
+        self._plain = {}
+        self._frames = {}
+        self._profile = None
+        self._lock = threading.RLock()
+
+    def _read(self, names):
+        """Compact, read-only columns `names` (not cached) and their plain-dtype sizes."""
+        if self.store is not None:
+            df = self.store.frame(names)
+            return df, {col: self.store.manifest["plain_bytes"][col] for col in names}
+        derived = [col for col in names if col in self.derived]
+        read = [col for col in names if col not in self.derived]
+        if derived:
+            read += [col for col in DERIVED_INPUTS if col not in read]
+        df = read_clean_data(columns=read)
+        if derived:
+            df = add_derived_columns(df)
+        df = df[names]
+        before = plain_column_nbytes(df)
+        # Shared by every session and never modified in place; with copy-on-write (pandas >= 3)
+        # a page that writes to a column gets its own copy, and `to_numpy()` views are read-only
+        return apply_schema(df, float_rtol=FLOAT32_RTOL), before
+
+    def _load(self, names):
+        missing = [col for col in names if col not in self._series]
+        if not missing:
+            return
+        with span("load_columns", columns=len(missing), mapped=self.store is not None):
+            df, before = self._read(missing)
+        for col in missing:
+            self._series[col] = df[col]
+            self._plain[col] = before[col]
+        after = int(df.memory_usage(deep=True, index=False).sum())
+        log.debug("Loaded %d column(s): %.1f MB (%d/%d columns in memory)",
+                  len(missing), after / 2**20, len(self._series), len(self.columns))
+
+    def frame(self, columns=None):
+        """Read-only DataFrame of `columns` (all by default) in file order; unknown names are skipped."""
+        wanted = set(self.columns if columns is None else columns)
+        names = tuple(col for col in self.columns if col in wanted)
+        with self._lock:
+            df = self._frames.get(names)
+            if df is None:
+                self._load(names)
+                data = {col: self._series[col] for col in names}
+                df = pd.DataFrame(data, index=pd.RangeIndex(self.n_rows), copy=False)
+                self._frames[names] = df
+            return df
+
+    @property
+    def n_rows(self):
+        if self.store is not None:
+            return self.store.manifest["rows"]
+        with self._lock:
+            self._load(self.columns[:1])
+            return len(self._series[self.columns[0]])
+
+    def owns(self, df):
+        """Whether `df` is one of the frames handed out by `frame()`."""
+        return any(df is frame for frame in self._frames.values())
+
+    def profile(self):
+        """{column: (is_numeric, missing count)} over the whole dataset.
+
+        Taken from file metadata where it is recorded; other columns are read
+        once without being kept (derived ones are loaded as usual).
+        """
+        with self._lock:
+            if self._profile is None:
+                if self.store is not None:
+                    known = {entry["name"]: ("categories" not in entry, entry.get("nulls"))
+                             for entry in self.store.manifest["columns"]}
+                else:
+                    known = clean_data_profile()
+                profile = {}
+                for col in self.columns:
+                    numeric, nulls = known.get(col, (None, None))
+                    if col in self.derived or nulls is None:
+                        if col in self.derived:
+                            s = self.frame([col])[col]
+                        elif col in self._series:
+                            s = self._series[col]
+                        else:
+                            s = self._read([col])[0][col]
+                        numeric, nulls = pd.api.types.is_numeric_dtype(s.dtype), int(s.isna().sum())
+                    profile[col] = (numeric, nulls)
+                self._profile = profile
+            return self._profile
+
+    def memory_report(self):
+        """Row count and footprint of the loaded columns, compact vs plain dtypes."""
+        with self._lock:
+            loaded = list(self._series)
+            return {
+                "rows": self.n_rows,
+                "plain_bytes": int(sum(self._plain[col] for col in loaded)),
+                "compact_bytes": int(sum(self._series[col].memory_usage(deep=True, index=False) for col in loaded)),
+                "mapped": self.store is not None,
+                "loaded_columns": len(loaded),
+                "total_columns": len(self.columns),
+            }
+
+@st.cache_resource(show_spinner="Opening dataset…")
+def get_lazy_dataset():
+    """The per-process `LazyDataset`; nothing is read until a page asks for columns.
+
+    The cleaned files are built by `python -m utils.prep`; if the raw extract
+    changed since (size or mtime), a warning is logged, and with
+    DASHBOARD_PREPARE_ON_START=1 they are rebuilt here instead.
+    With DASHBOARD_COLUMN_STORE=1 columns come from memory-mapped `.npy` files
+    shared by all server processes on the host (see utils.columns).
+    """
+    if os.path.exists(RAW_CSV_PATH) and clean_data_stale(RAW_CSV_PATH):
+        if PREPARE_ON_START:
+            with span("prepare_clean_data"):
+                prepare_clean_data(RAW_CSV_PATH)
+        else:
+            log.warning("%s changed since the cleaned files were built; run `python -m utils.prep` to rebuild them",
+                        RAW_CSV_PATH)
+    return LazyDataset(get_column_store(), dataset_version())
+
+def memory_report():
+    """Row count and in-memory footprint of the loaded columns, compact vs plain dtypes."""
+    return get_lazy_dataset().memory_report()
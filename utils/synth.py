@@ -0,0 +1,420 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from utils.columns import COLUMNS_DIR, ColumnWriter
+from utils.prep import (
+    CLEAN_CSV_PATH, CLEAN_PARQUET_PATH, META_PATH, PARAMS_PATH, PARAMS_VERSION, RAW_CSV_PATH, apply_schema,
+    clean_data_columns, load_params,
+)
+from utils.store import COLUMN_STORE_VERSION, add_derived_columns, plain_column_nbytes
+
+# Bump when the generated distributions change, so datasets (and caches keyed on their version) differ
+SYNTH_VERSION = 2
+
+# Rows generated per chunk; also the unit of seeding, so the same seed and chunk size give the same rows
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+FORMATS = ["parquet", "csv", "columns"]
+
+# Category levels after cleaning (rare labels merged into "Other"), with their shares before imputation
+LEVELS = {
+    "NAME_CONTRACT_TYPE": {"Cash loans": 0.905, "Revolving loans": 0.095},
+    "CODE_GENDER": {"F": 0.658, "M": 0.342, "Other": 0.00002},
+    "FLAG_OWN_CAR": {"N": 0.66, "Y": 0.34},
+    "NAME_EDUCATION_TYPE": {"Higher education": 0.243, "Incomplete higher": 0.033, "Lower secondary": 0.0124,
+                            "Secondary / secondary special": 0.7106, "Other": 0.0005},
+    "NAME_FAMILY_STATUS": {"Civil marriage": 0.097, "Married": 0.639, "Separated": 0.064,
+                           "Single / not married": 0.148, "Widow": 0.052, "Other": 0.00001},
+    "NAME_HOUSING_TYPE": {"House / apartment": 0.887, "Municipal apartment": 0.036, "Rented apartment": 0.016,
+                          "With parents": 0.048, "Other": 0.013},
+    # Shares among applicants with a recorded occupation; the rest are imputed as "Laborers"
+    "OCCUPATION_TYPE": {"Accountants": 0.046, "Cleaning staff": 0.022, "Cooking staff": 0.028, "Core staff": 0.130,
+                        "Drivers": 0.088, "High skill tech staff": 0.054, "Laborers": 0.261, "Managers": 0.101,
+                        "Medicine staff": 0.040, "Other": 0.046, "Sales staff": 0.152, "Security staff": 0.032},
+    # Shares among employed applicants; pensioners are "XNA"
+    "ORGANIZATION_TYPE": {"Business Entity Type 2": 0.042, "Business Entity Type 3": 0.270, "Construction": 0.027,
+                          "Government": 0.041, "Kindergarten": 0.027, "Medicine": 0.044, "Other": 0.327,
+                          "School": 0.035, "Self-employed": 0.152, "Trade: type 7": 0.031, "XNA": 0.004},
+}
+INCOME_BRACKETS = ["Low", "Mid", "High"]
+
+# Share of raw values that are missing and come out of cleaning as the fitted median / mode (FILLS, the
+# medians of the generated values). Pensioners' EMPLOYMENT_YEARS and missing occupations are imputed too.
+IMPUTED = {"AMT_ANNUITY": 0.00004, "AMT_GOODS_PRICE": 0.0009, "CNT_FAM_MEMBERS": 0.00001, "EXT_SOURCE_1": 0.564,
+           "EXT_SOURCE_2": 0.0021, "AMT_REQ_CREDIT_BUREAU_YEAR": 0.135}
+FILLS = {"AMT_ANNUITY": 24762.2, "AMT_GOODS_PRICE": 461000.0, "CNT_FAM_MEMBERS": 2, "EXT_SOURCE_1": 0.527,
+         "EXT_SOURCE_2": 0.587, "AMT_REQ_CREDIT_BUREAU_YEAR": 1, "OCCUPATION_TYPE": "Laborers",
+         "EMPLOYMENT_YEARS": 4.29}
+
+# Log-normal income and credit (weakly tied to income, as in the real extract); clipped at their 1%/99% quantiles
+INCOME_MEDIAN, INCOME_SIGMA = 147150.0, 0.5
+CREDIT_MEDIAN, CREDIT_SIGMA = 513531.0, 0.5
+WINSOR_BOUNDS = {"AMT_INCOME_TOTAL": (44800.0, 485300.0), "AMT_CREDIT": (152408.2, 1730669.4),
+                 "AMT_ANNUITY": (6486.5, 94117.1), "AGE_YEARS": (21.5, 68.5)}
+# Quartile edges of the income (Low < 25% <= Mid <= 75% < High)
+INCOME_BRACKET_EDGES = (103900.0, 207500.0)
+
+# Cleaned columns in pipeline order, with their stored dtypes ("category" uses LEVELS)
+SCHEMA = {
+    "SK_ID_CURR": "int32", "TARGET": "int8", "NAME_CONTRACT_TYPE": "category", "CODE_GENDER": "category",
+    "FLAG_OWN_CAR": "category", "CNT_CHILDREN": "int8", "AMT_INCOME_TOTAL": "float64", "AMT_CREDIT": "float64",
+    "AMT_ANNUITY": "float64", "AMT_GOODS_PRICE": "float32", "NAME_EDUCATION_TYPE": "category",
+    "NAME_FAMILY_STATUS": "category", "NAME_HOUSING_TYPE": "category", "DAYS_BIRTH": "int16",
+    "DAYS_EMPLOYED": "int32", "OCCUPATION_TYPE": "category", "CNT_FAM_MEMBERS": "int8",
+    "ORGANIZATION_TYPE": "category", "EXT_SOURCE_1": "float64", "EXT_SOURCE_2": "float64", "FLAG_MOBIL": "int8",
+    "FLAG_DOCUMENT_3": "int8", "AMT_REQ_CREDIT_BUREAU_YEAR": "int8", "AGE_YEARS": "float64",
+    "EMPLOYMENT_YEARS": "float64", "DTI": "float64", "LOAN_TO_INCOME": "float64", "ANNUITY_TO_CREDIT": "float64",
+    "INCOME_BRACKET": "category",
+}
+
+# Raw labels the model's "Other" level stands for in a raw extract: each under the 1% that cleaning keeps
+RAW_OTHER = {
+    "CODE_GENDER": ["XNA"],
+    "NAME_EDUCATION_TYPE": ["Academic degree"],
+    "NAME_FAMILY_STATUS": ["Unknown"],
+    "NAME_HOUSING_TYPE": ["Office apartment", "Co-op apartment"],
+    "OCCUPATION_TYPE": ["HR staff", "IT staff", "Low-skill Laborers", "Private service staff", "Realty agents",
+                        "Secretaries", "Waiters/barmen staff"],
+}
+# Raw-only columns, missing too often to survive cleaning (> 60%), with their missing shares
+DROPPED = {"OWN_CAR_AGE": 0.66, "COMMONAREA_AVG": 0.7}
+
+def _dtype(col):
+    if col == "INCOME_BRACKET":
+        return pd.CategoricalDtype(INCOME_BRACKETS, ordered=True)
+    if SCHEMA[col] == "category":
+        return pd.CategoricalDtype(list(LEVELS[col]))
+    return np.dtype(SCHEMA[col])
+
+def _draw(rng, col, n):
+    levels = LEVELS[col]
+    p = np.array(list(levels.values()))
+    return rng.choice(len(levels), size=n, p=p / p.sum())
+
+def _applicants(n, start, rng):
+    """The draws behind both raw_chunk and synthetic_chunk: ({column: values}, {column: missing mask}).
+
+    Applicants get a latent risk score; TARGET (about 8% defaults) rises with
+    it, with youth, male gender, lower education and renting, and falls with
+    income and the external scores, so the default-rate charts and
+    correlations look like the real extract's. Categories are codes into
+    LEVELS; values are as drawn, before imputation and winsorizing.
+    """
+    levels = {col: list(LEVELS[col]) for col in LEVELS}
+    codes = {col: _draw(rng, col, n) for col in ["NAME_CONTRACT_TYPE", "CODE_GENDER", "FLAG_OWN_CAR",
+                                                 "NAME_EDUCATION_TYPE", "NAME_FAMILY_STATUS", "NAME_HOUSING_TYPE"]}
+    male = codes["CODE_GENDER"] == levels["CODE_GENDER"].index("M")
+    higher = codes["NAME_EDUCATION_TYPE"] == levels["NAME_EDUCATION_TYPE"].index("Higher education")
+    lower = codes["NAME_EDUCATION_TYPE"] == levels["NAME_EDUCATION_TYPE"].index("Lower secondary")
+    married = np.isin(codes["NAME_FAMILY_STATUS"], [levels["NAME_FAMILY_STATUS"].index(v)
+                                                    for v in ("Married", "Civil marriage")])
+    renting = np.isin(codes["NAME_HOUSING_TYPE"], [levels["NAME_HOUSING_TYPE"].index(v)
+                                                   for v in ("Rented apartment", "With parents")])
+    revolving = codes["NAME_CONTRACT_TYPE"] == levels["NAME_CONTRACT_TYPE"].index("Revolving loans")
+
+    # Age and employment; most applicants past 58 are pensioners (DAYS_EMPLOYED = 365243)
+    days_birth = -rng.integers(7680, 25200, n)
+    age = -days_birth / 365.25
+    pensioner = rng.random(n) < np.where(age >= 58, 0.75, 0.02)
+    employment = np.minimum(rng.exponential(6.5, n), age - 18)
+    days_employed = np.where(pensioner, 365243, -np.floor(employment * 365.25))
+
+    # Money: income by education/gender, credit a multiple of it, annuity by loan type
+    income_shift = 0.2 * higher - 0.1 * lower + 0.15 * male - 0.1  # -0.1 keeps the overall median in place
+    log_income = np.log(INCOME_MEDIAN) + income_shift + rng.normal(0, INCOME_SIGMA, n)
+    income = np.round(np.exp(log_income), -2)
+    log_credit = np.log(CREDIT_MEDIAN) + 0.3 * (log_income - np.log(INCOME_MEDIAN)) + rng.normal(0, CREDIT_SIGMA, n)
+    credit = np.round(np.exp(log_credit), 1)
+    annuity = np.round(credit * np.where(revolving, 0.05, np.exp(rng.normal(np.log(0.048), 0.25, n))), 1)
+    goods = np.round(credit * rng.uniform(0.8, 1.0, n), -3)
+
+    # Latent risk drives the external scores and the default probability
+    risk = rng.normal(0, 1, n)
+    ext_1 = 1 / (1 + np.exp(-(0.05 - 0.9 * risk + 0.03 * (age - 43) + rng.normal(0, 0.6, n))))
+    ext_2 = 1 / (1 + np.exp(-(0.35 - 0.9 * risk + rng.normal(0, 0.6, n))))
+    logit = (-2.65 + 0.75 * risk - 0.025 * (age - 43) + 0.3 * male - 0.35 * higher + 0.35 * lower
+             + 0.3 * renting - 0.15 * (log_income - np.log(INCOME_MEDIAN)) - 0.3 * revolving - 0.25 * pensioner)
+    target = rng.random(n) < 1 / (1 + np.exp(-logit))
+
+    children = np.minimum(rng.poisson(np.where(age < 50, 0.55, 0.15)), 19)
+    occupation = _draw(rng, "OCCUPATION_TYPE", n)
+    organization = _draw(rng, "ORGANIZATION_TYPE", n)
+    organization[pensioner] = levels["ORGANIZATION_TYPE"].index("XNA")
+
+    values = {
+        "SK_ID_CURR": np.arange(100002 + start, 100002 + start + n),
+        "TARGET": target,
+        "NAME_CONTRACT_TYPE": codes["NAME_CONTRACT_TYPE"],
+        "CODE_GENDER": codes["CODE_GENDER"],
+        "FLAG_OWN_CAR": codes["FLAG_OWN_CAR"],
+        "CNT_CHILDREN": children,
+        "AMT_INCOME_TOTAL": income,
+        "AMT_CREDIT": credit,
+        "AMT_ANNUITY": annuity,
+        "AMT_GOODS_PRICE": goods,
+        "NAME_EDUCATION_TYPE": codes["NAME_EDUCATION_TYPE"],
+        "NAME_FAMILY_STATUS": codes["NAME_FAMILY_STATUS"],
+        "NAME_HOUSING_TYPE": codes["NAME_HOUSING_TYPE"],
+        "DAYS_BIRTH": days_birth,
+        "DAYS_EMPLOYED": days_employed,
+        "OCCUPATION_TYPE": occupation,
+        "CNT_FAM_MEMBERS": 1 + married + children,
+        "ORGANIZATION_TYPE": organization,
+        "EXT_SOURCE_1": ext_1,
+        "EXT_SOURCE_2": ext_2,
+        "FLAG_MOBIL": np.ones(n),
+        "FLAG_DOCUMENT_3": rng.random(n) < 0.71,
+        "AMT_REQ_CREDIT_BUREAU_YEAR": np.minimum(rng.poisson(1.9, n), 25),
+    }
+    missing = {col: rng.random(n) < share for col, share in IMPUTED.items()}
+    missing["OCCUPATION_TYPE"] = pensioner | (rng.random(n) < 0.15)
+    return values, missing
+
+def raw_chunk(n, start=0, rng=None):
+    """`n` rows shaped like the raw application_train.csv extract (what `python -m utils.prep` cleans)."""
+    rng = rng if rng is not None else np.random.default_rng()
+    values, missing = _applicants(n, start, rng)
+    columns = {}
+    for col, v in values.items():
+        if col in LEVELS:
+            labels = np.asarray(list(LEVELS[col]), dtype=object)[v]
+            if col in RAW_OTHER:
+                other = labels == "Other"
+                labels[other] = np.asarray(RAW_OTHER[col], dtype=object)[rng.integers(len(RAW_OTHER[col]),
+                                                                                       size=other.sum())]
+            v = labels
+        elif v.dtype == bool:
+            v = v.astype(int)
+        if col in missing:
+            v = np.where(missing[col], np.nan, v)
+        columns[col] = v
+        if col == "DAYS_EMPLOYED":
+            columns["OWN_CAR_AGE"] = np.where(rng.random(n) < DROPPED["OWN_CAR_AGE"], np.nan, rng.integers(0, 30, n))
+        elif col == "EXT_SOURCE_2":
+            columns["COMMONAREA_AVG"] = np.where(rng.random(n) < DROPPED["COMMONAREA_AVG"], np.nan, rng.random(n))
+    return pd.DataFrame(columns)
+
+def write_raw_csv(path, rows, seed=0, chunk_rows=500_000):
+    """Write `rows` synthetic raw rows to `path`, one seeded chunk at a time (memory stays flat at any size)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for i, start in enumerate(range(0, rows, chunk_rows)):
+            rng = np.random.default_rng([seed, i])
+            raw_chunk(min(chunk_rows, rows - start), start, rng).to_csv(f, header=i == 0, index=False)
+    os.replace(tmp, path)
+
+def synthetic_chunk(n, start=0, rng=None):
+    """`n` rows of the cleaned dataset (SCHEMA dtypes), ids starting after `start` earlier rows.
+
+    The same draws as raw_chunk, cleaned with the model's own parameters:
+    missing values take FILLS, rare labels are already "Other", and income,
+    credit, annuity and age are winsorized at WINSOR_BOUNDS.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    values, missing = _applicants(n, start, rng)
+    data = dict(values)
+    occupation = values["OCCUPATION_TYPE"].copy()
+    occupation[missing.pop("OCCUPATION_TYPE")] = list(LEVELS["OCCUPATION_TYPE"]).index(FILLS["OCCUPATION_TYPE"])
+    data["OCCUPATION_TYPE"] = occupation
+    for col, mask in missing.items():
+        data[col] = np.where(mask, FILLS[col], values[col])
+
+    bounds = WINSOR_BOUNDS
+    income = np.clip(data["AMT_INCOME_TOTAL"], *bounds["AMT_INCOME_TOTAL"])
+    credit = np.clip(data["AMT_CREDIT"], *bounds["AMT_CREDIT"])
+    annuity = np.clip(data["AMT_ANNUITY"], *bounds["AMT_ANNUITY"])
+    days_employed = values["DAYS_EMPLOYED"]
+    data.update({
+        "AMT_INCOME_TOTAL": income,
+        "AMT_CREDIT": credit,
+        "AMT_ANNUITY": annuity,
+        "AGE_YEARS": np.clip(-values["DAYS_BIRTH"] / 365.25, *bounds["AGE_YEARS"]),
+        "EMPLOYMENT_YEARS": np.where(days_employed > 0, FILLS["EMPLOYMENT_YEARS"], -days_employed / 365.25),
+        "DTI": annuity / income,
+        "LOAN_TO_INCOME": credit / income,
+        "ANNUITY_TO_CREDIT": annuity / credit,
+        "INCOME_BRACKET": np.searchsorted(INCOME_BRACKET_EDGES, income, side="left"),
+    })
+    columns = {}
+    for col, values in data.items():
+        dtype = _dtype(col)
+        if isinstance(dtype, pd.CategoricalDtype):
+            columns[col] = pd.Categorical.from_codes(np.asarray(values, dtype=np.int8), dtype=dtype)
+        else:
+            columns[col] = np.asarray(values).astype(dtype)
+    return pd.DataFrame(columns)
+
+def reference_schema(params_path=PARAMS_PATH, parquet_path=CLEAN_PARQUET_PATH, csv_path=CLEAN_CSV_PATH,
+                     meta_path=META_PATH):
+    """(column names, cleaning params) of a cleaned table built by `python -m utils.prep`, or None.
+
+    None when the params or the table are missing, or the table is itself synthetic.
+    """
+    params = load_params(params_path)
+    if params is None or not (os.path.exists(parquet_path) or os.path.exists(csv_path)):
+        return None
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            if json.load(f).get("source") == "synthetic":
+                return None
+    return clean_data_columns(parquet_path, csv_path), params
+
+def _generic_column(rng, col, params, n):
+    # Plausible values for a column the model does not draw, from its fitted fill (median or mode)
+    fill = params["fills"].get(col, 0)
+    if col in params["categories"]:
+        levels = params["categories"][col]
+        return pd.Categorical.from_codes(rng.integers(len(levels), size=n), categories=levels)
+    if col.startswith("FLAG_"):
+        return (rng.random(n) < (0.9 if fill else 0.1)).astype(int)
+    if col in params["float_columns"]:
+        return fill * rng.lognormal(0, 0.5, n) if fill else rng.exponential(0.1, n)
+    return np.sign(fill or 1) * rng.poisson(abs(fill), n)
+
+def match_schema(chunk, columns, params, rng):
+    """`chunk` with the column set and order of a reference cleaned table (see `reference_schema`).
+
+    Columns the model does not draw are filled from the reference's fitted
+    parameters and narrowed like prep's Parquet output; model columns the
+    reference lacks are dropped.
+    """
+    extra = [col for col in columns if col not in chunk.columns]
+    if extra:
+        generated = pd.DataFrame({col: _generic_column(rng, col, params, len(chunk)) for col in extra},
+                                 index=chunk.index)
+        chunk = pd.concat([chunk, apply_schema(generated)], axis=1)
+    return chunk[list(columns)]
+
+def _column_chunk(chunk):
+    # The column store holds the dataset as the app keeps it in memory: derived ratios added and
+    # floats narrowed to float32 (always within utils.store.FLOAT32_RTOL for these magnitudes)
+    df = add_derived_columns(chunk.copy())
+    for col in df.columns:
+        if df[col].dtype == np.float64:
+            df[col] = df[col].astype("float32")
+    return df
+
+def synthetic_fingerprint(rows, seed, chunk_rows, columns=None):
+    spec = {"synth_version": SYNTH_VERSION, "rows": rows, "seed": seed, "chunk_rows": chunk_rows}
+    if columns is not None:
+        spec["columns"] = list(columns)
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+def write_synthetic_data(rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, formats=("parquet", "csv"),
+                         parquet_path=CLEAN_PARQUET_PATH, csv_path=CLEAN_CSV_PATH, meta_path=META_PATH,
+                         columns_dir=COLUMNS_DIR, reference=None):
+    """Write `rows` synthetic cleaned rows straight to the loader's files, one chunk at a time.
+
+    `formats` picks the outputs: the cleaned Parquet and CSV files, and the
+    memory-mapped column store the app opens with DASHBOARD_COLUMN_STORE=1.
+    Memory depends on `chunk_rows`, not `rows`. A build fingerprint is written
+    to `meta_path`, so the dataset gets a stable version of its own (and the
+    column store is written under it). With `reference` (see
+    `reference_schema`) the files get that table's columns instead of SCHEMA.
+    Returns the paths written.
+    """
+    formats = list(formats)
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown format(s) {sorted(unknown)}; choose from {FORMATS}")
+    ref_columns, ref_params = reference if reference is not None else (None, None)
+    source_sha256 = synthetic_fingerprint(rows, seed, chunk_rows, ref_columns)
+    params_sha256 = hashlib.sha256(f"synthetic-{SYNTH_VERSION}".encode("utf-8")).hexdigest()
+    version = f"{source_sha256[:12]}-{params_sha256[:12]}"
+
+    pq = None
+    if "parquet" in formats:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("⚠️ pyarrow not installed — skipped columnar output, loaders will use the CSV")
+    for path in (parquet_path, csv_path, meta_path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if pq is None and os.path.exists(parquet_path):
+        os.remove(parquet_path)  # a stale Parquet file would be read instead of the new CSV
+    columns = ColumnWriter(f"{version}-{COLUMN_STORE_VERSION}", rows, columns_dir) if "columns" in formats else None
+
+    writer, csv_file, plain_bytes = None, None, {}
+    try:
+        if "csv" in formats:
+            csv_file = open(csv_path, "w", encoding="utf-8", newline="")
+        for i, start in enumerate(range(0, rows, chunk_rows)):
+            rng = np.random.default_rng([seed, i])
+            chunk = synthetic_chunk(min(chunk_rows, rows - start), start, rng)
+            if ref_columns is not None:
+                chunk = match_schema(chunk, ref_columns, ref_params, rng)
+            if csv_file is not None:
+                csv_file.write(chunk.to_csv(index=False, header=i == 0))
+            if pq is not None:
+                if writer is None:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(parquet_path, table.schema)
+                else:
+                    table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+            if columns is not None:
+                stored = _column_chunk(chunk)
+                for col, size in plain_column_nbytes(stored).items():
+                    plain_bytes[col] = plain_bytes.get(col, 0) + size
+                columns.append(stored)
+    finally:
+        if writer is not None:
+            writer.close()
+        if csv_file is not None:
+            csv_file.close()
+
+    outputs = ([parquet_path] if pq is not None else []) + ([csv_path] if csv_file is not None else [])
+    written = list(outputs)
+    if columns is not None:
+        written.append(columns.close(extra={"plain_bytes": plain_bytes}))
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": PARAMS_VERSION,
+            "source": "synthetic",
+            "source_sha256": source_sha256,
+            "params_sha256": params_sha256,
+            "outputs": outputs,
+            "synthetic": {"rows": rows, "seed": seed, "chunk_rows": chunk_rows, "synth_version": SYNTH_VERSION,
+                          "columns": len(ref_columns) if ref_columns is not None else len(SCHEMA)},
+        }, f, indent=2)
+    return written + [meta_path]
+
+def parse_rows(text):
+    """Row counts like "300000", "300k" or "3M"."""
+    text = text.strip().lower()
+    scale = {"k": 10**3, "m": 10**6}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic dataset with the cleaned schema into the dashboard's data files.")
+    parser.add_argument("rows", type=parse_rows, help="row count, e.g. 300000, 3M or 30M")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"rows generated and written per chunk (default {DEFAULT_CHUNK_ROWS:,})")
+    parser.add_argument("--formats", default="parquet,csv", help=f"comma-separated, from {','.join(FORMATS)}")
+    parser.add_argument("--like", metavar="DATA_DIR", default=os.path.dirname(CLEAN_PARQUET_PATH),
+                        help="match the columns of the cleaned table prepared in this directory (default: %(default)s, "
+                             "if there is one; otherwise the model's own columns)")
+    parser.add_argument("--force", action="store_true", help="overwrite existing data files")
+    args = parser.parse_args()
+
+    existing = [p for p in (RAW_CSV_PATH, CLEAN_PARQUET_PATH, CLEAN_CSV_PATH) if os.path.exists(p)]
+    if existing and not args.force:
+        raise SystemExit(f"⚠️ {', '.join(existing)} already exist; run from another directory or pass --force")
+    reference = reference_schema(*(os.path.join(args.like, os.path.basename(p))
+                                   for p in (PARAMS_PATH, CLEAN_PARQUET_PATH, CLEAN_CSV_PATH, META_PATH)))
+    if reference is not None:
+        print(f"Matching the {len(reference[0])} columns of the cleaned table in {args.like}")
+    for out_path in write_synthetic_data(args.rows, args.seed, args.chunk_rows, args.formats.split(","),
+                                         reference=reference):
+        print(f"✅ Saved {out_path}")
+    if os.path.exists(RAW_CSV_PATH):
+        # The meta marks these files synthetic, so the app never rebuilds them on start, but prep would
+        print(f"⚠️ {RAW_CSV_PATH} is still here: `python -m utils.prep` would replace the synthetic files with "
+              "its cleaned rows")